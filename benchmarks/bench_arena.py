@@ -0,0 +1,60 @@
+import contextlib
+import io
+import pathlib
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.core import Model
+from simplex.formatters import TableauCliFormatter
+import simplex.parsing.nodes
+from simplex.parsing import Arena, clear_interned
+from simplex.solvers import BigmSimplexSolver
+
+
+def make_model(rows, width):
+    lines = ['max z = ' + ' + '.join(f'{j % 5 + 1}x{j}' for j in range(1, width + 1))]
+    lines.extend(' + '.join(f'{(k + 2*j) % 7 + 1}x{j}' for j in range(1, width + 1)) + f' >= {20*k + 100}' for k in range(rows))
+    lines.append(' + '.join(f'x{j}' for j in range(1, width + 1)) + f' <= {100*rows}')
+    lines.append(', '.join(f'x{j}' for j in range(1, width + 1)) + ' >= 0')
+    return '\n'.join(lines)
+
+
+def solve(raw, arena):
+    solver = BigmSimplexSolver()
+    solver.formatter = TableauCliFormatter()
+    solver.arena = arena
+    solver.model = Model.parse_str(raw)
+    with contextlib.redirect_stdout(io.StringIO()):
+        solver.solve()
+    return solver
+
+
+def measure(raw, arena):
+    clear_interned()
+    start = time.perf_counter()
+    solve(raw, Arena() if arena else None)
+    elapsed = time.perf_counter() - start
+    clear_interned()
+    tracemalloc.start()
+    solver = solve(raw, Arena() if arena else None)
+    held, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    cells = sum(len(line) for line in solver.tableau.data)
+    return elapsed, peak, held, cells, len(simplex.parsing.nodes.INTERNED), solver.arena
+
+
+def main():
+    solve(make_model(2, 2), None)
+    for rows, width in ((12, 6), (20, 8)):
+        raw = make_model(rows, width)
+        for arena in (False, True):
+            elapsed, peak, held, cells, interned, arena = measure(raw, arena)
+            name = 'nodes' if arena is None else f'arena of {len(arena)} ids ({arena.nbytes()/1e3:.0f} kB)'
+            print(f'{rows}x{width} Big-M tableau, {name}: {elapsed:.2f}s, {interned} interned nodes, {held/cells:.0f} bytes/cell held, peak {peak/1e6:.2f} MB')
+
+
+if __name__ == '__main__':
+    main()
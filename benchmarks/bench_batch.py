@@ -0,0 +1,46 @@
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+import simplex.parsing.nodes
+from simplex.core import Model
+
+
+def make_model(rows, width):
+    lines = ['max z = ' + ' + '.join(f'{j % 5 + 1}x{j}' for j in range(1, width + 1))]
+    lines.extend(' + '.join(f'{(k + 2*j) % 7 + 1}x{j}' for j in range(1, width + 1)) + f' <= {20*k + 100}' for k in range(rows))
+    lines.append(', '.join(f'x{j}' for j in range(1, width + 1)) + ' >= 0')
+    return '\n'.join(lines)
+
+
+def timed(f):
+    start = time.perf_counter()
+    f()
+    return time.perf_counter() - start
+
+
+def main():
+    model = Model.parse_str(make_model(40, 8))
+    random.seed(0)
+    n = 10000
+    columns = {v: [random.uniform(-1, 10) for _ in range(n)] for v in model.variables}
+    points = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    def one_by_one():
+        for c in model.constraints:
+            for point in points:
+                c.evaluate(point)
+    numpy = simplex.parsing.nodes.numpy
+    looped = timed(one_by_one)
+    print(f'40x8 model, {n} points: BoolTree.evaluate per point {looped:.3f}s')
+    simplex.parsing.nodes.numpy = None
+    print(f'40x8 model, {n} points: evaluate_batch, pure Python {timed(lambda: model.evaluate_batch(columns)):.3f}s')
+    simplex.parsing.nodes.numpy = numpy
+    if numpy is not None:
+        print(f'40x8 model, {n} points: evaluate_batch, NumPy {timed(lambda: model.evaluate_batch(columns)):.3f}s')
+
+
+if __name__ == '__main__':
+    main()
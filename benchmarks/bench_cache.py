@@ -0,0 +1,50 @@
+import contextlib
+import io
+import itertools
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.__main__ import Options, main
+from simplex.core import PreparedCache
+
+
+# rows that need the rewriting rules, on a small tableau
+def make_model(rows):
+    lines = ['max z = 3x1 + 2x2 + 4x3']
+    lines.extend(f'{k % 4 + 1}*(x1 + 2*(x2 - x3/{k % 3 + 2})) + (x3 - x1)/{k % 5 + 1} <= {10*k + 50}' for k in range(rows))
+    lines.append('x1 + x2 + x3 <= 40')
+    lines.append('x1, x2, x3 >= 0')
+    return '\n'.join(lines)
+
+
+# the end-to-end option matrix, for a single program
+def run_all(path, cache):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for solver, method, latex in itertools.product(['bigm', 'twophase'], ['dictionary', 'tableau', 'compact'], [True, False]):
+            main(path, solver, False, False, method, latex, 3628800, Options(no_echo=True, cache=cache))
+    return time.perf_counter() - start
+
+
+def main_():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / 'program'
+        path.write_text(make_model(30))
+        plain = run_all(path, None)
+        cache = PreparedCache()
+        cached = run_all(path, cache)
+        key = cache.key(path.read_text(), False, False)
+        start = time.perf_counter()
+        cache.get(key)
+        hit = time.perf_counter() - start
+        print(f'12 runs without cache: {plain:.3f}s')
+        print(f'12 runs with cache:    {cached:.3f}s ({plain/cached:.2f}x faster, {cache})')
+        print(f'single cache hit:      {hit:.4f}s (instead of parsing and preparing the program)')
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,35 @@
+import contextlib
+import io
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.core import Model
+from simplex.formatters import DictCliFormatter
+from simplex.solvers import BigmSimplexSolver
+
+
+# every variable has a lower bound, so that canonicalization substitutes it
+# in every constraint
+def make_model(rows, width):
+    lines = ['max z = ' + ' + '.join(f'{j % 5 + 1}x{j}' for j in range(1, width + 1))]
+    lines.extend(' + '.join(f'{(k + j) % 7 + 1}x{j}' for j in range(1, width + 1)) + f' <= {1000 + k}' for k in range(rows))
+    lines.extend(f'x{j} >= {j % 3 + 1}' for j in range(1, width + 1))
+    return '\n'.join(lines)
+
+
+def main():
+    for rows, width in ((10, 50), (20, 100), (20, 200)):
+        solver = BigmSimplexSolver()
+        solver.formatter = DictCliFormatter()
+        solver.model = Model.parse_str(make_model(rows, width))
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            solver.prepare()
+        print(f'{rows}x{width}: preparation {time.perf_counter() - start:.3f}s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.parsing import MathTree
+
+
+def measure(f, context, repeat):
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            f(context)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    # the same objective at many points, as when scanning vertices
+    for width in (20, 100, 500):
+        tree = MathTree.from_string(' + '.join(f'{j % 7 + 1}x{j}' for j in range(width)))
+        context = {f'x{j}': j % 3 for j in range(width)}
+        repeat = 100000 // width
+        start = time.perf_counter()
+        f = tree.compile()
+        compiling = time.perf_counter() - start
+        assert f(context) == tree.evaluate(context)
+        evaluated = measure(tree.evaluate, context, repeat)
+        compiled = measure(f, context, repeat)
+        print(f'{width:3d} terms x {repeat:4d}: evaluate {evaluated:.3f}s, compiled {compiled:.3f}s (+{compiling:.3f}s to compile)')
+
+
+if __name__ == '__main__':
+    main()
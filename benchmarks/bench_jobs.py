@@ -0,0 +1,40 @@
+import os
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.core import Model
+from simplex.solvers.basic import _normalized
+from simplex.utils import parallel_map
+
+
+def make_model(rows, width):
+    lines = ['max z = ' + ' + '.join(f'x{j}' for j in range(width))]
+    # plain linear rows and rows that need the rewriting rules
+    lines.extend(' + '.join(f'{(k * j) % 9 + 1}x{j}' for j in range(k % 5, width)) + f' <= {k}' for k in range(0, rows, 2))
+    lines.extend(' + '.join(f'{(k * j) % 9 + 1}*(x{j} - x{j+1})' for j in range(k % 5, width)) + f' <= {k}' for k in range(1, rows, 2))
+    return '\n'.join(lines)
+
+
+def run(raw, jobs):
+    start = time.perf_counter()
+    model = Model.parse_str(raw, jobs)
+    constraints = list(parallel_map(_normalized, model.constraints, jobs))
+    return time.perf_counter() - start, [str(c) for c in constraints]
+
+
+def main():
+    raw = make_model(4000, 12)
+    print(f'{os.cpu_count()} CPUs')
+    serial, expected = run(raw, 1)
+    print(f'jobs=1: {serial:.2f}s')
+    for jobs in (2, 4):
+        elapsed, result = run(raw, jobs)
+        assert result == expected
+        print(f'jobs={jobs}: {elapsed:.2f}s ({serial/elapsed:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
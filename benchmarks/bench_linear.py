@@ -0,0 +1,36 @@
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.core import Rewriter
+from simplex.parsing import BoolTree
+
+
+def make_rows(count, width):
+    return [' + '.join(f'{(k * j) % 9 + 1}x{j}' for j in range(1, width)) + f' <= {k}' for k in range(count)]
+
+
+def run(rows):
+    start = time.perf_counter()
+    for row in rows:
+        tree = BoolTree.from_string(row)
+        Rewriter().normalize(tree)
+    return time.perf_counter() - start
+
+
+def main():
+    Rewriter.cache = None
+    rows = make_rows(200, 20)
+    fast = run(rows)
+    # parsed comparisons still take the fast path, through their linear form
+    BoolTree.LINEAR_ROWS = False
+    parsed = run(rows)
+    Rewriter._linear_form = staticmethod(lambda root: None)
+    slow = run(rows)
+    print(f'{len(rows)} rows: fast path {fast:.3f}s, parsed {parsed:.3f}s, rules {slow:.3f}s ({slow/fast:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.core import Model
+
+
+def make_models(rows, columns):
+    mps = ['NAME BENCH', 'OBJSENSE MAX', 'ROWS', ' N obj', *(f' L r{i}' for i in range(rows)), 'COLUMNS']
+    for j in range(columns):
+        mps.append(f' x{j} obj {j % 5 + 1}')
+        mps.extend(f' x{j} r{i} {(i * j) % 9 + 1}' for i in range(j % 3, rows, 3))
+    mps.extend(['RHS', *(f' rhs r{i} {i + 1}' for i in range(rows)), 'ENDATA'])
+    text = ['max obj = ' + ' + '.join(f'{j % 5 + 1}*x{j}' for j in range(columns))]
+    for i in range(rows):
+        text.append(' + '.join(f'{(i * j) % 9 + 1}*x{j}' for j in range(columns) if j % 3 == i % 3) + f' <= {i + 1}')
+    return mps, text
+
+
+def main():
+    mps, text = make_models(3000, 60)
+    start = time.perf_counter()
+    Model.parse_mps_lines(mps)
+    elapsed = time.perf_counter() - start
+    print(f'MPS reader: {len(mps)} lines in {elapsed:.2f}s')
+    start = time.perf_counter()
+    Model.parse_lines(text)
+    elapsed = time.perf_counter() - start
+    print(f'text syntax: {len(text)} lines in {elapsed:.2f}s')
+
+
+if __name__ == '__main__':
+    main()
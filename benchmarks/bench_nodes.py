@@ -0,0 +1,56 @@
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+import simplex.parsing.nodes
+from simplex.__main__ import main
+
+
+def make_model(rows, width):
+    lines = ['max z = ' + ' + '.join(f'{j % 5 + 1}x{j}' for j in range(1, width + 1))]
+    lines.extend(' + '.join(f'{(k + 2*j) % 7 + 1}x{j}' for j in range(1, width + 1)) + f' <= {20*k + 100}' for k in range(rows))
+    lines.append(', '.join(f'x{j}' for j in range(1, width + 1)) + ' >= 0')
+    return '\n'.join(lines)
+
+
+def run(path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        main(path, 'bigm', False, False, 'tableau', False, 3628800)
+
+
+def measure(path, limit):
+    # a zero limit resets the table on every node, so that nothing is shared
+    simplex.parsing.nodes.INTERNED_LIMIT = limit
+    simplex.parsing.nodes.INTERNED.clear()
+    times = []
+    for _ in range(3):
+        start = time.perf_counter()
+        run(path)
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run(path)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times), peak
+
+
+def main_():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / 'program'
+        path.write_text(make_model(40, 8))
+        limit = simplex.parsing.nodes.INTERNED_LIMIT
+        shared, shared_peak = measure(path, limit)
+        fresh, fresh_peak = measure(path, 0)
+        simplex.parsing.nodes.INTERNED_LIMIT = limit
+        print(f'40x8 Big-M tableau run, shared nodes:   {shared:.3f}s, peak {shared_peak/1e6:.2f} MB')
+        print(f'40x8 Big-M tableau run, unshared nodes: {fresh:.3f}s, peak {fresh_peak/1e6:.2f} MB')
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,43 @@
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.core import Rewriter
+from simplex.parsing import MathTree
+
+
+# cells as built by Tableau.pivot ("a - b*c/d"), and linear expressions
+def make_exprs(count):
+    rng = random.Random(0)
+    def fraction():
+        return f'{rng.choice((-1, 1))*rng.randint(1, 50)}/{rng.randint(1, 50)}'
+    cells = [f'{fraction()} - ({fraction()})*({fraction()})/({fraction()})' for _ in range(count)]
+    sums = [' + '.join(f'{fraction()}*x{rng.randint(1, 9)}' for _ in range(8)) + f' - {fraction()}' for _ in range(count)]
+    return cells, sums
+
+
+def run(exprs, fast):
+    trees = [MathTree.from_string(e) for e in exprs]
+    start = time.perf_counter()
+    for tree in trees:
+        rewriter = Rewriter()
+        if fast:
+            rewriter.normalize(tree)
+        else:
+            rewriter.variables = list(tree.variables)
+            tree.root = tree.root.rewrite(rewriter._normalize_visitor)
+    return time.perf_counter() - start
+
+
+def main():
+    for name, exprs in zip(('pivot cells', '8-term sums'), make_exprs(2000)):
+        slow = run(exprs, False)
+        fast = run(exprs, True)
+        print(f'{len(exprs)} {name}: rules {slow:.3f}s, canonicalizer {fast:.3f}s ({slow/fast:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.__main__ import main
+from simplex.core import NormalizeCache, Rewriter
+
+
+def make_model(rows, width):
+    lines = ['max z = ' + ' + '.join(f'{j % 5 + 1}x{j}' for j in range(1, width + 1))]
+    lines.extend(' + '.join(f'{(k + 2*j) % 7 + 1}x{j}' for j in range(1, width + 1)) + f' <= {20*k + 100}' for k in range(rows))
+    lines.append(', '.join(f'x{j}' for j in range(1, width + 1)) + ' >= 0')
+    return '\n'.join(lines)
+
+
+# one cold Big-M tableau run (empty cache)
+def measure(path, maxsize):
+    Rewriter.cache = NormalizeCache(maxsize) if maxsize is not None else None
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        main(path, 'bigm', False, False, 'tableau', False, 3628800)
+    return time.perf_counter() - start, Rewriter.cache
+
+
+def main_():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / 'program'
+        for rows, width in ((20, 8), (40, 8)):
+            path.write_text(make_model(rows, width))
+            measure(path, None)
+            for maxsize in (None, 256, 4096):
+                elapsed, cache = min(measure(path, maxsize) for _ in range(3))
+                print(f'{rows}x{width} Big-M tableau, cache {maxsize}: {elapsed:.3f}s' + (f' ({cache})' if cache else ''))
+
+
+if __name__ == '__main__':
+    main_()
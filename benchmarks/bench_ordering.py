@@ -0,0 +1,56 @@
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.core import Rewriter
+from simplex.parsing import BinaryOp, BoolTree, ObjectiveTree
+
+
+# rows whose terms come in the reverse of the variable order, as after
+# prefix_sort, through the rules (no LinearForm, no cache)
+def make_trees(width):
+    terms = [f'{j % 7 + 1}*x{j}' for j in range(width, 0, -1)]
+    variables = [f'x{j}' for j in range(1, width + 1)]
+    row = BoolTree.from_string(' + '.join(terms) + ' <= 10 + x1')
+    row.linear = None
+    objective = ObjectiveTree.from_string('max z = ' + ' + '.join(terms))
+    return [(row, variables), (objective, ['z', *variables])]
+
+
+# one swap, and normalization of the chain, per rewrite
+def swap_term(self, chain, term):
+    return self._normalize_visitor(BinaryOp('+', self._normalize_visitor(BinaryOp('+', chain.left, term)), chain.right))
+
+def index_unsorted(self, left, right):
+    return self.variables.index(left) > self.variables.index(right)
+
+
+def run(trees):
+    start = time.perf_counter()
+    for tree, variables in trees:
+        for _ in range(5):
+            tree = tree.copy()
+            tree.variables = variables
+            Rewriter().normalize(tree)
+    return time.perf_counter() - start
+
+
+def main():
+    Rewriter.cache = None
+    sys.setrecursionlimit(100000)
+    for width in (20, 80, 200):
+        trees = make_trees(width)
+        fast = run(trees)
+        insert_term, is_unsorted = Rewriter._insert_term, Rewriter._is_unsorted
+        Rewriter._insert_term, Rewriter._is_unsorted = swap_term, index_unsorted
+        try:
+            slow = run(trees)
+        finally:
+            Rewriter._insert_term, Rewriter._is_unsorted = insert_term, is_unsorted
+        print(f'{width:3d} reversed terms: swaps {slow:.3f}s, one-pass insertion {fast:.3f}s ({slow/fast:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
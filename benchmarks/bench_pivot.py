@@ -0,0 +1,67 @@
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.__main__ import main
+from simplex.core import Tableau
+from simplex.parsing import ExprTree
+
+
+def make_model(rows, width):
+    lines = ['max z = ' + ' + '.join(f'{j % 5 + 1}x{j}' for j in range(1, width + 1))]
+    lines.extend(' + '.join(f'{(k + 2*j) % 7 + 1}x{j}' for j in range(1, width + 1)) + f' <= {20*k + 100}' for k in range(rows))
+    lines.append(', '.join(f'x{j}' for j in range(1, width + 1)) + ' >= 0')
+    return '\n'.join(lines)
+
+
+# time spent in Tableau.pivot, and number of pivots, over a Big-M tableau run
+def measure(path):
+    pivot = Tableau.pivot
+    times = []
+    def timed(self, var_in, var_out):
+        start = time.process_time()
+        pivot(self, var_in, var_out)
+        times.append(time.process_time() - start)
+    Tableau.pivot = timed
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(path, 'bigm', False, False, 'tableau', False, 3628800)
+    finally:
+        Tableau.pivot = pivot
+    return sum(times), len(times)
+
+
+trusted = ExprTree.from_root
+
+
+def validated(cls, root, variables=None):
+    return cls(root) if variables is None else trusted.__func__(cls, root, variables)
+
+
+def best(path, runs=5):
+    return min(measure(path) for _ in range(runs))
+
+
+def main_():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / 'program'
+        for rows, width in ((20, 8), (40, 8)):
+            path.write_text(make_model(rows, width))
+            fast, pivots = best(path)
+            # internal trees built through the validating constructor, as
+            # they were before from_root
+            ExprTree.from_root = classmethod(validated)
+            try:
+                slow, _ = best(path)
+            finally:
+                ExprTree.from_root = trusted
+            print(f'{rows}x{width} Big-M tableau, {pivots} pivots: validated {1000*slow/pivots:.1f} ms/pivot, trusted {1000*fast/pivots:.1f} ms/pivot')
+
+
+if __name__ == '__main__':
+    main_()
@@ -0,0 +1,39 @@
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.core import Model, RowCache
+
+
+def make_lines(rows, width):
+    lines = ['max z = ' + ' + '.join(f'{j % 5 + 1}x{j}' for j in range(1, width + 1))]
+    lines.extend(' + '.join(f'{(k + j) % 7 + 1}x{j}' for j in range(1, width + 1)) + f' <= {k + 10}' for k in range(rows))
+    lines.append(', '.join(f'x{j}' for j in range(1, width + 1)) + ' >= 0')
+    return lines
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    print('rows   | full parse | cached, 1 row edited | cached, 1% edited')
+    for rows in (1000, 10000, 50000):
+        lines = make_lines(rows, 10)
+        cache = RowCache()
+        full = timed(lambda: Model.parse_str('\n'.join(lines)))
+        Model.parse_str('\n'.join(lines), cache=cache)
+        lines[rows // 2] = 'x1 + x2 <= 5'
+        one = timed(lambda: Model.parse_str('\n'.join(lines), cache=cache))
+        for k in range(1, rows, 100):
+            lines[k] = f'x1 + {k}x2 <= 5'
+        some = timed(lambda: Model.parse_str('\n'.join(lines), cache=cache))
+        print(f'{rows:6} | {full:9.3f}s | {one:19.3f}s | {some:16.3f}s')
+
+
+if __name__ == '__main__':
+    main()
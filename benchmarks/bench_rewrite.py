@@ -0,0 +1,73 @@
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.__main__ import main
+from simplex.core import Rewriter, Tableau
+from simplex.parsing import clear_interned, nodes
+
+
+def make_model(rows, width):
+    lines = ['max z = ' + ' + '.join(f'{j % 5 + 1}x{j}' for j in range(1, width + 1))]
+    lines.extend(' + '.join(f'{(k + 2*j) % 7 + 1}x{j}' for j in range(1, width + 1)) + f' <= {20*k + 100}' for k in range(rows))
+    lines.append(', '.join(f'x{j}' for j in range(1, width + 1)) + ' >= 0')
+    return '\n'.join(lines)
+
+
+# per Tableau.pivot of a Big-M tableau run: nodes requested (interned or
+# not), nodes actually allocated, visitor calls and peak memory allocated by
+# the pivot (tracemalloc). With rules_only, cells skip the linear fast path
+# (and the cache), as cells it does not cover would
+def measure(path, rules_only):
+    counts = {'requested': 0, 'allocated': 0, 'visits': 0}
+    pivoting = False
+    pivot, interned, visitor, linear_form, cache = Tableau.pivot, nodes.interned, Rewriter._normalize_visitor, Rewriter.__dict__['_linear_form'], Rewriter.cache
+    peaks = []
+    def counted_interned(cls, key, *values):
+        if pivoting:
+            counts['requested'] += 1
+            counts['allocated'] += key not in nodes.INTERNED
+        return interned(cls, key, *values)
+    def counted_visitor(self, node):
+        counts['visits'] += pivoting
+        return visitor(self, node)
+    def measured(self, var_in, var_out):
+        nonlocal pivoting
+        pivoting = True
+        tracemalloc.start()
+        pivot(self, var_in, var_out)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        pivoting = False
+    Tableau.pivot, nodes.interned, Rewriter._normalize_visitor = measured, counted_interned, counted_visitor
+    if rules_only:
+        Rewriter._linear_form = staticmethod(lambda root: None)
+        Rewriter.cache = None
+    try:
+        clear_interned()
+        with contextlib.redirect_stdout(io.StringIO()):
+            main(path, 'bigm', False, False, 'tableau', False, 3628800)
+    finally:
+        Tableau.pivot, nodes.interned, Rewriter._normalize_visitor, Rewriter._linear_form, Rewriter.cache = pivot, interned, visitor, linear_form, cache
+    n = len(peaks)
+    return n, {k: v/n for k, v in counts.items()}, max(peaks)
+
+
+def main_():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / 'program'
+        for rows, width in ((12, 6), (20, 8)):
+            path.write_text(make_model(rows, width))
+            for rules_only in (False, True):
+                n, counts, peak = measure(path, rules_only)
+                mode = 'rules only' if rules_only else 'default'
+                print(f'{rows}x{width} Big-M tableau, {mode}: {n} pivots, per pivot {counts["requested"]:.0f} nodes requested, {counts["allocated"]:.0f} allocated, {counts["visits"]:.0f} visits, peak {peak/1e6:.2f} MB')
+
+
+if __name__ == '__main__':
+    main_()
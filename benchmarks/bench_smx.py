@@ -0,0 +1,54 @@
+import contextlib
+import io
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.core import Model, SmxWriter, load_smx
+from simplex.formatters import DictCliFormatter
+from simplex.solvers import BigmSimplexSolver
+
+
+def make_model(rows, width):
+    lines = ['max z = ' + ' + '.join(f'{j % 5 + 1}x{j}' for j in range(1, width + 1))]
+    lines.extend(' + '.join(f'{(k * j) % 9 + 1}x{j}' for j in range(1, width + 1)) + f' <= {k + 10}' for k in range(rows))
+    lines.append(', '.join(f'x{j}' for j in range(1, width + 1)) + ' >= 0')
+    return '\n'.join(lines)
+
+
+def timed(func):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = func()
+    return time.perf_counter() - start, result
+
+
+def prepare(raw):
+    solver = BigmSimplexSolver()
+    solver.formatter = DictCliFormatter()
+    solver.model = Model.parse_str(raw)
+    writer = SmxWriter(solver.model)
+    solver.prepare()
+    writer.add_prepared(solver.prepared_state())
+    return writer
+
+
+def main():
+    raw = make_model(300, 20)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = pathlib.Path(tmp) / 'model.smx'
+        parse, _ = timed(lambda: Model.parse_str(raw))
+        full, writer = timed(lambda: prepare(raw))
+        writer.write(path)
+        load, _ = timed(lambda: load_smx(path))
+        print(f'{len(raw)} bytes of text, {path.stat().st_size} bytes compiled')
+        print(f'text parse:                 {parse:.3f}s')
+        print(f'text parse + preparation:   {full:.3f}s')
+        print(f'.smx load (model + prepared): {load:.3f}s ({full/load:.0f}x faster than parse + preparation)')
+
+
+if __name__ == '__main__':
+    main()
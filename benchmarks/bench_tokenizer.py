@@ -0,0 +1,28 @@
+import pathlib
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
+
+from simplex.parsing import tokenize
+
+
+def make_model(size):
+    lines = ['max z = ' + ' + '.join(f'{k % 7 + 1}*x{k}' for k in range(1, 200))]
+    k = 0
+    while sum(len(line) + 1 for line in lines) < size:
+        k += 1
+        lines.append(' + '.join(f'{(k * j) % 9 + 1}x{j}' for j in range(1, 200)) + f' <= {k}')
+    return '\n'.join(lines)
+
+
+def main():
+    model = make_model(1 << 20)
+    start = time.perf_counter()
+    count = sum(1 for _ in tokenize(model))
+    elapsed = time.perf_counter() - start
+    print(f'{len(model)} bytes, {count} tokens in {elapsed:.3f}s ({count/elapsed:,.0f} tokens/s)')
+
+
+if __name__ == '__main__':
+    main()
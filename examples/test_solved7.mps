@@ -0,0 +1,18 @@
+* max 3 X1 + 5 X2 subject to X1 <= 4, 2 X2 <= 12, X1 + X2 <= 8
+NAME          SOLVED7
+OBJSENSE
+    MAX
+ROWS
+ N  PROFIT
+ L  LIM1
+ L  LIM2
+ L  LIM3
+COLUMNS
+    X1        PROFIT    3            LIM1      1
+    X1        LIM3      1
+    X2        PROFIT    5            LIM2      2
+    X2        LIM3      1
+RHS
+    RHS       LIM1      4            LIM2      12
+    RHS       LIM3      8
+ENDATA
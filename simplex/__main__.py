@@ -1,4 +1,5 @@
 import argparse
+import contextlib
 import pathlib
 import sys
 
@@ -8,7 +9,21 @@ sys.path.insert(0, str(pathlib.Path(__file__).parent.parent))
 import simplex
 
 
-def main(filename, solver, from_dual, to_dual, method, latex, m):
+# options beyond the program and how it is solved and shown, named after the
+# command line flags; those not given keep these defaults
+class Options(argparse.Namespace):
+    no_echo = False
+    mmap = False
+    jobs = 1
+    mps_fixed = False
+    compile = None
+    arena = False
+    cache = None
+    row_cache = None
+
+
+def main(filename, solver, from_dual, to_dual, method, latex, m, options=None):
+    options = options or Options()
     # resolve CLI parameters
     match solver:
         case 'bigm':
@@ -38,21 +53,63 @@ def main(filename, solver, from_dual, to_dual, method, latex, m):
     solver.formatter = formatter
     solver.convert_from_dual = from_dual
     solver.convert_to_dual = to_dual
+    solver.jobs = options.jobs
+    if options.arena:
+        solver.arena = simplex.parsing.Arena()
 
     # parse input
     print(formatter.format_section('Initialization'))
-    print(formatter.format_step(f'Raw input ({filename})'))
-    with pathlib.Path.open(filename, 'r') as f:
-        raw = f.read()
-    print(formatter.format_raw_model(raw))
-    print()
+    suffix = pathlib.Path(filename).suffix.lower()
+    mps = suffix == '.mps'
+    prepared = None
+    key = None
+    if suffix == '.smx':
+        model, prepared = simplex.core.load_smx(filename)
+        if prepared and (prepared['from_dual'], prepared['to_dual']) != (from_dual, to_dual):
+            prepared = None
+    elif not options.no_echo or options.cache is not None:
+        with pathlib.Path.open(filename, 'r') as f:
+            raw = f.read()
+        if not options.no_echo:
+            print(formatter.format_step(f'Raw input ({filename})'))
+            print(formatter.format_raw_model(raw))
+            print()
+        if options.cache is not None:
+            fmt = ('mps_fixed' if options.mps_fixed else 'mps') if mps else 'program'
+            key = options.cache.key(raw, from_dual, to_dual, fmt)
+            if hit := options.cache.get(key):
+                model, prepared = hit
+        if prepared is None:
+            if mps:
+                model = simplex.core.Model.parse_mps_lines(raw.splitlines(), options.mps_fixed)
+            else:
+                model = simplex.core.Model.parse_str(raw, options.jobs, options.row_cache)
+        del raw
+    elif mps:
+        model = simplex.core.Model.parse_mps_file(filename, options.mmap, options.mps_fixed)
+    else:
+        model = simplex.core.Model.parse_file(filename, options.mmap, options.jobs, options.row_cache)
 
     # print parsed program
     print(formatter.format_step('Parsed program'))
-    solver.model = simplex.core.Model.parse_str(raw)
+    solver.model = model
     print(formatter.format_raw_model(str(solver.model)))
     print()
 
+    # prepare program, unless compiled or cached, recording its standard form
+    if prepared:
+        solver.load_prepared_state(prepared)
+    elif options.compile or key is not None:
+        writer = simplex.core.SmxWriter(model)
+        solver.prepare()
+        writer.add_prepared(solver.prepared_state())
+        if options.compile:
+            writer.write(options.compile)
+            print()
+            print(formatter.format_decision(f'compiled program written to {options.compile}'))
+            return solver.summary
+        options.cache.put(key, writer.to_bytes())
+
     # call solver
     solver.solve()
 
@@ -74,6 +131,45 @@ if __name__ == '__main__':
     parser.add_argument('--method', type=str, default='dictionary', choices={'tableau', 'compact', 'tableau_alt', 'compact_alt', 'dict', 'dictionary'})
     parser.add_argument('--latex', action='store_true')
     parser.add_argument('--m', type=int, default=3628800)
-    args = parser.parse_args()
+    parser.add_argument('--no_echo', action='store_true')
+    parser.add_argument('--mmap', action='store_true')
+    parser.add_argument('--jobs', type=int, default=1)
+    parser.add_argument('--mps_fixed', action='store_true')
+    parser.add_argument('--compile', type=pathlib.Path)
+    parser.add_argument('--cache_dir', type=pathlib.Path)
+    parser.add_argument('--cache_size', type=int, default=32)
+    parser.add_argument('--watch', action='store_true')
+    parser.add_argument('--arena', action='store_true')
+    parser.add_argument('--profile_rewriter', type=pathlib.Path, nargs='?', const='-')
+    parser.add_argument('--expansion_budget', type=int, default=simplex.core.Rewriter.expansion_budget)
+    args = parser.parse_args(namespace=Options())
+    simplex.core.Rewriter.expansion_budget = args.expansion_budget
+
+    if args.cache_dir:
+        args.cache = simplex.core.PreparedCache(args.cache_size, args.cache_dir)
+    def run():
+        main(args.program, args.solver, args.from_dual, args.to_dual, args.method, args.latex, args.m, args)
 
-    main(args.program, args.solver, args.from_dual, args.to_dual, args.method, args.latex, args.m)
+    # rewrite rules are only profiled on demand, the report being printed (or
+    # written as JSON to the given file) at exit
+    profiler = simplex.core.RuleProfiler() if args.profile_rewriter else contextlib.nullcontext()
+    with profiler:
+        if not args.watch:
+            run()
+        else:
+            # solve again on every change, only parsing the rows that changed;
+            # errors are reported without leaving the loop
+            args.row_cache = simplex.core.RowCache()
+            with contextlib.suppress(KeyboardInterrupt):
+                for _ in simplex.utils.watch_file(args.program):
+                    try:
+                        run()
+                    except (SyntaxError, TypeError, RuntimeError) as e:
+                        print(f'{type(e).__name__}: {e}')
+                    print()
+                    print(f'Watching {args.program} for changes (Ctrl-C to stop)')
+    if args.profile_rewriter == pathlib.Path('-'):
+        print()
+        print(profiler.report())
+    elif args.profile_rewriter:
+        args.profile_rewriter.write_text(profiler.to_json())
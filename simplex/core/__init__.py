@@ -1,5 +1,7 @@
+from .cache import PreparedCache
+from .compiled import SmxWriter, load_smx, loads_smx
 from .formatter import AbstractFormatter
-from .model import Model
-from .rewriter import Rewriter
+from .model import Model, RowCache
+from .rewriter import ExpansionBudgetExceeded, NormalizeCache, Rewriter, RuleProfiler
 from .solver import AbstractSolver
 from .tableau import Tableau
@@ -0,0 +1,71 @@
+import collections
+import hashlib
+import os
+import pathlib
+
+from .compiled import VERSION, loads_smx
+
+
+# prepared models, stored as compiled (.smx) bytes so that every hit decodes
+# fresh trees: solving rewrites the model in place
+class PreparedCache:
+    def __init__(self, maxsize=32, directory=None):
+        self.maxsize = maxsize
+        self.directory = pathlib.Path(directory) if directory is not None else None
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+
+    # content hash, plus the options that change the prepared form: the
+    # format the content is read as ('program', 'mps' or 'mps_fixed') and
+    # the conversions to and from the dual
+    @staticmethod
+    def key(raw, from_dual, to_dual, fmt='program'):
+        if isinstance(raw, str):
+            raw = raw.encode()
+        return f'{hashlib.sha256(raw).hexdigest()}-{fmt}-{from_dual:d}{to_dual:d}-v{VERSION}'
+
+    def path(self, key):
+        return self.directory / f'{key}.smx'
+
+    def get(self, key):
+        if (data := self.entries.get(key)) is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return loads_smx(data)
+        if self.directory is not None and self.path(key).is_file():
+            data = self.path(key).read_bytes()
+            self.store(key, data)
+            self.hits += 1
+            self.disk_hits += 1
+            return loads_smx(data)
+        self.misses += 1
+        return None
+
+    def put(self, key, data):
+        self.store(key, data)
+        if self.directory is not None:
+            # write then rename, so concurrent runs never read a partial file
+            tmp = self.path(key).with_suffix(f'.{os.getpid()}.tmp')
+            tmp.write_bytes(data)
+            tmp.replace(self.path(key))
+
+    def store(self, key, data):
+        self.entries[key] = data
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return f'{self.hits} hits ({self.disk_hits} from disk), {self.misses} misses, {self.evictions} evictions, {len(self)}/{self.maxsize} entries'
@@ -0,0 +1,230 @@
+import array
+import fractions
+import io
+import json
+import pathlib
+import struct
+import sys
+
+from simplex.parsing import BinaryOp, DecimalFraction, ExprList, Literal, Objective, UnaryOp, Variable
+from simplex.parsing import BoolTree, MathTree, ObjectiveTree
+
+from .model import Model
+
+
+# layout: header, JSON metadata, '\0'-separated strings, then one kind byte
+# and one int32 argument per node, trees being stored in postfix order
+MAGIC = b'SMX\0'
+VERSION = 2
+HEADER = struct.Struct('<4sHxxQQQ')
+
+INT, BOOL, NUMBER, VAR, UNARY, BINARY, OBJECTIVE, LIST = range(8)
+INT32 = range(-2**31, 2**31)
+
+
+def _number_text(value):
+    match value:
+        case int():
+            return f'i{value}'
+        case float():
+            return f'f{value!r}'
+        case DecimalFraction():
+            return f'd{value.numerator}/{value.denominator}'
+        case fractions.Fraction():
+            return f'q{value}'
+        case str():
+            return f's{value}'
+    msg = f'Cannot compile literal {value!r}'
+    raise TypeError(msg)
+
+def _number_value(text):
+    match text[0]:
+        case 'i':
+            return int(text[1:])
+        case 'f':
+            return float(text[1:])
+        case 'd':
+            return DecimalFraction(text[1:])
+        case 'q':
+            return fractions.Fraction(text[1:])
+    return text[1:]
+
+# the model is recorded right away, as solving rewrites it in place
+class SmxWriter:
+    def __init__(self, model):
+        self.strings = {}
+        self.kinds = array.array('B')
+        self.args = array.array('i')
+        self.ends = []
+        self.meta = {'model': self.model(model), 'prepared': None}
+
+    def string(self, s):
+        return self.strings.setdefault(s, len(self.strings))
+
+    def expr(self, root):
+        stack = [(root, False)]
+        while stack:
+            node, done = stack.pop()
+            children = node.children()
+            if children and not done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+            match node:
+                case Literal(value=bool()):
+                    kind, arg = BOOL, int(node.value)
+                case Literal(value=int()) if node.value in INT32:
+                    kind, arg = INT, node.value
+                case Literal():
+                    kind, arg = NUMBER, self.string(_number_text(node.value))
+                case Variable():
+                    kind, arg = VAR, self.string(node.name)
+                case UnaryOp():
+                    kind, arg = UNARY, self.string(node.op)
+                case BinaryOp():
+                    kind, arg = BINARY, self.string(node.op)
+                case Objective():
+                    kind, arg = OBJECTIVE, self.string(node.mode)
+                case ExprList():
+                    kind, arg = LIST, len(children)
+                case _:
+                    msg = f'Cannot compile node {node}'
+                    raise TypeError(msg)
+            self.kinds.append(kind)
+            self.args.append(arg)
+        self.ends.append(len(self.kinds))
+        return len(self.ends) - 1
+
+    def tree(self, tree):
+        return [self.expr(tree.root), list(tree.variables)]
+
+    def model(self, model):
+        return {
+            'objective': self.tree(model.objective),
+            'constraints': [self.tree(c) for c in model.constraints],
+            'variables': list(model.variables),
+        }
+
+    # solver state right before the simplex iterations (see
+    # BasicSimplexSolver.prepared_state)
+    def add_prepared(self, state):
+        summary = state['summary']
+        self.meta['prepared'] = {
+            **state,
+            'model': self.model(state['model']),
+            'renames': {k: self.tree(v) for k, v in state['renames'].items()},
+            'summary': {
+                **summary,
+                'values': {k: self.expr(Literal(v)) for k, v in summary['values'].items()},
+                'eliminated': {k: self.expr(v) for k, v in summary['eliminated'].items()},
+            },
+        }
+
+    def dump(self, f):
+        meta = json.dumps({**self.meta, 'ends': self.ends}).encode()
+        strings = '\0'.join(self.strings).encode()
+        args = self.args
+        if sys.byteorder == 'big':
+            args = array.array('i', args)
+            args.byteswap()
+        f.write(HEADER.pack(MAGIC, VERSION, len(meta), len(strings), len(self.kinds)))
+        f.write(meta)
+        f.write(strings)
+        f.write(self.kinds)
+        f.write(args)
+
+    def write(self, filename):
+        with pathlib.Path.open(filename, 'wb') as f:
+            self.dump(f)
+
+    def to_bytes(self):
+        f = io.BytesIO()
+        self.dump(f)
+        return f.getvalue()
+
+class SmxReader:
+    def __init__(self, f, name):
+        header = f.read(HEADER.size)
+        if len(header) != HEADER.size or header[:4] != MAGIC:
+            msg = f'Not a compiled program: {name}'
+            raise RuntimeError(msg)
+        _, version, meta_size, strings_size, count = HEADER.unpack(header)
+        if version != VERSION:
+            msg = f'Unsupported compiled program version: {version}'
+            raise RuntimeError(msg)
+        self.meta = json.loads(f.read(meta_size))
+        strings = f.read(strings_size).decode().split('\0')
+        kinds = f.read(count)
+        args = array.array('i')
+        args.frombytes(f.read(args.itemsize*count))
+        if sys.byteorder == 'big':
+            args.byteswap()
+        self.exprs = self.decode(strings, kinds, args, self.meta['ends'])
+
+    @staticmethod
+    def decode(strings, kinds, args, ends):
+        exprs = []
+        stack = []
+        ends = iter(ends)
+        end = next(ends, None)
+        for i, (kind, arg) in enumerate(zip(kinds, args), 1):
+            if kind == INT:
+                stack.append(Literal(arg))
+            elif kind == BOOL:
+                stack.append(Literal(bool(arg)))
+            elif kind == NUMBER:
+                stack.append(Literal(_number_value(strings[arg])))
+            elif kind == VAR:
+                stack.append(Variable(strings[arg]))
+            elif kind == UNARY:
+                stack.append(UnaryOp(strings[arg], stack.pop()))
+            elif kind == BINARY:
+                right = stack.pop()
+                stack.append(BinaryOp(strings[arg], stack.pop(), right))
+            elif kind == OBJECTIVE:
+                right = stack.pop()
+                stack.append(Objective(strings[arg], stack.pop(), right))
+            else:
+                items = stack[len(stack)-arg:]
+                del stack[len(stack)-arg:]
+                stack.append(ExprList(items))
+            if i == end:
+                exprs.append(stack.pop())
+                end = next(ends, None)
+        return exprs
+
+    def tree(self, cls, data):
+        expr, variables = data
+        return cls.from_root(self.exprs[expr], variables)
+
+    def model(self, data):
+        model = Model()
+        model.objective = self.tree(ObjectiveTree, data['objective'])
+        model.constraints = [self.tree(BoolTree, c) for c in data['constraints']]
+        model.variables = data['variables']
+        return model
+
+    def prepared(self):
+        if not (data := self.meta['prepared']):
+            return None
+        summary = data['summary']
+        return {
+            **data,
+            'model': self.model(data['model']),
+            'renames': {k: self.tree(MathTree, v) for k, v in data['renames'].items()},
+            'summary': {
+                **summary,
+                'values': {k: self.exprs[v].value for k, v in summary['values'].items()},
+                'eliminated': {k: self.exprs[v] for k, v in summary['eliminated'].items()},
+            },
+        }
+
+# parsed model and, when the file has one, the prepared solver state
+def load_smx(filename):
+    with pathlib.Path.open(filename, 'rb') as f:
+        reader = SmxReader(f, filename)
+    return reader.model(reader.meta['model']), reader.prepared()
+
+def loads_smx(data):
+    reader = SmxReader(io.BytesIO(data), '<bytes>')
+    return reader.model(reader.meta['model']), reader.prepared()
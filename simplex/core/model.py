@@ -1,46 +1,112 @@
-import pathlib
+import io
 import re
 
-from simplex.parsing import BoolTree, ObjectiveTree
-from simplex.utils import prefix_unique
+from simplex.parsing import BoolTree, ObjectiveTree, Points
+from simplex.utils import gc_paused, iter_lines, parallel_map, prefix_unique
 
+from .mps import MpsReader
+
+
+def _parse_row(row):
+    # constraint families expand into several trees
+    if re.match(r'\s*forall\s*\(', row):
+        return list(BoolTree.iter_from_string(row))
+    return [BoolTree.from_string(row)]
+
+# constraint trees of the rows seen by the last parse, so that re-reading an
+# edited program only parses the rows that changed; every parse gets its own
+# tree objects, while the (never modified) nodes are shared
+class RowCache:
+    def __init__(self):
+        self.rows = {}
+        self.hits = 0
+        self.misses = 0
+
+    def parse_rows(self, rows, jobs=1):
+        rows = list(rows)
+        seen = dict.fromkeys(rows)
+        missing = [row for row in seen if row not in self.rows]
+        parsed = dict(zip(missing, parallel_map(_parse_row, missing, jobs)))
+        self.rows = {row: self.rows[row] if row in self.rows else parsed[row] for row in seen}
+        self.misses += len(missing)
+        self.hits += len(rows) - len(missing)
+        # the copies hold no cycles, and collecting while the cache is large
+        # would mostly walk cached trees
+        with gc_paused():
+            return [[tree.copy() for tree in self.rows[row]] for row in rows]
 
 class Model:
     @staticmethod
-    def parse_file(filename):
-        with pathlib.Path.open(filename, 'r') as f:
-            return Model.parse_str(f.read())
+    def parse_file(filename, use_mmap=False, jobs=1, cache=None):
+        return Model.parse_lines(iter_lines(filename, use_mmap), jobs, cache)
+
+    @staticmethod
+    def parse_str(s, jobs=1, cache=None):
+        return Model.parse_lines((line.rstrip('\n') for line in io.StringIO(s)), jobs, cache)
+
+    @staticmethod
+    def parse_mps_file(filename, use_mmap=False, fixed=False):
+        return Model.parse_mps_lines(iter_lines(filename, use_mmap), fixed)
 
     @staticmethod
-    def parse_str(s):
+    def parse_mps_lines(lines, fixed=False):
         model = Model()
-        variables = set()
-        for line in s.split('\n'):
-            if re.search(r'^\s*(#|$)', line):
-                continue
-            if m := re.search(r'^\s*((?:min|max)[^#]+)', line):
-                if model.objective is not None:
-                    msg = 'Multiple objective function found'
-                    raise RuntimeError(msg)
-                model.objective = ObjectiveTree.from_string(m.group(1))
-                variables = model.objective.variables[:]
-                continue
-            if m := re.search(r'^([^#]*)(#|$)', line):
-                if model.objective is None:
-                    msg = 'Constraint found before objective function'
-                    raise RuntimeError(msg)
-                tree = BoolTree.from_string(m.group(1))
+        model.objective, model.constraints = MpsReader(fixed).read(lines)
+        variables = dict.fromkeys(model.objective.variables)
+        var = model.objective.root.var()
+        for tree in model.constraints:
+            if var.name in tree.variables:
+                msg = 'Constraint uses objective as variable'
+                raise RuntimeError(msg)
+            variables.update(dict.fromkeys(tree.variables))
+        model.variables = prefix_unique(list(variables))
+        return model
+
+    @staticmethod
+    def parse_lines(lines, jobs=1, cache=None):
+        model = Model()
+        variables = {}
+        error = None
+        def rows():
+            nonlocal variables, error
+            for line in lines:
+                if re.search(r'^\s*(#|$)', line):
+                    continue
+                if m := re.search(r'^\s*((?:min|max)[^#]+)', line):
+                    if model.objective is not None:
+                        msg = 'Multiple objective function found'
+                        error = RuntimeError(msg)
+                        return
+                    model.objective = ObjectiveTree.from_string(m.group(1))
+                    variables = dict.fromkeys(model.objective.variables)
+                    continue
+                if m := re.search(r'^([^#]*)(#|$)', line):
+                    if model.objective is None:
+                        msg = 'Constraint found before objective function'
+                        raise RuntimeError(msg)
+                    yield m.group(1)
+                    continue
+        # constraints are independent from each other, so they may be parsed
+        # by worker processes; they are still checked in order, and an error
+        # on a later objective line is only raised after them
+        if cache is None:
+            parsed = parallel_map(_parse_row, rows(), jobs)
+        else:
+            parsed = cache.parse_rows(rows(), jobs)
+        for trees in parsed:
+            for tree in trees:
                 var = model.objective.root.var()
                 if var.name in tree.variables:
                     msg = 'Constraint uses objective as variable'
                     raise RuntimeError(msg)
                 model.constraints.append(tree)
-                variables.extend(tree.variables)
-                continue
+                variables.update(dict.fromkeys(tree.variables))
+        if error is not None:
+            raise error
         if model.objective is None:
             msg = 'No objective function found'
             raise RuntimeError(msg)
-        model.variables = prefix_unique(variables)
+        model.variables = prefix_unique(list(variables))
         return model
 
     def __init__(self):
@@ -48,6 +114,14 @@ class Model:
         self.constraints = []
         self.variables = []
 
+    # feasibility and slack (see BoolTree.slack_batch) of every constraint at
+    # many points, given as the values of each variable at every point
+    def evaluate_batch(self, columns):
+        points = Points(columns)
+        feasible = [c.evaluate_batch(points) for c in self.constraints]
+        slacks = [c.slack_batch(points) for c in self.constraints]
+        return feasible, slacks
+
     def __str__(self):
         out = [str(self.objective)]
         out.extend(str(c) for c in self.constraints)
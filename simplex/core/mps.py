@@ -0,0 +1,230 @@
+import fractions
+
+from simplex.parsing import BinaryOp, DecimalFraction, ExprList, Literal, Objective, Variable
+from simplex.parsing import BoolTree, LinearForm, ObjectiveTree
+
+
+SECTIONS = {'NAME', 'OBJSENSE', 'ROWS', 'COLUMNS', 'RHS', 'RANGES', 'BOUNDS', 'ENDATA'}
+ROW_TYPES = {'N': None, 'L': '<=', 'G': '>=', 'E': '=='}
+BOUND_TYPES = {'UP', 'LO', 'FX', 'FR', 'MI', 'PL'}
+INFINITY = 1e30
+
+# fixed format data fields (0-based, end excluded)
+FIXED_FIELDS = [(1, 3), (4, 12), (14, 22), (24, 36), (39, 47), (49, 61)]
+
+
+def _number(text):
+    try:
+        return fractions.Fraction(text)
+    except ValueError:
+        msg = f'Invalid MPS number: {text}'
+        raise RuntimeError(msg) from None
+
+def _literal(value):
+    return Literal(int(value) if value.denominator == 1 else DecimalFraction(value))
+
+def _term(var, value):
+    if value == 1:
+        return Variable(var)
+    return BinaryOp('*', _literal(value), Variable(var))
+
+def _fields(line, section, fixed):
+    if fixed:
+        fields = [line[i:j].strip() for i, j in FIXED_FIELDS]
+        # name fields only: the code field is not used by these sections
+        if section in {'COLUMNS', 'RHS', 'RANGES'}:
+            fields = fields[1:]
+        while fields and not fields[-1]:
+            fields.pop()
+        return fields
+    fields = line.split()
+    # free format allows omitting the RHS/RANGES/BOUNDS set names
+    if section in {'RHS', 'RANGES'} and len(fields) % 2 == 0:
+        fields.insert(0, '')
+    if section == 'BOUNDS' and len(fields) == (2 if fields[0] in {'FR', 'MI', 'PL'} else 3):
+        fields.insert(1, '')
+    return fields
+
+def _pairs(fields):
+    return zip(fields[1::2], map(_number, fields[2::2]))
+
+class MpsReader:
+    def __init__(self, fixed=False):
+        self.fixed = fixed
+        self.mode = 'min'
+        self.objective = None
+        self.rows = {}
+        self.terms = {}
+        self.rhs = {}
+        self.ranges = {}
+        self.columns = {}
+
+    # builds the objective and constraint trees of an MPS file, one line at a
+    # time; entries are grouped by row on the fly so that column-major input
+    # costs a single pass
+    def read(self, lines):
+        section = None
+        for line in lines:
+            if not line.strip() or line.startswith('*'):
+                continue
+            if not line[0].isspace():
+                section, *args = line.split()
+                if section not in SECTIONS:
+                    msg = f'Unknown MPS section: {section}'
+                    raise RuntimeError(msg)
+                if section == 'OBJSENSE' and args:
+                    self.read_objsense(args[0])
+                if section == 'ENDATA':
+                    break
+                continue
+            fields = _fields(line, section, self.fixed)
+            match section:
+                case 'OBJSENSE':
+                    self.read_objsense(line.strip())
+                case 'ROWS':
+                    self.read_row(*fields)
+                case 'COLUMNS':
+                    self.read_column(fields)
+                case 'RHS':
+                    self.read_values(self.rhs, fields)
+                case 'RANGES':
+                    self.read_values(self.ranges, fields)
+                case 'BOUNDS':
+                    self.read_bound(fields)
+                case _:
+                    msg = f'Unexpected MPS data line: {line}'
+                    raise RuntimeError(msg)
+        if self.objective is None:
+            msg = 'No objective function found'
+            raise RuntimeError(msg)
+        return self.build_objective(), list(self.build_constraints())
+
+    def read_objsense(self, sense):
+        match sense.upper():
+            case 'MAX' | 'MAXIMIZE':
+                self.mode = 'max'
+            case 'MIN' | 'MINIMIZE':
+                self.mode = 'min'
+            case _:
+                msg = f'Unknown objective sense: {sense}'
+                raise RuntimeError(msg)
+
+    def read_row(self, kind, name):
+        if kind not in ROW_TYPES:
+            msg = f'Unknown row type: {kind}'
+            raise RuntimeError(msg)
+        if ROW_TYPES[kind] is None:
+            # extra free rows are ignored
+            if self.objective is not None:
+                return
+            self.objective = name
+        self.rows[name] = ROW_TYPES[kind]
+        self.terms[name] = []
+
+    def row(self, name):
+        if name not in self.rows:
+            msg = f'Unknown row: {name}'
+            raise RuntimeError(msg)
+        return name
+
+    def read_column(self, fields):
+        if len(fields) > 1 and fields[1] == "'MARKER'":
+            msg = 'Integer columns are not supported'
+            raise RuntimeError(msg)
+        column = fields[0]
+        self.columns.setdefault(column, [0, None])
+        for name, value in _pairs(fields):
+            self.terms[self.row(name)].append((column, value))
+
+    def read_values(self, values, fields):
+        for name, value in _pairs(fields):
+            values[self.row(name)] = value
+
+    def read_bound(self, fields):
+        kind, _, column = fields[:3]
+        if kind not in BOUND_TYPES:
+            msg = f'Unsupported bound type: {kind}'
+            raise RuntimeError(msg)
+        if column not in self.columns:
+            msg = f'Unknown column: {column}'
+            raise RuntimeError(msg)
+        bounds = self.columns[column]
+        value = _number(fields[3]) if len(fields) > 3 else None
+        match kind:
+            case 'UP':
+                bounds[1] = None if value >= INFINITY else value
+            case 'LO':
+                bounds[0] = None if value <= -INFINITY else value
+            case 'FX':
+                bounds[:] = value, value
+            case 'FR':
+                bounds[:] = None, None
+            case 'MI':
+                bounds[0] = None
+            case 'PL':
+                bounds[1] = None
+
+    def build_objective(self):
+        expr = None
+        for column, value in self.terms[self.objective]:
+            term = _term(column, value)
+            expr = term if expr is None else BinaryOp('+', expr, term)
+        # a right-hand side on the objective row is minus its constant
+        if const := self.rhs.get(self.objective):
+            term = _literal(-const)
+            expr = term if expr is None else BinaryOp('+', expr, term)
+        if expr is None:
+            expr = Literal(0)
+        return ObjectiveTree(Objective(self.mode, Variable(self.objective), expr))
+
+    def build_row(self, name, op, rhs):
+        form = LinearForm()
+        form.op = op
+        form.const = -rhs
+        expr = None
+        for column, value in self.terms[name]:
+            form.add(column, value)
+            term = _term(column, value)
+            expr = term if expr is None else BinaryOp('+', expr, term)
+        return BoolTree.from_linear(BinaryOp(op, expr or Literal(0), _literal(rhs)), form)
+
+    def build_constraints(self):
+        for name, op in self.rows.items():
+            if op is None:
+                continue
+            rhs = self.rhs.get(name, fractions.Fraction(0))
+            if name not in self.ranges:
+                yield self.build_row(name, op, rhs)
+                continue
+            # a range turns the row into lower <= row <= upper
+            r = self.ranges[name]
+            match op:
+                case '<=':
+                    low, high = rhs - abs(r), rhs
+                case '>=':
+                    low, high = rhs, rhs + abs(r)
+                case '==':
+                    low, high = (rhs, rhs + r) if r >= 0 else (rhs + r, rhs)
+            yield self.build_row(name, '>=', low)
+            yield self.build_row(name, '<=', high)
+        nonnegative = []
+        for column, (low, high) in self.columns.items():
+            if low == 0:
+                nonnegative.append(Variable(column))
+            elif low is not None and low == high:
+                yield self.build_bound(column, '==', low)
+                continue
+            elif low is not None:
+                yield self.build_bound(column, '>=', low)
+            if high is not None:
+                yield self.build_bound(column, '<=', high)
+        if nonnegative:
+            root = nonnegative[0] if len(nonnegative) == 1 else ExprList(nonnegative)
+            yield BoolTree(BinaryOp('>=', root, Literal(0)))
+
+    def build_bound(self, column, op, value):
+        form = LinearForm()
+        form.op = op
+        form.add(column, fractions.Fraction(1))
+        form.const = -value
+        return BoolTree.from_linear(BinaryOp(op, Variable(column), _literal(value)), form)
@@ -1,41 +1,145 @@
+import collections
+import fractions
+import json
 import math
+import sys
+import time
 
 from simplex.parsing import (
     BinaryOp,
+    DecimalFraction,
     ExprList,
     ExprTree,
+    LinearForm,
     Literal,
     Objective,
     UnaryOp,
     Variable,
+    equal_nodes,
+    literal_fraction,
 )
 
 
+# normalized roots, shared by all rewriters, as the same cells, ratios and
+# negated cells are normalized again and again. Nodes being hash-consed, a
+# root is its own structural key; the variable order is part of the key as
+# it decides the order of the terms
+class NormalizeCache:
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        if (root := self.entries.get(key)) is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return root
+        self.misses += 1
+        return None
+
+    def put(self, key, root):
+        self.entries[key] = root
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0
+        return f'{self.hits} hits, {self.misses} misses ({rate:.1%} hit rate), {self.evictions} evictions, {len(self)}/{self.maxsize} entries'
+
+
+# firing counts, cumulative time and deepest nesting of visitor calls of each
+# rule of the rewriter, while enabled as a context manager. Visitor calls are
+# timed through sys.setprofile, and a rule names itself in the visitor's
+# `rule` local just before it returns, which is read from the frame on
+# return, so that the visitors make no call for it when no profiler runs. The
+# time of a rule includes the normalization of the nodes it builds
+class RuleProfiler:
+    def __init__(self):
+        self.stats = {}
+        self.visits = 0
+        self.codes = {Rewriter._normalize_visitor.__code__, Rewriter._canonical_visitor.__code__}
+        # start times of the visitor calls in progress
+        self.calls = []
+        self.previous = None
+
+    def _event(self, frame, event, arg):
+        if frame.f_code not in self.codes:
+            return
+        if event == 'call':
+            self.calls.append(time.perf_counter())
+        elif event == 'return':
+            elapsed = time.perf_counter() - self.calls.pop()
+            self.visits += 1
+            rule = frame.f_locals.get('rule')
+            if rule is None:
+                return
+            stats = self.stats.setdefault(rule, [0, 0.0, 0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], len(self.calls) + 1)
+
+    def __enter__(self):
+        self.previous = sys.getprofile()
+        sys.setprofile(self._event)
+        return self
+
+    def __exit__(self, *args):
+        sys.setprofile(self.previous)
+
+    def rows(self):
+        return sorted(((rule, *stats) for rule, stats in self.stats.items()), key=lambda row: (-row[2], row[0]))
+
+    def report(self):
+        out = [f'{self.visits} visits, {sum(stats[0] for stats in self.stats.values())} rewrites']
+        out.append(f'{"count":>9} {"time (s)":>10} {"depth":>6}  rule')
+        for rule, count, elapsed, depth in self.rows():
+            out.append(f'{count:>9} {elapsed:>10.4f} {depth:>6}  {rule}')
+        return '\n'.join(out)
+
+    def to_json(self):
+        rules = [{'rule': rule, 'count': count, 'time': elapsed, 'max_depth': depth} for rule, count, elapsed, depth in self.rows()]
+        return json.dumps({'visits': self.visits, 'rules': rules}, indent=2)
+
+
+# bound on the normal forms a rewriter keeps between normalizations
+NORMALIZED_LIMIT = 65536
+
+# rewriting steps (nodes rewritten) allowed per comparison of the expansion
+# budget
+REWRITE_STEPS = 8
+
+
+# a logical constraint expands into more comparisons, or its normalization
+# takes more steps, than Rewriter.expansion_budget allows
+class ExpansionBudgetExceeded(RuntimeError):
+    pass
+
+
 class Rewriter:
+    # None disables the cache
+    cache = NormalizeCache()
+    # bound on the comparisons a logical constraint may expand into (see
+    # _check_expansion), None disabling it
+    expansion_budget = 32768
+
     def __init__(self):
         self.variables = None
-
-    @classmethod
-    def _almost_literal(cls, node):
-        if isinstance(node, Literal):
-            return True
-        if isinstance(node, UnaryOp):
-            return cls._almost_literal(node.right)
-        if isinstance(node, BinaryOp):
-            return cls._almost_literal(node.left) and cls._almost_literal(node.right)
-        return False
-
-    @classmethod
-    def _almost_variable(cls, node, single=False):
-        if isinstance(node, ExprList):
-            return all(cls._almost_variable(e) for e in node.exprlist)
-        if isinstance(node, Variable):
-            return True
-        if isinstance(node, UnaryOp):
-            return cls._almost_variable(node.right)
-        if isinstance(node, BinaryOp) and (single or node.op == '*'):
-            return cls._almost_literal(node.left) and cls._almost_variable(node.right)
-        return False
+        self.ranks = None
+        self.normalized = {}
+        self.steps = 0
+        self.max_steps = None
 
     @staticmethod
     def _is_unaop(expr, op):
@@ -45,242 +149,500 @@ class Rewriter:
     def _is_binop(expr, op):
         return isinstance(expr, BinaryOp) and expr.op == op
 
-    @classmethod
-    def _nominators(cls, node, acc):
-        if isinstance(node, Literal):
-            return acc | {node.value}
-        if isinstance(node, Variable):
-            return acc | {1}
-        if isinstance(node, ExprList):
-            return acc | {1}
-        if isinstance(node, BinaryOp) and node.op in {'+', '-'}:
-            return cls._nominators(node.right, cls._nominators(node.left, acc))
-        if isinstance(node, BinaryOp) and node.op == '*':
-            return cls._nominators(node.left, acc)
-        return acc
-
-    @classmethod
-    def _denominators(cls, node, acc):
-        if cls._is_binop(node, '/'):
-            return acc | cls._nominators(node.right, set())
-        if isinstance(node, UnaryOp):
-            return cls._denominators(node.right, acc)
-        if isinstance(node, BinaryOp) and node.op in {'+', '-', '*'}:
-            return cls._denominators(node.right, cls._denominators(node.left, acc))
-        return acc
+    # literal fractions that are not integers, printed "a/b"
+    @staticmethod
+    def _is_ratio(expr):
+        return isinstance(expr, Literal) and isinstance(expr.value, fractions.Fraction) and expr.value.denominator != 1
+
+    # literal of an exact value, integers being kept as int
+    @staticmethod
+    def _literal(value):
+        if not isinstance(value, fractions.Fraction):
+            return Literal(value)
+        if value.denominator == 1:
+            return Literal(value.numerator)
+        return Literal(value if value.__class__ is fractions.Fraction else fractions.Fraction(value))
+
+    def _rank(self, name):
+        if self.ranks is None:
+            self.ranks = {v: k for k, v in enumerate(self.variables)}
+        return self.ranks[name]
 
     def _is_unsorted(self, left, right):
-        return self.variables.index(left) > self.variables.index(right)
+        return self._rank(left) > self._rank(right)
+
+    # variable of "x" and "a*x" terms, None for other terms
+    @staticmethod
+    def _term_name(term):
+        if term.__class__ is Variable:
+            return term.name
+        if term.__class__ is BinaryOp and term.op == '*' and term.right.__class__ is Variable:
+            return term.right.name
+        return None
+
+    # order of the terms of a "+" chain: "x" and "a*x" terms by variable,
+    # then constants (other terms only move before constants)
+    def _term_key(self, term):
+        if term.constant:
+            return (1, 0)
+        name = self._term_name(term)
+        return (0, -1 if name is None else self._rank(name))
+
+    # places the last term of a "+" chain in one pass: the chain is
+    # flattened, the terms after the last one term may not move before
+    # (other terms, or its variable) sorted once together with it, and the
+    # chain folded back from there
+    def _insert_term(self, chain, term):
+        chains = [chain]
+        while self._is_binop(chain, '+'):
+            chain = chain.left
+            chains.append(chain)
+        chains.reverse()
+        terms = [c.right if self._is_binop(c, '+') else c for c in chains]
+        name = self._term_name(term)
+        start = len(terms)
+        while start > 0:
+            other = terms[start-1]
+            if not other.constant:
+                if name is None or (other_name := self._term_name(other)) is None or other_name == name:
+                    break
+            start -= 1
+        node = chains[start-1] if start > 0 else None
+        for t in sorted([*terms[start:], term], key=self._term_key):
+            node = t if node is None else self._normalized(BinaryOp('+', node, t))
+        return node
+
+    # terms of a "+" chain in normal form, in the order the rules would
+    # place them one at a time: by _term_key, except that "x" and "a*x"
+    # terms do not move before other terms (which only move before
+    # constants), so that these split the chain into runs sorted each
+    def _sorted_terms(self, terms):
+        run = 0
+        keys = []
+        for term in terms:
+            key = self._term_key(term)
+            if key == (0, -1):
+                run += 1
+            keys.append((key[0], 0 if key[0] else run, key[1]))
+        order = sorted(range(len(terms)), key=keys.__getitem__)
+        return [terms[k] for k in order]
+
+    # Expr.rewrite with _normalized, but for chains of "+" and "-", whose
+    # terms are normalized first (flattening the sums they give), sorted
+    # once, and summed back in that order, which the rules then keep as it
+    # is. The rules alone place each term in turn in the normal form of
+    # the ones before it, rebuilding the chain after it, so that a chain
+    # out of order took steps quadratic in its length
+    def _rewrite(self, root):
+        # nodes are stacked with None until their children are, then with
+        # True, or for chains with the signs of their terms
+        stack = [(root, None)]
+        results = []
+        while stack:
+            node, signs = stack.pop()
+            if signs is None and node.__class__ is BinaryOp and node.op in {'+', '-'}:
+                chain = node
+                terms, signs = [], []
+                while chain.__class__ is BinaryOp and chain.op in {'+', '-'}:
+                    terms.append(chain.right)
+                    signs.append(chain.op == '+')
+                    chain = chain.left
+                terms.append(chain)
+                signs.append(True)
+                signs.reverse()
+                stack.append((node, signs))
+                stack.extend((term, None) for term in terms)
+            elif signs is not None and node.__class__ is BinaryOp and node.op in {'+', '-'}:
+                n = len(results) - len(signs)
+                terms = []
+                for term, sign in zip(results[n:], signs):
+                    if not sign:
+                        term = self._normalized(UnaryOp('-', term))
+                    last = len(terms)
+                    while self._is_binop(term, '+'):
+                        terms.append(term.right)
+                        term = term.left
+                    terms.append(term)
+                    terms[last:] = reversed(terms[last:])
+                del results[n:]
+                if not any(term.__class__ is ExprList for term in terms):
+                    terms = self._sorted_terms(terms)
+                result = terms[0]
+                for term in terms[1:]:
+                    result = self._normalized(BinaryOp('+', result, term))
+                results.append(result)
+            elif signs is None and (children := node.children()):
+                stack.append((node, True))
+                stack.extend((child, None) for child in reversed(children))
+            else:
+                if signs:
+                    children = node.children()
+                    n = len(results) - len(children)
+                    if any(result is not child for result, child in zip(results[n:], children)):
+                        node = node.rebuild(results[n:])
+                    del results[n:]
+                results.append(self._normalized(node))
+        return results[0]
+
+    def _step(self):
+        self.steps += 1
+        if self.steps == self.max_steps:
+            msg = f'more than {self.max_steps} rewriting steps (expansion budget)'
+            raise ExpansionBudgetExceeded(msg)
+
+    # "l op (p op r)" for a left-deep chain "p op r" is rebalanced into
+    # "(l op p) op r", where the rules then rebalance "l op p" in turn. This
+    # is done down the chain in a loop, rather than by the rules recursing
+    # once per term, the inner nodes being normalized and counted as steps
+    # as the rules would, up to one they would not rebalance ("l op l", or
+    # one already normalized)
+    def _rebalanced(self, node):
+        op, left = node.op, node.left
+        pending = [(node, node.right.right)]
+        while True:
+            node = BinaryOp(op, left, node.right.left)
+            if node in self.normalized or not self._is_binop(node.right, op) or equal_nodes(left, node.right):
+                break
+            self._step()
+            pending.append((node, node.right.right))
+        result = self._normalized(node)
+        for k in range(len(pending) - 1, -1, -1):
+            inner, term = pending[k]
+            result = self._normalized(BinaryOp(op, result, term))
+            if k:
+                self.normalized[inner] = result
+        return result
+
+    # "l or (p and r)" is distributed into "(l or p) and (l or r)", where the
+    # rules then distribute "l or p" in turn, and so on down the chain "p"
+    # ("(p and r) or l" likewise). As in _rebalanced, this is done in a loop
+    # rather than by the rules recursing once per clause, which nested "xor"
+    # took past the recursion limit, in the order the rules would, up to a
+    # node they would not distribute ("l or l", or one already normalized)
+    def _distributed(self, node):
+        right = self._is_binop(node.right, 'and')
+        other = node.left if right else node.right
+        pending = []
+        while True:
+            chain = node.right if right else node.left
+            pending.append((node, chain.right))
+            node = BinaryOp('or', other, chain.left) if right else BinaryOp('or', chain.left, other)
+            if node in self.normalized or not self._is_binop(chain.left, 'and') or equal_nodes(other, chain.left):
+                break
+            self._step()
+        result = self._normalized(node)
+        for k in range(len(pending) - 1, -1, -1):
+            outer, clause = pending[k]
+            clause = self._normalized(BinaryOp('or', other, clause) if right else BinaryOp('or', clause, other))
+            result = self._normalized(BinaryOp('and', result, clause))
+            if k:
+                self.normalized[outer] = result
+        return result
+
+    # "not (p and r)" is rewritten into "(not p) or (not r)", where the rules
+    # then rewrite "not p" in turn, and so on down the chain "p" ("not" of
+    # "or", and "-" of "+" or "-", likewise); in a loop, as in _distributed
+    def _pushed(self, node):
+        ops = {'-': {'+': '+', '-': '-'}, 'not': {'and': 'or', 'or': 'and'}}[node.op]
+        pending = []
+        while True:
+            chain = node.right
+            pending.append((node, ops[chain.op], chain.right))
+            node = UnaryOp(node.op, chain.left)
+            if node in self.normalized or not (chain.left.__class__ is BinaryOp and chain.left.op in ops):
+                break
+            self._step()
+        result = self._normalized(node)
+        for k in range(len(pending) - 1, -1, -1):
+            outer, op, term = pending[k]
+            term = self._normalized(UnaryOp(outer.op, term))
+            result = self._normalized(BinaryOp(op, result, term))
+            if k:
+                self.normalized[outer] = result
+        return result
+
+    # normal form of a node whose children are in normal form. Nodes being
+    # hash-consed, each distinct node is rewritten once per normalization and
+    # looked up afterwards, rules building the same nodes again and again
+    # (chains of "+" sorted term by term, negations built to be compared,
+    # "or" distributed over both sides of an "and")
+    def _normalized(self, node):
+        if (result := self.normalized.get(node)) is None:
+            self._step()
+            result = self.normalized[node] = self._normalize_visitor(node)
+        return result
 
     def _normalize_visitor(self, node):
         def unaop(op, right):
-            return self._normalize_visitor(UnaryOp(op, right))
+            return self._normalized(UnaryOp(op, right))
         def binop(op, left, right):
-            return self._normalize_visitor(BinaryOp(op, left, right))
+            return self._normalized(BinaryOp(op, left, right))
 
         match node:
             case Literal():
-                if '.' in str(node.value):
-                    i = int(node.value)
-                    f = node.value - i
-                    n = len(str(f)) - 2
-                    if f == 0:
-                        return Literal(i)
-                    return binop('/', Literal(int(10**n*node.value)), Literal(10**n))
+                # exact values for decimals
+                if isinstance(node.value, DecimalFraction):
+                    rule = 'exact decimal'
+                    return self._literal(literal_fraction(node.value))
 
             case Objective():
                 if isinstance(node.left, BinaryOp):
                     if isinstance(node.left.left, Literal):
                         if node.left.left.value > 0:
+                            rule = 'objective coefficient'
                             return Objective(node.mode, node.left.right, binop('/', node.right, node.left.left))
                         if node.left.left.value != -1:
+                            rule = 'objective negative coefficient'
                             return Objective(node.mode, unaop('-', node.left.right), binop('/', node.right, node.left.left))
                     elif self._is_binop(node.left.left, '/'):
                         if node.left.left.left.value > 0:
+                            rule = 'objective fraction coefficient'
                             return Objective(node.mode, node.left.right, binop('*', binop('/', node.left.left.right, node.left.left.left), node.right))
                         if node.left.left.left.value != -1:
+                            rule = 'objective negative fraction coefficient'
                             return Objective(node.mode, unaop('-', node.left.right), binop('*', binop('/', node.left.left.right, node.left.left.left), node.right))
 
             case UnaryOp():
                 # rewrite expression lists
                 if isinstance(node.right, ExprList):
+                    rule = 'unary over list'
                     return ExprList([unaop(node.op, e) for e in node.right.exprlist])
                 # rewrite unary "-"
                 if node.op == '-':
                     if isinstance(node.right, Literal):
+                        rule = 'negate literal'
                         return Literal(-node.right.value)
                     if isinstance(node.right, Variable):
+                        rule = 'negate variable'
                         return binop('*', Literal(-1), node.right)
                     if isinstance(node.right, UnaryOp) and node.right.op == '-':
+                        rule = 'double negation'
                         return node.right.right
                     if isinstance(node.right, BinaryOp):
                         if node.right.op in ('*', '/'):
+                            rule = 'negate product'
                             return binop(node.right.op, unaop(node.op, node.right.left), node.right.right)
                         if node.right.op in ('+', '-'):
-                            return binop(node.right.op, unaop(node.op, node.right.left), unaop(node.op, node.right.right))
+                            rule = 'negate sum'
+                            return self._pushed(node)
                 # simplify and distribute "not"
                 if node.op == 'not':
-                    if str(node.right) == 'True':
+                    if equal_nodes(node.right, Literal(True)):
+                        rule = 'not true'
                         return Literal(False)
-                    if str(node.right) == 'False':
+                    if equal_nodes(node.right, Literal(False)):
+                        rule = 'not false'
                         return Literal(True)
                     if isinstance(node.right, UnaryOp) and node.right.op == 'not':
+                        rule = 'double not'
                         return node.right.right
                     if isinstance(node.right, BinaryOp):
                         if node.right.op == 'or':
-                            return binop('and', unaop('not', node.right.left), unaop('not', node.right.right))
+                            rule = 'not of or'
+                            return self._pushed(node)
                         if node.right.op == 'and':
-                            return binop('or', unaop('not', node.right.left), unaop('not', node.right.right))
+                            rule = 'not of and'
+                            return self._pushed(node)
                         h = {'>': '<=', '<': '>=', '>=': '<', '<=': '>', '==': '!=', '!=': '=='}
+                        rule = 'not of comparison'
                         return binop(h[node.right.op], node.right.left, node.right.right)
 
             case BinaryOp():
                 # rewrite expression lists
                 if isinstance(node.left, ExprList):
+                    rule = 'binary over left list'
                     return ExprList([binop(node.op, e, node.right) for e in node.left.exprlist])
                 if isinstance(node.right, ExprList):
+                    rule = 'binary over right list'
                     return ExprList([binop(node.op, node.left, e) for e in node.right.exprlist])
                 # rewrite binary "-"
                 if node.op == '-':
+                    rule = 'subtraction'
                     return binop('+', node.left, unaop('-', node.right))
                 if node.op == '*':
                     # simplify "*0" to avoid inf*0
                     if isinstance(node.right, Literal) and node.right.value == 0:
+                        rule = 'times zero'
                         return node.right
                     # simplify "0*"
                     if isinstance(node.left, Literal) and node.left.value == 0:
+                        rule = 'zero times'
                         return node.left
                     # simplify "1*"
                     if isinstance(node.left, Literal) and node.left.value == 1:
+                        rule = 'one times'
                         return node.right
                     # reduce literals ; move literals left
                     if isinstance(node.right, Literal):
                         if isinstance(node.left, Literal):
-                            return Literal(node.left.value * node.right.value)
+                            rule = 'multiply literals'
+                            return self._literal(node.left.value * node.right.value)
+                        rule = 'literal left of product'
                         return binop('*', node.right, node.left)
                     # distribute "*" inside "+"; reduce stacks of "*"
                     if isinstance(node.left, Literal):
                         if self._is_binop(node.right, '+'):
+                            rule = 'distribute product over sum'
                             return binop('+', binop('*', node.left, node.right.left), binop('*', node.left, node.right.right))
                         if self._is_binop(node.right, '*'):
+                            rule = 'flatten product'
                             return binop('*', binop('*', node.left, node.right.left), node.right.right)
                     # distribute "*" inside "/"
                     if isinstance(node.right, BinaryOp) and node.right.op == '/':
+                            rule = 'distribute product over division'
                             return binop('/', binop('*', node.left, node.right.left), node.right.right)
                 if node.op == '/':
                     # move variables outside divisions
                     if isinstance(node.left, Variable):
+                        rule = 'variable out of division'
                         return binop('*', binop('/', Literal(1), node.right), node.left)
                     if self._is_binop(node.left, '*'):
+                        rule = 'product out of division'
                         return binop('*', binop('/', node.left.left, node.right), node.left.right)
                     if self._is_binop(node.left, '+'):
+                        rule = 'sum out of division'
                         return binop('+', binop('/', node.left.left, node.right), binop('/', node.left.right, node.right))
-                    # simplify literal fractions
+                    # simplify literal fractions, infinite literals being the
+                    # only floats
                     if isinstance(node.left, Literal) and isinstance(node.right, Literal):
                         if abs(node.left.value) == float('inf'):
                             if abs(node.right.value) == float('inf'):
-                                return (1 if node.left.value > 0 else -1) * (1 if node.right.value > 0 else -1)
-                            return node.left
-                        if node.right.value == 1:
-                            return node.left
-                        if node.left.value == node.right.value:
-                            return Literal(1)
-                        if node.right.value < 0:
-                            return binop('/', Literal(-node.left.value), Literal(-node.right.value))
-                        gcd = math.gcd(node.left.value, node.right.value)
-                        if gcd != 1:
-                            return binop('/', Literal(node.left.value//gcd), Literal(node.right.value//gcd))
+                                rule = 'infinite ratio'
+                                return Literal((1 if node.left.value > 0 else -1) * (1 if node.right.value > 0 else -1))
+                            rule = 'infinite numerator'
+                            return Literal(node.left.value if node.right.value > 0 else -node.left.value)
+                        if abs(node.right.value) == float('inf'):
+                            rule = 'infinite denominator'
+                            return Literal(0)
+                        rule = 'exact fraction'
+                        return self._literal(fractions.Fraction(node.left.value, node.right.value))
                     # unify fractions
                     if self._is_binop(node.left, '/'):
+                        rule = 'division of division'
                         return binop('/', node.left.left, binop('*', node.left.right, node.right))
                     if self._is_binop(node.right, '/'):
+                        rule = 'division by division'
                         return binop('/', binop('*', node.left, node.right.right), node.right.left)
                 if node.op == '+':
                     # simplify "+0"
                     if isinstance(node.right, Literal) and node.right.value == 0:
+                        rule = 'plus zero'
                         return node.left
                     # linearize "+" trees
                     if self._is_binop(node.right, '+'):
+                        rule = 'linearize sum'
                         return binop('+', binop('+', node.left, node.right.left), node.right.right)
                     # reduce literals
                     if isinstance(node.left, Literal):
                         if isinstance(node.right, Literal):
-                            return Literal(node.left.value + node.right.value)
+                            rule = 'add literals'
+                            return self._literal(node.left.value + node.right.value)
+                        rule = 'literal right of sum'
                         return binop('+', node.right, node.left)
                     # reduces single variables
                     if isinstance(node.left, Variable) and isinstance(node.right, Variable) and node.left.name == node.right.name:
+                        rule = 'double variable'
                         return BinaryOp('*', Literal(2), node.left)
                     # move literals right
-                    if self._almost_literal(node.left) and not self._almost_literal(node.right):
+                    if node.left.constant and not node.right.constant:
+                        rule = 'constant right of sum'
                         return binop('+', node.right, node.left)
                     # reduces fractions
                     if self._is_binop(node.left, '/'):
+                        rule = 'sum with fraction'
                         return binop('/', binop('+', node.left.left, binop('*', node.left.right, node.right)), node.left.right)
                     # reduces stacks of "+" ; combines literals in "+" trees ; reorder variables
                     if self._is_binop(node.left, '+'):
-                        if self._almost_literal(node.left.right):
-                            if self._almost_literal(node.right):
+                        if node.left.right.constant:
+                            if node.right.constant:
+                                rule = 'add trailing constants'
                                 return binop('+', node.left.left, binop('+', node.left.right, node.right))
-                            return binop('+', binop('+', node.left.left, node.right), node.left.right)
+                            rule = 'move term before constant'
+                            return self._insert_term(node.left, node.right)
                         if isinstance(node.left.right, Variable) and isinstance(node.right, Variable):
                             if node.left.right.name == node.right.name:
+                                rule = 'double last variable'
                                 return binop('+', node.left.left, BinaryOp('*', Literal(2), node.right))
                             if self._is_unsorted(node.left.right.name, node.right.name):
-                                return binop('+', binop('+', node.left.left, node.right), node.left.right)
+                                rule = 'sort variables'
+                                return self._insert_term(node.left, node.right)
                         if self._is_binop(node.left.right, '*') and isinstance(node.left.right.right, Variable) and isinstance(node.right, Variable):
                             if node.left.right.right.name == node.right.name:
+                                rule = 'merge variable into product'
                                 return binop('+', node.left.left, binop('*', binop('+', node.left.right.left, Literal(1)), node.right))
                             if self._is_unsorted(node.left.right.right.name, node.right.name):
-                                return binop('+', binop('+', node.left.left, node.right), node.left.right)
+                                rule = 'sort variable after product'
+                                return self._insert_term(node.left, node.right)
                         if isinstance(node.left.right, Variable) and self._is_binop(node.right, '*') and isinstance(node.right.right, Variable):
                             if node.left.right.name == node.right.right.name:
+                                rule = 'merge product into variable'
                                 return binop('+', node.left.left, binop('*', binop('+', node.right.left, Literal(1)), node.left.right))
                             if self._is_unsorted(node.left.right.name, node.right.right.name):
-                                return binop('+', binop('+', node.left.left, node.right), node.left.right)
+                                rule = 'sort product after variable'
+                                return self._insert_term(node.left, node.right)
                         if self._is_binop(node.left.right, '*') and isinstance(node.left.right.right, Variable) and self._is_binop(node.right, '*') and isinstance(node.right.right, Variable):
                             if node.left.right.right.name == node.right.right.name:
-                                return binop('+', node.left.left, binop('*', binop('+', node.right.left, Literal(1)), node.right.right))
+                                rule = 'merge products'
+                                return binop('+', node.left.left, binop('*', binop('+', node.left.right.left, node.right.left), node.right.right))
                             if self._is_unsorted(node.left.right.right.name, node.right.right.name):
-                                return binop('+', binop('+', node.left.left, node.right), node.left.right)
+                                rule = 'sort products'
+                                return self._insert_term(node.left, node.right)
                     # reduces and reorder variables
+                    if isinstance(node.left, Variable) and isinstance(node.right, Variable) and self._is_unsorted(node.left.name, node.right.name):
+                        rule = 'swap variables'
+                        return binop('+', node.right, node.left)
                     if isinstance(node.left, Variable) and self._is_binop(node.right, '*') and isinstance(node.right.right, Variable):
                         if node.right.right.name == node.left.name:
+                            rule = 'merge variable and product'
                             return binop('*', binop('+', node.right.left, Literal(1)), node.left)
                         if self._is_unsorted(node.left.name, node.right.right.name):
+                            rule = 'swap variable and product'
                             return binop('+', node.right, node.left)
                     if isinstance(node.right, Variable) and self._is_binop(node.left, '*') and isinstance(node.left.right, Variable):
                         if node.left.right.name == node.right.name:
+                            rule = 'merge product and variable'
                             return binop('*', binop('+', node.left.left, Literal(1)), node.right)
                         if self._is_unsorted(node.left.right.name, node.right.name):
+                            rule = 'swap product and variable'
                             return binop('+', node.right, node.left)
                     if self._is_binop(node.left, '*') and isinstance(node.left.right, Variable) and self._is_binop(node.right, '*') and isinstance(node.right.right, Variable):
                         if node.left.right.name == node.right.right.name:
+                            rule = 'add products'
                             return binop('*', binop('+', node.left.left, node.right.left), node.right.right)
                         if self._is_unsorted(node.left.right.name, node.right.right.name):
+                            rule = 'swap products'
                             return binop('+', node.right, node.left)
                 # rewrite xor
                 if node.op == 'xor':
+                    rule = 'xor'
                     return binop('and', binop('or', node.left, node.right), unaop('not', binop('and', node.left, node.right)))
                 # rewrite if
                 if node.op == 'if':
+                    rule = 'if'
                     return binop('or', node.left, unaop('not', node.right))
                 # rewrite iif
                 if node.op == 'iif':
+                    rule = 'iif'
                     return binop('and', binop('if', node.left, node.right), binop('if', node.right, node.left))
                 # simplify and
                 if node.op == 'and':
-                    if str(node.left) == str(node.right):
+                    if equal_nodes(node.left, node.right):
+                        rule = 'and of itself'
                         return node.left
-                    if str(node.left) == 'True' or str(node.right) == 'False':
+                    if equal_nodes(node.left, Literal(True)) or equal_nodes(node.right, Literal(False)):
+                        rule = 'and keeps right'
                         return node.right
-                    if str(node.left) == 'False' or str(node.right) == 'True':
+                    if equal_nodes(node.left, Literal(False)) or equal_nodes(node.right, Literal(True)):
+                        rule = 'and keeps left'
                         return node.left
-                    if self._almost_variable(node.left) and self._almost_variable(node.right):
-                        if str(node.left) == str(unaop('not', node.right)):
+                    if node.left.monomial and node.right.monomial:
+                        if equal_nodes(node.left, unaop('not', node.right)):
+                            rule = 'and contradiction'
                             return Literal(False)
                     # rebalance left
                     if self._is_binop(node.right, 'and'):
-                        return binop('and', binop('and', node.left, node.right.left), node.right.right)
+                        rule = 'rebalance and'
+                        return self._rebalanced(node)
                     # sort and variables
                     if self._is_binop(node.left, 'and'):
                         tmp_l = node.left.right
@@ -290,26 +652,34 @@ class Rewriter:
                         if self._is_unaop(tmp_r, 'not'):
                             tmp_r = tmp_r.right
                         if isinstance(tmp_l, Variable) and isinstance(tmp_r, Variable) and self._is_unsorted(tmp_l.name, tmp_r.name):
+                            rule = 'sort and'
                             return binop('and', binop('and', node.left.left, node.right), node.left.right)
                 # simplify or
                 if node.op == 'or':
-                    if str(node.left) == str(node.right):
+                    if equal_nodes(node.left, node.right):
+                        rule = 'or of itself'
                         return node.left
-                    if str(node.left) == 'True' or str(node.right) == 'False':
+                    if equal_nodes(node.left, Literal(True)) or equal_nodes(node.right, Literal(False)):
+                        rule = 'or keeps left'
                         return node.left
-                    if str(node.left) == 'False' or str(node.right) == 'True':
+                    if equal_nodes(node.left, Literal(False)) or equal_nodes(node.right, Literal(True)):
+                        rule = 'or keeps right'
                         return node.right
-                    if self._almost_variable(node.left) and self._almost_variable(node.right):
-                        if str(node.left) == str(unaop('not', node.right)):
+                    if node.left.monomial and node.right.monomial:
+                        if equal_nodes(node.left, unaop('not', node.right)):
+                            rule = 'or tautology'
                             return Literal(True)
                     # rebalance left
                     if self._is_binop(node.right, 'or'):
-                        return binop('or', binop('or', node.left, node.right.left), node.right.right)
+                        rule = 'rebalance or'
+                        return self._rebalanced(node)
                     # distribute or
                     if self._is_binop(node.right, 'and'):
-                        return binop('and', binop('or', node.left, node.right.left), binop('or', node.left, node.right.right))
+                        rule = 'distribute or over right and'
+                        return self._distributed(node)
                     if self._is_binop(node.left, 'and'):
-                        return binop('and', binop('or', node.left.left, node.right), binop('or', node.left.right, node.right))
+                        rule = 'distribute or over left and'
+                        return self._distributed(node)
                     # sort or variables
                     if self._is_binop(node.left, 'or'):
                         tmp_l = node.left.right
@@ -319,72 +689,271 @@ class Rewriter:
                         if self._is_unaop(tmp_r, 'not'):
                             tmp_r = tmp_r.right
                         if isinstance(tmp_l, Variable) and isinstance(tmp_r, Variable) and self._is_unsorted(tmp_l.name, tmp_r.name):
+                            rule = 'sort or'
                             return binop('or', binop('or', node.left.left, node.right), node.left.right)
                 if node.op in {'<', '>', '<=', '>=', '==', '!='}:
-                    if self._almost_literal(node.left):
-                        if self._almost_literal(node.right):
+                    if node.left.constant:
+                        if node.right.constant:
+                            rule = 'evaluate comparison'
                             return Literal(node.evaluate({}))
+                        rule = 'constant left of comparison'
                         return binop(node.op, unaop('-', node.right), unaop('-', node.left))
-                    if not self._almost_literal(node.right):
+                    if not node.right.constant:
+                        rule = 'variables left of comparison'
                         return binop(node.op, binop('-', node.left, node.right), Literal(0))
                     if self._is_binop(node.left, '+'):
-                        if self._almost_literal(node.left.right):
+                        if node.left.right.constant:
+                            rule = 'constant right of comparison'
                             return binop(node.op, node.left.left, binop('-', node.right, node.left.right))
+                    if self._is_ratio(node.right):
+                        rule = 'ratio right of comparison'
+                        return binop(node.op, binop('*', Literal(node.right.value.denominator), node.left), Literal(node.right.value.numerator))
                     if self._is_binop(node.right, '/'):
+                        rule = 'fraction right of comparison'
                         return binop(node.op, binop('*', node.right.right, node.left), node.right.left)
-                    if coefs := list(self._denominators(node.left, set())):
+                    if coefs := list(node.left.denominators()):
+                        rule = 'clear denominators'
                         return binop(node.op, binop('*', Literal(max(coefs)), node.left), binop('*', Literal(max(coefs)), node.right))
-                    coefs = list(self._nominators(node.left, set()))
-                    tmp = list(self._nominators(node.right, set()))
+                    coefs = list(node.left.nominators())
+                    tmp = list(node.right.nominators())
                     if 1 not in coefs:
                         if tmp != [0]:
                             coefs.append(tmp[0])
                         g = math.gcd(*[abs(x) for x in coefs])
                         if g > 1:
+                            rule = 'divide by common divisor'
                             return binop(node.op, binop('/', node.left, Literal(g)), binop('/', node.right, Literal(g)))
                 if node.op == '<':
+                    rule = 'strict less'
                     return binop('<=', node.left, node.right)
                 if node.op == '>':
+                    rule = 'strict greater'
                     return binop('>=', node.left, node.right)
                 if node.op == '>=':
                     if isinstance(node.right, Literal) and node.right.value == 0 and self._is_binop(node.left, '*'):
                         if node.left.left.value > 0:
+                            rule = 'positive multiple >='
                             return binop('>=', node.left.right, node.right)
+                        rule = 'negative multiple >='
                         return binop('<=', node.left.right, node.right)
                 if node.op == '<=':
                     if isinstance(node.right, Literal) and node.right.value == 0 and self._is_binop(node.left, '*'):
                         if node.left.left.value > 0:
+                            rule = 'positive multiple <='
                             return binop('<=', node.left.right, node.right)
+                        rule = 'negative multiple <='
                         return binop('>=', node.left.right, node.right)
         return node
 
     def _canonical_visitor(self, node):
         def unaop(op, right):
-            return self._normalize_visitor(UnaryOp(op, right))
+            return self._normalized(UnaryOp(op, right))
         def binop(op, left, right):
-            return self._normalize_visitor(BinaryOp(op, left, right))
+            return self._normalized(BinaryOp(op, left, right))
 
         match node:
             case Objective():
                 if node.mode == 'min':
+                    rule = 'min to max'
                     return Objective('max', unaop('-', node.left), unaop('-', node.right))
             case BinaryOp():
                 if node.op == '==':
+                    rule = '== to <= and >='
                     return binop('and', binop('<=', node.left, node.right), binop('>=', node.left, node.right))
                 if node.op == '!=':
+                    rule = '!= to < or >'
                     return binop('or', binop('<', node.left, node.right), binop('>', node.left, node.right))
                 if node.op == '>=':
+                    rule = '>= to <='
                     return binop('<=', unaop('-', node.left), unaop('-', node.right))
         return node
 
     def normalize_tree(self, tree):
-        tmp = ExprTree(tree)
+        tmp = ExprTree.from_root(tree)
         self.normalize(tmp)
         return tmp.root
 
+    # the normal form the rules give linear forms, for both the rows of the
+    # parser and the expressions of _linear_form: terms in variable order, as
+    # "x" or "a*x"; expressions keep exact coefficients and end with their
+    # constant, comparisons get integer coefficients without common divisor
+    # and the constant on the right-hand side
+    def _linear_root(self, linear):
+        coefs = {k: v for k, v in linear.coefs.items() if v != 0}
+        const = linear.const
+        op = linear.op
+        if op is not None:
+            if not coefs:
+                return None
+            values = [*coefs.values(), -const]
+            scale = math.lcm(*(v.denominator for v in values))
+            values = [int(v*scale) for v in values]
+            g = math.gcd(*values)
+            coefs = dict(zip(coefs, (v//g for v in values)))
+            const = values[-1]//g
+            op = {'<': '<=', '>': '>='}.get(op, op)
+        expr = None
+        for var in sorted(coefs, key=self._rank):
+            coef = coefs[var]
+            term = Variable(var) if coef == 1 else BinaryOp('*', self._literal(coef), Variable(var))
+            expr = term if expr is None else BinaryOp('+', expr, term)
+        if op is None:
+            if expr is None:
+                return self._literal(const)
+            return expr if const == 0 else BinaryOp('+', expr, self._literal(const))
+        if len(coefs) == 1 and const == 0 and coef == -1 and op in {'<=', '>='}:
+            expr = Variable(var)
+            op = '>=' if op == '<=' else '<='
+        return BinaryOp(op, expr, Literal(const))
+
+    # numeric expression linear in its variables as a LinearForm with exact
+    # (int or Fraction) coefficients, in one pass, or comparison of two such
+    # expressions as the form of left minus right with its operator; None
+    # for anything else (booleans, non-linear products, division by zero or
+    # by an expression with variables, infinite values)
+    @staticmethod
+    def _linear_form(root):
+        comparison = root.op if root.__class__ is BinaryOp and root.op in {'<', '>', '<=', '>=', '==', '!='} else None
+        stack = [(root.right, False), (root.left, False)] if comparison else [(root, False)]
+        results = []
+        while stack:
+            node, done = stack.pop()
+            cls = node.__class__
+            if cls is Literal:
+                value = node.value
+                if value.__class__ is int or isinstance(value, fractions.Fraction):
+                    results.append(({}, value))
+                else:
+                    return None
+            elif cls is Variable:
+                results.append(({node.name: 1}, 0))
+            elif cls is UnaryOp and node.op == '-':
+                if not done:
+                    stack.append((node, True))
+                    stack.append((node.right, False))
+                    continue
+                coefs, const = results.pop()
+                results.append(({k: -v for k, v in coefs.items()}, -const))
+            elif cls is BinaryOp and node.op in {'+', '-', '*', '/'}:
+                if not done:
+                    stack.append((node, True))
+                    stack.append((node.right, False))
+                    stack.append((node.left, False))
+                    continue
+                right, right_const = results.pop()
+                left, left_const = results.pop()
+                op = node.op
+                if op == '+' or op == '-':
+                    sign = 1 if op == '+' else -1
+                    for k, v in right.items():
+                        left[k] = left.get(k, 0) + sign*v
+                    results.append((left, left_const + sign*right_const))
+                elif op == '*':
+                    if left and right:
+                        return None
+                    coefs, scale = (left, right_const) if left else (right, left_const)
+                    results.append(({k: scale*v for k, v in coefs.items()}, left_const*right_const))
+                else:
+                    if right or right_const == 0:
+                        return None
+                    results.append(({k: fractions.Fraction(v, right_const) for k, v in left.items()}, fractions.Fraction(left_const, right_const)))
+            else:
+                return None
+        form = LinearForm()
+        form.coefs, form.const = results[0]
+        if comparison is not None:
+            right, right_const = results[1]
+            for k, v in right.items():
+                form.add(k, -v)
+            form.add(None, -right_const)
+            form.op = comparison
+        return form
+
+    # the rules turn logical constraints into conjunctions of disjunctions
+    # bottom-up, so that a "not", "xor" or "iif" over an expanded operand
+    # negates it as a whole, and nested ones grow exponentially. The clauses
+    # each node expands into are counted by length first, in one pass over
+    # the connectives, and constraints over the budget are refused before
+    # the rules start
+    def _check_expansion(self, root):
+        def conj(a, b):
+            return a + b
+        def disj(a, b):
+            return collections.Counter({la + lb: ca*cb for la, ca in a.items() for lb, cb in b.items()})
+        def neg(a):
+            # one comparison out of each clause, for every choice
+            return collections.Counter({a.total(): math.prod(length**count for length, count in a.items())})
+        def size(a):
+            return sum(length*count for length, count in a.items())
+        stack = [(root, False)]
+        results = []
+        while stack:
+            node, done = stack.pop()
+            if node.__class__ is ExprList or node.__class__ is UnaryOp and node.op == 'not' or node.__class__ is BinaryOp and node.op in {'and', 'or', 'xor', 'if', 'iif'}:
+                if not done:
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in reversed(node.children()))
+                    continue
+            else:
+                results.append(collections.Counter({1: 1}))
+                continue
+            if node.__class__ is ExprList:
+                n = len(results) - len(node.exprlist)
+                clauses = sum(results[n:], collections.Counter())
+                del results[n:]
+            elif node.__class__ is UnaryOp:
+                clauses = neg(results.pop())
+            else:
+                right = results.pop()
+                left = results.pop()
+                clauses = {
+                    'and': lambda: conj(left, right),
+                    'or': lambda: disj(left, right),
+                    'if': lambda: disj(left, neg(right)),
+                    'xor': lambda: conj(disj(left, right), neg(conj(left, right))),
+                    'iif': lambda: conj(disj(left, neg(right)), disj(right, neg(left))),
+                }[node.op]()
+            if size(clauses) > self.expansion_budget:
+                msg = f'"{node}" expands into more than the expansion budget of {self.expansion_budget} comparisons'
+                raise ExpansionBudgetExceeded(msg)
+            results.append(clauses)
+
     def normalize(self, program):
-        self.variables = program.variables[:]
-        program.root = program.root.rewrite(self._normalize_visitor)
+        # normal forms depend on the variable order, and are kept while it
+        # stays the same, such as for all the cells of a pivot
+        if program.variables != self.variables or len(self.normalized) > NORMALIZED_LIMIT:
+            self.variables = list(program.variables)
+            self.ranks = None
+            self.normalized = {}
+        if program.linear and (root := self._linear_root(program.linear)):
+            program.root = root
+            return
+        if self.cache is not None:
+            key = (program.root, tuple(self.variables))
+            if (root := self.cache.get(key)) is not None:
+                program.root = root
+                return
+        linear = self._linear_form(program.root)
+        if linear is None or (root := self._linear_root(linear)) is None:
+            if self.expansion_budget is not None:
+                self._check_expansion(program.root)
+            # rebalancing nested chains takes steps quadratic in their length,
+            # which the budget also bounds
+            self.steps = 0
+            self.max_steps = None if self.expansion_budget is None else REWRITE_STEPS*self.expansion_budget
+            try:
+                root = self._rewrite(program.root)
+            except RecursionError:
+                msg = f'"{program.root}" is nested too deeply to be normalized'
+                raise RuntimeError(msg) from None
+            except ExpansionBudgetExceeded as e:
+                msg = f'"{program.root}" takes {e}'
+                raise ExpansionBudgetExceeded(msg) from None
+            finally:
+                self.max_steps = None
+        if self.cache is not None:
+            self.cache.put(key, root)
+        program.root = root
 
     def do_canonical(self, program):
         self.normalize(program)
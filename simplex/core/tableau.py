@@ -1,12 +1,14 @@
 from simplex.parsing import BinaryOp, Literal, UnaryOp, Variable
-from simplex.parsing import MathTree
+from simplex.parsing import ArenaDict, MathTree, equal_nodes
 from simplex.utils import prefix_unique
 
 from .rewriter import Rewriter
 
 
 class Tableau:
-    def __init__(self, objective, constraints, basis):
+    # with an arena, lines hold their cells as arena ids (see ArenaDict)
+    def __init__(self, objective, constraints, basis, arena=None):
+        self.arena = arena
         tmp = objective.variables
         tmp.remove(objective.root.var().name)
         for c in constraints:
@@ -19,23 +21,26 @@ class Tableau:
         self.data = []
         tmp = {}
         for k, v in self.aux_data(self.objective.root.right, self.columns).items():
-            t = MathTree(UnaryOp('-', v) if k else v)
+            t = MathTree.from_root(UnaryOp('-', v) if k else v)
             Rewriter().normalize(t)
             tmp[k] = t.root
-        self.data.append(tmp)
+        self.data.append(self.line(tmp))
         for c in self.constraints:
             if c.root.op == '==':
                 tmp = self.aux_data(c.root.left, self.columns)
                 for k, v in self.aux_data(c.root.right, self.columns).items():
                     tmp[k] = BinaryOp('-', tmp[k], v)
                 for k, v in tmp.items():
-                    t = MathTree(v if k else UnaryOp('-', v))
+                    t = MathTree.from_root(v if k else UnaryOp('-', v))
                     Rewriter().normalize(t)
                     tmp[k] = t.root
-                self.data.append(tmp)
+                self.data.append(self.line(tmp))
         self.basis = basis
         assert len(basis) == len([c for c in constraints if c.root.op == '=='])
 
+    def line(self, cells):
+        return cells if self.arena is None else ArenaDict(self.arena, cells)
+
     def delete(self, oldvar):
         assert oldvar in self.variables
         assert oldvar not in self.basis
@@ -65,7 +70,7 @@ class Tableau:
                 acc[''] = node
         tree.visit(visitor)
         for k, v in acc.items():
-            tmp = MathTree(v)
+            tmp = MathTree.from_root(v)
             Rewriter().normalize(tmp)
             acc[k] = tmp.root
         return dict(acc)
@@ -82,9 +87,9 @@ class Tableau:
 
     @staticmethod
     def aux_art_coefs(row_out, candidates):
-        num = row_out[''].evaluate({})
+        num = row_out[''].compile()({})
         def coef(v):
-            denum = row_out[v].evaluate({})
+            denum = row_out[v].compile()({})
             return float('-inf') if denum == 0 else num/denum
         return {v: coef(v) for v in candidates}
 
@@ -98,25 +103,33 @@ class Tableau:
 
         # normalize pivot line
         coef = line_out[var_in]
-        assert str(coef) != '0'
-        if str(coef) != '1':
+        assert not equal_nodes(coef, Literal(0))
+        new_out = {v: line_out[v] for v in self.columns}
+        if not equal_nodes(coef, Literal(1)):
             for v in self.columns:
-                line_out[v] = BinaryOp('/', line_out[v], coef)
+                new_out[v] = BinaryOp('/', new_out[v], coef)
 
         # update all other lines
+        new_lines = []
         for j, line in enumerate(self.data):
             if j == i:
+                new_lines.append(new_out)
                 continue
             coef = line[var_in]
-            for v in self.columns:
-                line[v] = BinaryOp('-', line[v], BinaryOp('*', coef, line_out[v]))
+            new_lines.append({v: BinaryOp('-', line[v], BinaryOp('*', coef, new_out[v])) for v in self.columns})
 
-        # simplify expressions
-        for line in self.data:
+        # simplify expressions, only storing the results; cells sharing their
+        # variables, one rewriter reuses the normal forms of their common
+        # subexpressions
+        rewriter = Rewriter()
+        for line, new in zip(self.data, new_lines):
             for v in self.columns:
-                expr = MathTree(line[v])
-                Rewriter().normalize(expr)
+                expr = MathTree.from_root(new[v])
+                rewriter.normalize(expr)
                 line[v] = expr.root
+        # the cells replaced by this pivot leave ids that no line holds
+        if self.arena is not None:
+            self.arena.collect()
 
         # update basis and columns
         self.basis[self.basis.index(var_out)] = var_in
@@ -1,5 +1,5 @@
 from simplex.core import AbstractFormatter, Rewriter
-from simplex.parsing import BinaryOp, ExprList, ExprTree, Literal, Variable
+from simplex.parsing import BinaryOp, ExprList, ExprTree, Literal, Variable, decimal_value
 from simplex.utils import prefix_sort
 
 
@@ -52,9 +52,9 @@ class AbstractCliFormatter(AbstractFormatter):
             else:
                 out.append(str(e))
         if neg_var:
-            out.append(str(BinaryOp('<=', ExprList(prefix_sort(neg_var)), Literal(0))))
+            out.append(str(BinaryOp('<=', ExprList([Variable(v) for v in prefix_sort(neg_var)]), Literal(0))))
         if pos_var:
-            out.append(str(BinaryOp('>=', ExprList(prefix_sort(pos_var)), Literal(0))))
+            out.append(str(BinaryOp('>=', ExprList([Variable(v) for v in prefix_sort(pos_var)]), Literal(0))))
         return self.indent(out)
 
     def format_summary(self, summary, renames):
@@ -69,7 +69,7 @@ class AbstractCliFormatter(AbstractFormatter):
                 tmp += f' = {v}'
                 e = ExprTree.from_string(str(v))
                 Rewriter().normalize(e)
-                v2 = e.evaluate({})
+                v2 = decimal_value(e.evaluate({}))
                 if str(e) != str(v2):
                     tmp += f' = {round(v2, 8)}'
                 out.append(tmp)
@@ -15,7 +15,7 @@ class DictCliFormatter(AbstractCliFormatter):
         just = {v: 0 for v in tableau.columns}
         for row in tableau.data:
             for v in tableau.columns:
-                e = MathTree(UnaryOp('-', row[v]))
+                e = MathTree.from_root(UnaryOp('-', row[v]))
                 Rewriter().normalize(e)
                 just[v] = max(just[v], len(str(e)), len(str(row[v])))
         for v in tableau.columns:
@@ -28,7 +28,7 @@ class DictCliFormatter(AbstractCliFormatter):
         for k, v in enumerate(tableau.dict_columns):
             if v in tableau.basis and str(row[v]) == '0':
                 continue
-            expr = MathTree(UnaryOp('-', row[v]) if v else row[v])
+            expr = MathTree.from_root(UnaryOp('-', row[v]) if v else row[v])
             Rewriter().normalize(expr)
             x = expr.evaluate({})
             s = ''
@@ -51,7 +51,7 @@ class DictCliFormatter(AbstractCliFormatter):
             for k, v in enumerate(tableau.dict_columns):
                 if v in tableau.basis and str(tableau.data[0][v]) == '0':
                     continue
-                expr = MathTree(UnaryOp('-', row[v]) if v else row[v])
+                expr = MathTree.from_root(UnaryOp('-', row[v]) if v else row[v])
                 Rewriter().normalize(expr)
                 x = expr.evaluate({})
                 s = ''
@@ -18,7 +18,7 @@ class DictLatexFormatter(AbstractLatexFormatter):
         just = {v: 0 for v in tableau.columns}
         for row in tableau.data:
             for v in tableau.columns:
-                t = MathTree(UnaryOp('-', row[v]))
+                t = MathTree.from_root(UnaryOp('-', row[v]))
                 Rewriter().normalize(t)
                 just[v] = max(just[v], len(str(t)), len(str(row[v])))
         for v in tableau.columns:
@@ -31,7 +31,7 @@ class DictLatexFormatter(AbstractLatexFormatter):
         for k, v in enumerate(tableau.dict_columns):
             if v in tableau.basis and str(row[v]) == '0':
                 continue
-            expr = MathTree(UnaryOp('-', row[v]) if v else row[v])
+            expr = MathTree.from_root(UnaryOp('-', row[v]) if v else row[v])
             Rewriter().normalize(expr)
             x = expr.evaluate({})
             s = ''
@@ -55,7 +55,7 @@ class DictLatexFormatter(AbstractLatexFormatter):
             for k, v in enumerate(tableau.dict_columns):
                 if v in tableau.basis and str(tableau.data[0][v]) == '0':
                     continue
-                expr = MathTree(UnaryOp('-', row[v]) if v else row[v])
+                expr = MathTree.from_root(UnaryOp('-', row[v]) if v else row[v])
                 Rewriter().normalize(expr)
                 x = expr.evaluate({})
                 s = ''
@@ -1,7 +1,7 @@
 import re
 
 from simplex.core import AbstractFormatter, Rewriter
-from simplex.parsing import BinaryOp, ExprTree, Literal, UnaryOp, Variable
+from simplex.parsing import BinaryOp, ExprTree, Literal, UnaryOp, Variable, decimal_value
 from simplex.utils import prefix_sort
 
 
@@ -156,7 +156,7 @@ class AbstractLatexFormatter(AbstractFormatter):
                 tmp += f' = {self.math_to_latex(v)}'
                 e = ExprTree.from_string(str(v))
                 Rewriter().normalize(e)
-                v2 = e.evaluate({})
+                v2 = decimal_value(e.evaluate({}))
                 if str(e) != str(v2):
                     tmp += f' = {round(v2, 8)}'
                 tmp += r'\\'
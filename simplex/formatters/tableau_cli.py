@@ -16,7 +16,7 @@ class TableauCliFormatter(AbstractCliFormatter):
         just = {v: len(v) for v in tableau.columns}
         for line in tableau.data:
             for v in tableau.columns:
-                e = MathTree(UnaryOp('-', line[v]))
+                e = MathTree.from_root(UnaryOp('-', line[v]))
                 Rewriter().normalize(e)
                 just[v] = max(just[v], len(str(e)), len(str(line[v])))
         # header
@@ -60,11 +60,11 @@ class TableauCliFormatter(AbstractCliFormatter):
                     continue
                 if k > 0:
                     tmp.append('  ' if v else ' | ')
-                e = MathTree(UnaryOp('-', line[v]))
+                e = MathTree.from_root(UnaryOp('-', line[v]))
                 Rewriter().normalize(e)
                 tmp.append(str(e).rjust(just[v]))
             tmp.append(' = ')
-            e = MathTree(UnaryOp('-', tableau.objective.root.left))
+            e = MathTree.from_root(UnaryOp('-', tableau.objective.root.left))
             Rewriter().normalize(e)
             tmp.append(str(e).rjust(head_just))
             out.append(''.join(tmp))
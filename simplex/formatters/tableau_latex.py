@@ -19,7 +19,7 @@ class TableauLatexFormatter(AbstractLatexFormatter):
         just = {v: 0 for v in tableau.columns}
         for line in tableau.data:
             for v in tableau.columns:
-                t = MathTree(UnaryOp('-', line[v]))
+                t = MathTree.from_root(UnaryOp('-', line[v]))
                 Rewriter().normalize(t)
                 just[v] = max(just[v], len(str(self.math_to_latex(t))), len(str(self.math_to_latex(line[v]))))
         # header
@@ -53,11 +53,11 @@ class TableauLatexFormatter(AbstractLatexFormatter):
             for var in tableau.columns:
                 if self.compact and var in tableau.basis:
                     continue
-                e = MathTree(UnaryOp('-', line[var]))
+                e = MathTree.from_root(UnaryOp('-', line[var]))
                 Rewriter().normalize(e)
                 tmp.append(self.math_to_latex(e).rjust(just[var]))
             tmp.append('=')
-            e = MathTree(UnaryOp('-', tableau.objective.root.left))
+            e = MathTree.from_root(UnaryOp('-', tableau.objective.root.left))
             Rewriter().normalize(e)
             tmp.append(self.math_to_latex(e).rjust(head_just))
             out.append('    ' + ' & '.join(tmp) + r'\\')
@@ -1,4 +1,7 @@
-from .nodes import BinaryOp, ExprList, Literal, Objective, UnaryOp, Variable
+from .arena import Arena, ArenaDict
+from .indexed import Forall, Sum
+from .linear import LinearForm, decimal_value, literal_fraction, parse_linear
+from .nodes import BinaryOp, ExprList, Literal, Objective, Points, UnaryOp, Variable, clear_interned, equal_nodes
 from .parser import Parser
-from .tokenizer import tokenize
+from .tokenizer import DecimalFraction, tokenize
 from .trees import BoolTree, ExprTree, MathTree, ObjectiveTree
@@ -0,0 +1,219 @@
+import array
+import collections.abc
+import sys
+import weakref
+
+from .nodes import BinaryOp, ExprList, Literal, Objective, UnaryOp, Variable
+
+LITERAL, VARIABLE, UNARY, BINARY, OBJECTIVE, LIST = range(6)
+KINDS = {Literal: LITERAL, Variable: VARIABLE, UnaryOp: UNARY, BinaryOp: BINARY, Objective: OBJECTIVE, ExprList: LIST}
+
+
+# expressions as a struct of arrays, one kind byte and three int32 per node:
+# the index of its value (literal value, variable name, operator or mode),
+# then its children's ids, lists keeping the ids of their items in `items`
+# (start and count). Structurally equal nodes share their id. Expr nodes are
+# built on first access (see node) and kept for the next ones; the ids that
+# no view (ArenaDict) holds any more are reclaimed by collect
+class Arena:
+    def __init__(self):
+        # views by id, mappings not being hashable
+        self.views = weakref.WeakValueDictionary()
+        self._reset()
+
+    def _reset(self):
+        self.kinds = array.array('B')
+        self.args = array.array('i')
+        self.lefts = array.array('i')
+        self.rights = array.array('i')
+        self.items = array.array('i')
+        self.values = []
+        self.value_ids = {}
+        self.ids = {}
+        # nodes stored or built, and the other way round
+        self.built = {}
+        self.node_ids = {}
+
+    def value(self, value):
+        # as for literals, 1, 1.0 and True differ
+        key = (type(value).__name__, repr(value) if isinstance(value, float) else value)
+        if (i := self.value_ids.get(key)) is None:
+            i = self.value_ids[key] = len(self.values)
+            self.values.append(value)
+        return i
+
+    # nodes are keyed by a single integer, cheaper than a tuple; lists by the
+    # tuple of their items
+    def make(self, kind, arg, left=-1, right=-1, key=None):
+        if key is None:
+            key = (((arg << 32 | left + 1) << 32 | right + 1) << 3) | kind
+        if (i := self.ids.get(key)) is None:
+            i = self.ids[key] = len(self.kinds)
+            self.kinds.append(kind)
+            self.args.append(arg)
+            self.lefts.append(left)
+            self.rights.append(right)
+        return i
+
+    # id of a node of the given kind and value, from its children's ids
+    def store(self, kind, value, ids):
+        if kind == LIST:
+            n = len(self)
+            i = self.make(kind, len(ids), len(self.items), key=(kind, *ids))
+            if i == n:
+                self.items.extend(ids)
+            return i
+        return self.make(kind, self.value(value), *ids)
+
+    # id of an expression, adding the nodes it lacks
+    def add(self, root):
+        node_ids = self.node_ids
+        if (i := node_ids.get(root)) is not None:
+            return i
+        stack = [(root, False)]
+        results = []
+        while stack:
+            node, done = stack.pop()
+            if (i := node_ids.get(node)) is not None:
+                results.append(i)
+                continue
+            children = node.children()
+            if children and not done:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+                continue
+            kind = KINDS.get(node.__class__)
+            if kind is None:
+                msg = f'Cannot store node {node} in an arena'
+                raise TypeError(msg)
+            ids = results[len(results)-len(children):]
+            del results[len(results)-len(children):]
+            value = None
+            if kind == LITERAL:
+                value = node.value
+            elif kind == VARIABLE:
+                value = node.name
+            elif kind == UNARY or kind == BINARY:
+                value = node.op
+            elif kind == OBJECTIVE:
+                value = node.mode
+            i = self.store(kind, value, ids)
+            self.built[i] = node
+            node_ids[node] = i
+            results.append(i)
+        return results[0]
+
+    # the expression of an id, as (shared) Expr nodes
+    def node(self, i):
+        kinds, args, lefts, rights, values, built = self.kinds, self.args, self.lefts, self.rights, self.values, self.built
+        if (node := built.get(i)) is not None:
+            return node
+        stack = [(i, False)]
+        results = []
+        while stack:
+            i, done = stack.pop()
+            if (node := built.get(i)) is not None:
+                results.append(node)
+                continue
+            kind = kinds[i]
+            if kind == LITERAL:
+                node = Literal(values[args[i]])
+            elif kind == VARIABLE:
+                node = Variable(values[args[i]])
+            elif not done:
+                stack.append((i, True))
+                if kind == LIST:
+                    start = lefts[i]
+                    stack.extend((j, False) for j in reversed(self.items[start:start+args[i]]))
+                elif kind == UNARY:
+                    stack.append((lefts[i], False))
+                else:
+                    stack.append((rights[i], False))
+                    stack.append((lefts[i], False))
+                continue
+            elif kind == LIST:
+                n = len(results) - args[i]
+                node = ExprList(results[n:])
+                del results[n:]
+            elif kind == UNARY:
+                node = UnaryOp(values[args[i]], results.pop())
+            else:
+                right = results.pop()
+                cls = BinaryOp if kind == BINARY else Objective
+                node = cls(values[args[i]], results.pop(), right)
+            built[i] = node
+            self.node_ids[node] = i
+            results.append(node)
+        return results[0]
+
+    # drops the nodes (and values) that the views no longer reach, renumbering
+    # the others in the same order, children before their parents, and
+    # updating the views' ids
+    def collect(self):
+        kinds, args, lefts, rights, items, values, built = self.kinds, self.args, self.lefts, self.rights, self.items, self.values, self.built
+        live = bytearray(len(kinds))
+        stack = [i for view in self.views.values() for i in view.ids.values()]
+        while stack:
+            i = stack.pop()
+            if live[i]:
+                continue
+            live[i] = 1
+            kind = kinds[i]
+            if kind == LIST:
+                stack.extend(items[lefts[i]:lefts[i]+args[i]])
+            elif kind == UNARY:
+                stack.append(lefts[i])
+            elif kind == BINARY or kind == OBJECTIVE:
+                stack.append(lefts[i])
+                stack.append(rights[i])
+        self._reset()
+        remap = {}
+        for i, alive in enumerate(live):
+            if not alive:
+                continue
+            kind = kinds[i]
+            if kind == LIST:
+                value, ids = None, [remap[j] for j in items[lefts[i]:lefts[i]+args[i]]]
+            else:
+                value, ids = values[args[i]], [remap[j] for j in (lefts[i], rights[i]) if j >= 0]
+            j = remap[i] = self.store(kind, value, ids)
+            if (node := built.get(i)) is not None:
+                self.built[j] = node
+                self.node_ids[node] = j
+        for view in self.views.values():
+            view.ids = {k: remap[i] for k, i in view.ids.items()}
+
+    def __len__(self):
+        return len(self.kinds)
+
+    # memory held by the arrays, the values and the tables of ids, not
+    # counting the cached nodes (see node)
+    def nbytes(self):
+        arrays = (self.kinds, self.args, self.lefts, self.rights, self.items)
+        tables = (self.ids, self.value_ids, self.built, self.node_ids)
+        return (sum(a.itemsize*len(a) for a in arrays) + sum(sys.getsizeof(v) for v in self.values)
+                + sum(sys.getsizeof(t) + sum(sys.getsizeof(k) for k in t) for t in tables))
+
+# mapping whose values are expressions held in an arena, as ids: the view
+# through which the tableau stores its cells
+class ArenaDict(collections.abc.MutableMapping):
+    def __init__(self, arena, items=()):
+        self.arena = arena
+        self.ids = {}
+        arena.views[id(self)] = self
+        self.update(items)
+
+    def __getitem__(self, key):
+        return self.arena.node(self.ids[key])
+
+    def __setitem__(self, key, value):
+        self.ids[key] = self.arena.add(value)
+
+    def __delitem__(self, key):
+        del self.ids[key]
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
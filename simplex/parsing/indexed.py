@@ -0,0 +1,92 @@
+from .nodes import BinaryOp, Expr, Literal, Variable, interned
+
+
+def _str_indices(indices):
+    return ', '.join(f'{name} in {low}..{high}' for name, low, high in indices)
+
+def _bound(value, env):
+    if isinstance(value, int):
+        return value
+    if value not in env:
+        msg = f'Unknown index: {value}'
+        raise SyntaxError(msg)
+    return env[value]
+
+# all the index values of "i in 1..n, j in i..n", as environments extending
+# `env`, produced one at a time
+def bindings(indices, env):
+    if not indices:
+        yield env
+        return
+    (name, low, high), *rest = indices
+    for value in range(_bound(low, env), _bound(high, env) + 1):
+        yield from bindings(rest, {**env, name: value})
+
+def _substitute(node, env):
+    # index names stand for their value, and "_i" suffixes of variable names
+    # are replaced ("x_i_j" is "x_1_2" for i=1, j=2)
+    if node.name in env:
+        return Literal(env[node.name])
+    base, *suffixes = node.name.split('_')
+    return Variable('_'.join([base, *(str(env.get(s, s)) for s in suffixes)]))
+
+# copy of a template with its sums expanded and index values substituted
+def instantiate(node, env=None):
+    env = env or {}
+    def visitor(node):
+        match node:
+            case Variable():
+                return _substitute(node, env)
+            case Sum():
+                return node.expand(env)
+        return node
+    return node.rewrite(visitor)
+
+class Sum(Expr):
+    __slots__ = ('indices', 'body')
+    FIELDS = ('indices', 'body')
+
+    def __new__(cls, indices, body):
+        indices = tuple(indices)
+        return interned(cls, (cls.__name__, indices, id(body)), indices, body)
+
+    def format(self):
+        glue, end = ' ', ''
+        if isinstance(self.body, BinaryOp) and self.body.op not in {'*', '/'}:
+            glue, end = ' (', ')'
+        return f'sum({_str_indices(self.indices)}){glue}{self.body}{end}'
+
+    def derive(self):
+        return False, self.body.has_var, False, None
+
+    def evaluate(self, context):
+        return self.expand({}).evaluate(context)
+
+    def expand(self, env):
+        expr = None
+        for values in bindings(self.indices, env):
+            term = instantiate(self.body, values)
+            expr = term if expr is None else BinaryOp('+', expr, term)
+        return Literal(0) if expr is None else expr
+
+# constraint family, only valid as a whole program row
+class Forall(Expr):
+    __slots__ = ('indices', 'body')
+    FIELDS = ('indices', 'body')
+
+    def __new__(cls, indices, body):
+        indices = tuple(indices)
+        return interned(cls, (cls.__name__, indices, id(body)), indices, body)
+
+    def format(self):
+        return f'forall({_str_indices(self.indices)}) {self.body}'
+
+    def derive(self):
+        return False, self.body.has_var, False, None
+
+    def evaluate(self, context):
+        return all(root.evaluate(context) for root in self.expand())
+
+    def expand(self):
+        for env in bindings(self.indices, {}):
+            yield instantiate(self.body, env)
@@ -0,0 +1,98 @@
+import fractions
+import re
+
+from .nodes import BinaryOp, Literal, UnaryOp, Variable
+from .tokenizer import WORD_TOKENS, DecimalFraction
+
+
+TERM_REGEX = re.compile(r'\s*(-\s*)?(?:(\d+(?:\.\d*)?)\s*(?:\*\s*(?=[^\W\d]|[$@]))?)?((?:[^\W\d]|[$@])[\w$@]*)?')
+SUM_REGEX = re.compile(r'\s*([-+])')
+COMPARISON_REGEX = re.compile(r'\s*(<=|>=|==|!=|<|>)')
+END_REGEX = re.compile(r'\s*$')
+
+
+# linear row "sum(coefs[v]*v) + const <op> 0", with exact coefficients
+class LinearForm:
+    def __init__(self):
+        self.op = None
+        self.coefs = {}
+        self.const = fractions.Fraction(0)
+
+    def add(self, var, value):
+        if var is None:
+            self.const += value
+        else:
+            self.coefs[var] = self.coefs.get(var, 0) + value
+
+    def copy(self):
+        form = LinearForm()
+        form.op = self.op
+        form.coefs = dict(self.coefs)
+        form.const = self.const
+        return form
+
+    def rename(self, old, new):
+        coefs = {}
+        for k, v in self.coefs.items():
+            k = new if k == old else k
+            coefs[k] = coefs.get(k, 0) + v
+        self.coefs = coefs
+
+
+# exact value of a number literal, decimals being DecimalFraction already
+def literal_fraction(value):
+    return fractions.Fraction(value)
+
+# value as printed after an exact expression, "3/2=1.5": fractions that are
+# not integers as floats
+def decimal_value(value):
+    if isinstance(value, fractions.Fraction) and value.denominator != 1:
+        return float(value)
+    return value
+
+def _parse_number(text):
+    return DecimalFraction(text) if '.' in text else int(text)
+
+def _parse_sum(s, pos, form, sign):
+    expr = None
+    op = None
+    while True:
+        m = TERM_REGEX.match(s, pos)
+        neg, number, name = m.groups()
+        if (number is None and name is None) or name in WORD_TOKENS:
+            return None
+        pos = m.end()
+        value = _parse_number(number) if number is not None else None
+        term = Variable(name) if value is None else Literal(value)
+        if neg:
+            term = UnaryOp('-', term)
+        if name is not None and value is not None:
+            term = BinaryOp('*', term, Variable(name))
+        coef = literal_fraction(value) if value is not None else fractions.Fraction(1)
+        if neg:
+            coef = -coef
+        if op == '-':
+            coef = -coef
+        form.add(name, sign*coef)
+        expr = term if expr is None else BinaryOp(op, expr, term)
+        if not (m := SUM_REGEX.match(s, pos)):
+            return expr, pos
+        op = m.group(1)
+        pos = m.end()
+
+# recognizes plain linear rows ("2x + y <= 4"), returning both the tree the
+# parser would have built and its linear form, or None for anything else
+def parse_linear(s):
+    form = LinearForm()
+    if not (left := _parse_sum(s, 0, form, 1)):
+        return None
+    left, pos = left
+    if not (m := COMPARISON_REGEX.match(s, pos)):
+        return None
+    form.op = m.group(1)
+    if not (right := _parse_sum(s, m.end(), form, -1)):
+        return None
+    right, pos = right
+    if not END_REGEX.match(s, pos):
+        return None
+    return BinaryOp(form.op, left, right), form
@@ -1,73 +1,486 @@
 import abc
-
+import fractions
+
+
+
+# structurally equal nodes are built once and then shared (hash-consing), so
+# that rebuilding a node from unchanged children gives back the very same
+# node, and a string is only ever rendered once per structure; as nodes may
+# be shared by any number of trees, they can never be modified.
+# keys hold the identity of children, kept alive by the table; the table
+# starts over once full, equal nodes built across a reset being merely not
+# shared. Keys only hold strings and numbers, which the garbage collector
+# soon stops tracking
+INTERNED = {}
+INTERNED_LIMIT = 1 << 16
+
+def interned(cls, key, *values):
+    node = INTERNED.get(key)
+    if node is not None:
+        return node
+    node = object.__new__(cls)
+    for name, value in zip(cls.__slots__, values):
+        object.__setattr__(node, name, value)
+    for name, value in zip(DERIVED, node.derive()):
+        object.__setattr__(node, name, value)
+    if len(INTERNED) >= INTERNED_LIMIT:
+        INTERNED.clear()
+    INTERNED[key] = node
+    return node
+
+# once the nodes built so far are no longer needed: those still in use stay
+# valid, merely not shared with equal nodes built later
+def clear_interned():
+    INTERNED.clear()
+
+# structural equality, which identity only stands for while the table is not
+# reset: nodes built on both sides of a reset are equal without being shared.
+# Shared subtrees are not walked; literals compare as their keys do
+def equal_nodes(a, b):
+    stack = [(a, b)]
+    while stack:
+        a, b = stack.pop()
+        if a is b:
+            continue
+        if a.__class__ is not b.__class__:
+            return False
+        for name in a.FIELDS:
+            x, y = getattr(a, name), getattr(b, name)
+            if x.__class__ is not y.__class__ or (repr(x) != repr(y) if isinstance(x, float) else x != y):
+                return False
+        children, others = a.children(), b.children()
+        if len(children) != len(others):
+            return False
+        stack.extend(zip(children, others))
+    return True
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Python source for each operator, applied to atoms (names, subscripts and
+# parenthesized numbers), so that no precedence question arises, and for the
+# items of a list compared to a value; vectors use NumPy's elementwise
+# operators instead
+UNARY_SOURCE = {'-': '-{}', 'not': 'not {}'}
+BINARY_SOURCE = {
+    '+': '{} + {}', '-': '{} - {}', '*': '{} * {}', '/': '{} / {}',
+    '<': '{} < {}', '>': '{} > {}', '<=': '{} <= {}', '>=': '{} >= {}',
+    '==': '{} == {}', '!=': '{} != {}', 'and': '{} and {}', 'or': '{} or {}',
+    'xor': '{} != {}', 'if': '{} or not {}', 'iif': '{} == {}',
+}
+ALL_SOURCE = 'all({} for v in {})'
+VECTOR_UNARY_SOURCE = {**UNARY_SOURCE, 'not': 'numpy.logical_not({})'}
+VECTOR_BINARY_SOURCE = {
+    **BINARY_SOURCE,
+    'and': 'numpy.logical_and({}, {})',
+    'or': 'numpy.logical_or({}, {})',
+    'if': 'numpy.logical_or({}, numpy.logical_not({}))',
+}
+VECTOR_ALL_SOURCE = 'numpy.logical_and.reduce([{} for v in {}])'
+
+# function evaluating `root` like its evaluate method does, one statement per
+# inner node, so that deep trees stay within the compiler's limits; literals
+# other than integers, and nodes of other classes (evaluated through their
+# own evaluate), are passed as constants. Small trees are not worth the
+# compiler's time, their evaluate method is used instead. Vector functions
+# take NumPy arrays as variable values
+COMPILE_MIN_NODES = 16
+
+def _compile(root, vector=False):
+    unary, binary, every = (VECTOR_UNARY_SOURCE, VECTOR_BINARY_SOURCE, VECTOR_ALL_SOURCE) if vector else (UNARY_SOURCE, BINARY_SOURCE, ALL_SOURCE)
+    consts = []
+    lines = []
+    def const(value):
+        consts.append(value)
+        return f'k[{len(consts)-1}]'
+    def temp(source):
+        lines.append(f'    t{len(lines)} = {source}')
+        return f't{len(lines)-1}'
+    stack = [(root, False)]
+    results = []
+    while stack:
+        node, done = stack.pop()
+        cls = node.__class__
+        if cls is Objective:
+            # only the objective expression is evaluated, not its variable
+            stack.append((node.right, False))
+        elif cls is Literal:
+            value = node.value
+            if isinstance(value, int):
+                results.append(f'({value!r})')
+            else:
+                # vectors are float arrays
+                results.append(const(float(value) if vector and isinstance(value, fractions.Fraction) else value))
+        elif cls is Variable:
+            results.append(f'c[{node.name!r}]')
+        elif cls not in {UnaryOp, BinaryOp, ExprList}:
+            if vector:
+                msg = f'Cannot evaluate {cls.__name__} nodes over vectors'
+                raise TypeError(msg)
+            results.append(temp(f'{const(node)}.evaluate(c)'))
+        elif not done:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children()))
+        elif cls is ExprList:
+            n = len(results) - len(node.exprlist)
+            items = results[n:]
+            del results[n:]
+            results.append(temp(f'[{", ".join(items)}]'))
+        elif cls is UnaryOp:
+            if node.op not in unary:
+                msg = f'Unknown unary operator: {node.op}'
+                raise ValueError(msg)
+            results.append(temp(unary[node.op].format(results.pop())))
+        else:
+            if node.op not in binary:
+                msg = f'Unknown binary operator: {node.op}'
+                raise ValueError(msg)
+            right = results.pop()
+            left = results.pop()
+            if isinstance(node.left, ExprList):
+                results.append(temp(every.format(binary[node.op].format('v', right), left)))
+            else:
+                results.append(temp(binary[node.op].format(left, right)))
+    if not vector and len(lines) < COMPILE_MIN_NODES:
+        return root.evaluate
+    source = '\n'.join(['def make(k):', '  def compiled(c):', *lines, f'    return {results[0]}', '  return compiled'])
+    namespace = {'numpy': numpy}
+    exec(compile(source, f'<compiled {root.__class__.__name__}>', 'exec'), namespace)
+    return namespace['make'](tuple(consts))
+
+# points at which trees are evaluated all at once, from the values of each
+# variable at every point: NumPy arrays, or without NumPy, one context per
+# point for the compiled functions. With NumPy, dividing by zero raises
+# FloatingPointError rather than ZeroDivisionError
+class Points:
+    def __init__(self, columns):
+        sizes = {len(values) for values in columns.values()}
+        if len(sizes) > 1:
+            msg = 'Every variable must have a value at every point'
+            raise ValueError(msg)
+        self.size = sizes.pop() if sizes else 0
+        if numpy is not None:
+            self.columns = {name: numpy.asarray(values) for name, values in columns.items()}
+        else:
+            self.contexts = [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    def evaluate(self, root):
+        if numpy is None:
+            f = root.compile()
+            return [f(context) for context in self.contexts]
+        with numpy.errstate(divide='raise', invalid='raise'):
+            values = root.compile_vector()(self.columns)
+        # trees without variables give a single value
+        if numpy.ndim(values) == 0:
+            values = numpy.full(self.size, values)
+        return values
+
+    def minimum(self, vectors):
+        if numpy is None:
+            return [min(values) for values in zip(*vectors)]
+        return numpy.minimum.reduce(vectors)
+
+# structural attributes, set once when a node is first built, from those of
+# its children (see Expr.derive)
+DERIVED = ('constant', 'has_var', 'monomial', 'degree')
+
+# attribute computed from a node and its children's, memoized on every node
+# of the tree; children come first, using an explicit stack so that deep
+# trees stay out of the recursion limit
+def _memoized(root, name, compute):
+    try:
+        return getattr(root, name)
+    except AttributeError:
+        pass
+    stack = [root]
+    while stack:
+        node = stack[-1]
+        if pending := [child for child in node.children() if not hasattr(child, name)]:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        if not hasattr(node, name):
+            object.__setattr__(node, name, compute(node))
+    return getattr(root, name)
+
+# literals holding a fraction that is not an integer, which print as "a/b"
+# and so stand for the division of two integers
+def _is_ratio(node):
+    return node.__class__ is Literal and node.value.__class__ is fractions.Fraction and node.value.denominator != 1
+
+# literal factors of the terms of a sum, 1 standing for terms without one;
+# ratios have none, as divisions
+def _nominators(node):
+    if isinstance(node, Literal):
+        return frozenset() if _is_ratio(node) else frozenset((node.value,))
+    if isinstance(node, (Variable, ExprList)):
+        return frozenset((1,))
+    if isinstance(node, BinaryOp) and node.op in {'+', '-'}:
+        return node.left._nominators | node.right._nominators
+    if isinstance(node, BinaryOp) and node.op == '*':
+        return node.left._nominators
+    return frozenset()
+
+# nominators of the divisors in a sum
+def _denominators(node):
+    if _is_ratio(node):
+        return frozenset((node.value.denominator,))
+    if isinstance(node, BinaryOp) and node.op == '/':
+        return node.right.nominators()
+    if isinstance(node, UnaryOp):
+        return node.right._denominators
+    if isinstance(node, BinaryOp) and node.op in {'+', '-', '*'}:
+        return node.left._denominators | node.right._denominators
+    return frozenset()
+
+def _unflatten(postfix):
+    stack = []
+    for cls, fields, n in postfix:
+        children = stack[len(stack)-n:]
+        del stack[len(stack)-n:]
+        if cls is ExprList:
+            stack.append(cls(children))
+        else:
+            stack.append(cls(*fields, *children))
+    return stack[0]
 
 class Expr(abc.ABC):
-    @abc.abstractmethod
+    __slots__ = ('_str', '_compiled', '_compiled_vector', *DERIVED, '_variable_names', '_nominators', '_denominators')
+    # constructor arguments that are not child nodes
+    FIELDS = ()
+
+    def __setattr__(self, name, value):
+        msg = f'{self.__class__.__name__} nodes are immutable'
+        raise AttributeError(msg)
+
     def __str__(self):
+        try:
+            return self._str
+        except AttributeError:
+            pass
+        # subtrees are printed first, so that long chains are not formatted
+        # recursively
+        stack = [self]
+        while stack:
+            node = stack[-1]
+            if pending := [child for child in node.children() if not hasattr(child, '_str')]:
+                stack.extend(pending)
+            else:
+                stack.pop()
+                if not hasattr(node, '_str'):
+                    object.__setattr__(node, '_str', node.format())
+        return self._str
+
+    @abc.abstractmethod
+    def format(self):
         pass
 
     @abc.abstractmethod
     def evaluate(self, context):
         pass
 
+    # whether the node only combines literals (`constant`), holds a variable
+    # (`has_var`), is a variable that may be negated or multiplied by a
+    # constant (`monomial`), and its degree as a polynomial (None when it is
+    # not one)
+    def derive(self):
+        return False, any(child.has_var for child in self.children()), False, None
+
+    # built on first use, for this node only: every prefix of a long sum
+    # holding its own set would take quadratic space
+    def variable_names(self):
+        try:
+            return self._variable_names
+        except AttributeError:
+            pass
+        names = set()
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, Variable):
+                names.add(node.name)
+            elif node.has_var:
+                try:
+                    names.update(node._variable_names)
+                except AttributeError:
+                    stack.extend(node.children())
+        object.__setattr__(self, '_variable_names', frozenset(names))
+        return self._variable_names
+
+    # sets built on first use, for the whole subtree at once
+    def nominators(self):
+        return _memoized(self, '_nominators', _nominators)
+
+    def denominators(self):
+        return _memoized(self, '_denominators', _denominators)
+
+    # function of the context computing the same value as evaluate, built
+    # once per node: a rewritten tree has a new root, thus a new function
+    def compile(self):
+        try:
+            return self._compiled
+        except AttributeError:
+            object.__setattr__(self, '_compiled', _compile(self))
+            return self._compiled
+
+    def compile_vector(self):
+        try:
+            return self._compiled_vector
+        except AttributeError:
+            object.__setattr__(self, '_compiled_vector', _compile(self, vector=True))
+            return self._compiled_vector
+
+    # values at many points at once (see Points), which may also be given as
+    # the values of each variable at every point
+    def evaluate_batch(self, points):
+        if not isinstance(points, Points):
+            points = Points(points)
+        return points.evaluate(self)
+
+    def children(self):
+        return ()
+
+    def rebuild(self, children):
+        return self
+
+    # both walks are post-order and use an explicit stack, so that long
+    # left-deep chains (sums with thousands of terms) stay out of the
+    # interpreter's recursion limit
     def visit(self, visitor):
-        visitor(self)
-
+        stack = [(self, False)]
+        while stack:
+            node, done = stack.pop()
+            if done:
+                visitor(node)
+            elif node.__class__ is ExprList:
+                # lists only show their items, not the items' subtrees
+                for expr in node.exprlist:
+                    visitor(expr)
+            elif children := node.children():
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+            else:
+                visitor(node)
+
+    # copy-on-write: nodes whose children the visitor left as they were are
+    # given to it as they are rather than rebuilt, so that a tree it does
+    # not change comes back as the same node, without building anything
     def rewrite(self, visitor):
-        return visitor(self)
+        stack = [(self, False)]
+        results = []
+        while stack:
+            node, done = stack.pop()
+            if done:
+                children = node.children()
+                n = len(results) - len(children)
+                if any(result is not child for result, child in zip(results[n:], children)):
+                    node = node.rebuild(results[n:])
+                del results[n:]
+                results.append(visitor(node))
+            elif children := node.children():
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+            else:
+                results.append(visitor(node))
+        return results[0]
+
+    # pickled as a flat postfix list, so that deep trees can be sent to
+    # worker processes without hitting the recursion limit
+    def __reduce__(self):
+        postfix = []
+        stack = [(self, False)]
+        while stack:
+            node, done = stack.pop()
+            children = node.children()
+            if done or not children:
+                fields = tuple(getattr(node, k) for k in node.FIELDS)
+                postfix.append((node.__class__, fields, len(children)))
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(children))
+        return _unflatten, (postfix,)
 
 class Literal(Expr):
-    def __init__(self, value):
-        self.value = value
+    __slots__ = ('value',)
+    FIELDS = ('value',)
 
-    def __str__(self):
+    # 1, 1.0 and True are equal but print differently, as do 0.0 and -0.0;
+    # keys start with the type name, other nodes' with their class name
+    def __new__(cls, value):
+        key = repr(value) if isinstance(value, float) else value
+        return interned(cls, (type(value).__name__, key), value)
+
+    def format(self):
         return str(self.value)
 
+    def derive(self):
+        return True, False, False, 0
+
     def evaluate(self, context):
         return self.value
 
 class Variable(Expr):
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ('name',)
+    FIELDS = ('name',)
 
-    def __str__(self):
+    def __new__(cls, name):
+        return interned(cls, (cls.__name__, name), name)
+
+    def format(self):
         return self.name
 
+    def derive(self):
+        return False, True, True, 1
+
     def evaluate(self, context):
         return context[self.name]
 
 class ExprList(Expr):
-    def __init__(self, exprlist):
-        self.exprlist = exprlist
+    __slots__ = ('exprlist',)
 
-    def __str__(self):
+    def __new__(cls, exprlist):
+        exprlist = tuple(exprlist)
+        return interned(cls, (cls.__name__, *map(id, exprlist)), exprlist)
+
+    def format(self):
         return ', '.join(str(e) for e in self.exprlist)
 
+    def derive(self):
+        degrees = [e.degree for e in self.exprlist]
+        degree = None if None in degrees else max(degrees, default=0)
+        return False, any(e.has_var for e in self.exprlist), all(e.monomial for e in self.exprlist), degree
+
     def evaluate(self, context):
         return [expr.evaluate(context) for expr in self.exprlist]
 
-    def visit(self, visitor):
-        for expr in self.exprlist:
-            visitor(expr)
+    def children(self):
+        return self.exprlist
 
-    def rewrite(self, visitor):
-        tmp = [expr.rewrite(visitor) for expr in self.exprlist]
-        return visitor(self.__class__(tmp))
+    def rebuild(self, children):
+        return self.__class__(children)
 
 class UnaryOp(Expr):
-    def __init__(self, op, right):
-        self.op = op
-        self.right = right
+    __slots__ = ('op', 'right')
+    FIELDS = ('op',)
 
-    def __str__(self):
+    def __new__(cls, op, right):
+        return interned(cls, (cls.__name__, op, id(right)), op, right)
+
+    def format(self):
         glue, end = '', ''
         if self.op == 'not':
             glue += ' '
-        if isinstance(self.right, BinaryOp):
+        if isinstance(self.right, BinaryOp) or _is_ratio(self.right):
             glue += '('
             end = ')'
         return f'{self.op}{glue}{self.right}{end}'
 
+    def derive(self):
+        right = self.right
+        return right.constant, right.has_var, right.monomial, right.degree
+
     def evaluate(self, context):
         val = self.right.evaluate(context)
         match self.op:
@@ -78,36 +491,35 @@ class UnaryOp(Expr):
         msg = f'Unknown unary operator: {self.op}'
         raise ValueError(msg)
 
-    def visit(self, visitor):
-        self.right.visit(visitor)
-        visitor(self)
+    def children(self):
+        return (self.right,)
 
-    def rewrite(self, visitor):
-        right = self.right.rewrite(visitor)
-        return visitor(self.__class__(self.op, right))
+    def rebuild(self, children):
+        return self.__class__(self.op, *children)
 
 class BinaryOp(Expr):
-    def __init__(self, op, left, right):
-        self.op = op
-        self.left = left
-        self.right = right
-        if self.op == '/' and isinstance(self.right, Literal) and self.right.value == 0:
+    __slots__ = ('op', 'left', 'right')
+    FIELDS = ('op',)
+
+    def __new__(cls, op, left, right):
+        if op == '/' and isinstance(right, Literal) and right.value == 0:
             raise ZeroDivisionError
+        return interned(cls, (cls.__name__, op, id(left), id(right)), op, left, right)
 
-    def __str__(self):
+    def format(self):
         op, lglue, rglue, end = '', '', '', ''
         letterop = self.op in {'and', 'or', 'xor', 'if', 'iif'}
         compop = self.op in {'>', '<', '>=', '<=', '==', '!='}
         lowmathop = self.op in {'=', '+', '-'}
         if lowmathop or letterop or compop:
             lglue, rglue = ' ', ' '
-        if isinstance(self.left, BinaryOp) and (letterop or (self.op == '/') or (self.op == '*' and self.left.op in {'+', '-'})):
+        if isinstance(self.left, BinaryOp) and (letterop or (self.op == '/') or (self.op == '*' and self.left.op in {'+', '-'})) or _is_ratio(self.left) and (letterop or self.op == '/'):
             op = f'{op}('
             lglue = f'){lglue}'
         if isinstance(self.left, UnaryOp) and letterop:
             op = f'{op}('
             lglue = f'){lglue}'
-        if isinstance(self.right, BinaryOp) and (letterop or (self.op == '/') or (self.op == '*' and self.right.op in {'+', '-'})):
+        if isinstance(self.right, BinaryOp) and (letterop or (self.op == '/') or (self.op == '*' and self.right.op in {'+', '-'})) or _is_ratio(self.right) and (letterop or self.op == '/'):
             rglue = f'{rglue}('
             end = ')'
         if isinstance(self.right, UnaryOp) and letterop:
@@ -120,6 +532,19 @@ class BinaryOp(Expr):
                 return f'{op}{lglue}{rglue}{self.right}{end}'
         return f'{op}{self.left}{lglue}{self.op}{rglue}{self.right}{end}'
 
+    def derive(self):
+        left, right = self.left, self.right
+        if left.degree is None or right.degree is None:
+            degree = None
+        elif self.op == '*':
+            degree = left.degree + right.degree
+        elif self.op == '/':
+            degree = left.degree if right.degree == 0 else None
+        else:
+            degree = max(left.degree, right.degree)
+        monomial = self.op == '*' and left.constant and right.monomial
+        return left.constant and right.constant, left.has_var or right.has_var, monomial, degree
+
     def evaluate(self, context):
         lval = self.left.evaluate(context)
         rval = self.right.evaluate(context)
@@ -161,25 +586,25 @@ class BinaryOp(Expr):
             return all(aux(v, rval) for v in lval)
         return aux(lval, rval)
 
-    def visit(self, visitor):
-        self.left.visit(visitor)
-        self.right.visit(visitor)
-        visitor(self)
+    def children(self):
+        return (self.left, self.right)
 
-    def rewrite(self, visitor):
-        left = self.left.rewrite(visitor)
-        right = self.right.rewrite(visitor)
-        return visitor(self.__class__(self.op, left, right))
+    def rebuild(self, children):
+        return self.__class__(self.op, *children)
 
 class Objective(Expr):
-    def __init__(self, mode, left, right):
-        self.mode = mode
-        self.left = left
-        self.right = right
+    __slots__ = ('mode', 'left', 'right')
+    FIELDS = ('mode',)
 
-    def __str__(self):
+    def __new__(cls, mode, left, right):
+        return interned(cls, (cls.__name__, mode, id(left), id(right)), mode, left, right)
+
+    def format(self):
         return f'{self.mode} {self.left} = {self.right}'
 
+    def derive(self):
+        return False, True, False, self.right.degree
+
     def var(self):
         tmp = self.left
         while not isinstance(tmp, Variable):
@@ -189,12 +614,8 @@ class Objective(Expr):
     def evaluate(self, context):
         return self.right.evaluate(context)
 
-    def visit(self, visitor):
-        self.left.visit(visitor)
-        self.right.visit(visitor)
-        visitor(self)
+    def children(self):
+        return (self.left, self.right)
 
-    def rewrite(self, visitor):
-        left = self.left.rewrite(visitor)
-        right = self.right.rewrite(visitor)
-        return visitor(self.__class__(self.mode, left, right))
+    def rebuild(self, children):
+        return self.__class__(self.mode, *children)
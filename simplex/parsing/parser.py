@@ -6,22 +6,49 @@ from .nodes import (
     UnaryOp,
     Variable,
 )
+from .indexed import Forall, Sum
+from .tokenizer import Token
+
+
+LOGIC, COMPARISON, LOW, HIGH = 1, 2, 3, 4
+PRECEDENCES = {
+    **{Token('OP', op): LOGIC for op in ('and', 'or', 'xor', 'if', 'iif')},
+    **{Token('OP', op): COMPARISON for op in ('<=', '<', '==', '!=', '>', '>=')},
+    **{Token('OP', op): LOW for op in ('+', '-')},
+    **{Token('OP', op): HIGH for op in ('*', '/')},
+}
+# a variable right after a factor is an implicit multiplication ("3x1")
+IMPLICIT = {'VAR': HIGH}
 
 
 class Parser:
     def __init__(self, tokens):
-        self.tokens = tokens
-        self.pos = 0
+        self.tokens = iter(tokens)
+        self.lookahead = next(self.tokens, None)
+        # token read after the lookahead by peek, if any
+        self.peeked = []
+        # whether sums need to be expanded
+        self.indexed = False
 
     def current(self):
-        return self.tokens[self.pos] if self.pos < len(self.tokens) else None
+        return self.lookahead
+
+    def advance(self):
+        token = self.lookahead
+        self.lookahead = self.peeked.pop() if self.peeked else next(self.tokens, None)
+        return token
+
+    # token after the current one
+    def peek(self):
+        if not self.peeked:
+            self.peeked.append(next(self.tokens, None))
+        return self.peeked[0]
 
     def accept(self, *patterns):
         if token := self.current():
             for typ, value in patterns:
                 if token.type == typ and (value is None or token.value == value):
-                    self.pos += 1
-                    return token
+                    return self.advance()
         return None
 
     def expect(self, *patterns):
@@ -33,7 +60,7 @@ class Parser:
 
     def assert_end(self):
         if self.current() is not None:
-            msg = f'Unexpected token(s) at end ({self.tokens[self.pos:]})'
+            msg = f'Unexpected token(s) at end ({[self.lookahead, *self.peeked, *self.tokens]})'
             raise SyntaxError(msg)
 
     def assert_not_end(self):
@@ -41,7 +68,19 @@ class Parser:
             msg = 'Unexpected end of input'
             raise SyntaxError(msg)
 
+    # "sum" and "forall" are only keywords right before the "(" of their
+    # indices, and remain valid variable names anywhere else
+    def accept_indexed(self, word):
+        if self.current() == Token('VAR', word) and self.peek() == Token('LPAREN', '('):
+            return self.advance()
+        return None
+
     def parse(self):
+        if self.accept_indexed('forall'):
+            self.indexed = True
+            indices = self.parse_indices()
+            return Forall(indices, self.parse_logic())
+
         if token := self.accept(('OP', 'min'), ('OP', 'max')):
             expr_left = self.parse_logic()
             self.expect(('OP', '='))
@@ -51,63 +90,21 @@ class Parser:
         if expr := self.parse_logic():
             return expr
 
-        msg = f'Unable to parse expression: {self.tokens}'
+        msg = f'Unable to parse expression at {self.current()}'
         raise SyntaxError(msg)
 
     def parse_logic(self):
-        self.assert_not_end()
-
-        expr_left = self.parse_comparison()
-        while token := self.accept(
-                    ('OP', 'and'),
-                    ('OP', 'or'),
-                    ('OP', 'xor'),
-                    ('OP', 'if'),
-                    ('OP', 'iif'),
-        ):
-            expr_left = BinaryOp(token.value, expr_left, self.parse_comparison())
-        return expr_left
+        return self.parse_binary(LOGIC)
 
-    def parse_comparison(self):
-        self.assert_not_end()
-
-        expr_left = self.parse_low()
-        while token := self.accept(
-                    ('OP', '<='),
-                    ('OP', '<'),
-                    ('OP', '=='),
-                    ('OP', '!='),
-                    ('OP', '>'),
-                    ('OP', '>='),
-        ):
-            expr_left = BinaryOp(token.value, expr_left, self.parse_low())
-        return expr_left
-
-    def parse_low(self):
-        self.assert_not_end()
-
-        expr_left = self.parse_high()
-        while token := self.accept(
-                    ('OP', '+'),
-                    ('OP', '-'),
-        ):
-            expr_left = BinaryOp(token.value, expr_left, self.parse_high())
-        return expr_left
-
-    def parse_high(self):
+    def parse_binary(self, min_precedence):
         self.assert_not_end()
 
         expr_left = self.parse_atom()
-        while token := self.accept(
-                ('OP', '*'),
-                ('OP', '/'),
-                ('VAR', None),
-        ):
+        while (token := self.current()) and (precedence := PRECEDENCES.get(token, IMPLICIT.get(token.type, 0))) >= min_precedence:
+            self.advance()
             if token.type == 'OP':
-                expr_left = BinaryOp(token.value, expr_left, self.parse_atom())
-            elif isinstance(expr_left, Literal):
-                expr_left = BinaryOp('*', expr_left, Variable(token.value))
-            elif isinstance(expr_left, UnaryOp):
+                expr_left = BinaryOp(token.value, expr_left, self.parse_binary(precedence + 1))
+            elif isinstance(expr_left, (Literal, UnaryOp)):
                 expr_left = BinaryOp('*', expr_left, Variable(token.value))
             else:
                 msg = f'Unexpected token {token} after {expr_left}'
@@ -122,6 +119,13 @@ class Parser:
                 ('OP', '-'),
         ):
             return UnaryOp(token.value, self.parse_atom())
+        if self.accept_indexed('forall'):
+            msg = 'Constraint families are only allowed as whole rows'
+            raise SyntaxError(msg)
+        if self.accept_indexed('sum'):
+            self.indexed = True
+            indices = self.parse_indices()
+            return Sum(indices, self.parse_binary(HIGH))
         if token := self.accept(
                 ('BOOL', None),
                 ('NUMBER', None),
@@ -146,3 +150,29 @@ class Parser:
 
         msg = f'Unexpected token {self.current()}'
         raise SyntaxError(msg)
+
+    # "(i in 1..n, j in i..n)", where "in" is a keyword
+    def parse_indices(self):
+        self.expect(('LPAREN', None))
+        indices = []
+        while True:
+            name = self.expect(('VAR', None)).value
+            self.expect(('VAR', 'in'))
+            low = self.parse_index_bound()
+            self.expect(('RANGE', None))
+            high = self.parse_index_bound()
+            indices.append((name, low, high))
+            if not self.accept(('COMMA', None)):
+                break
+        self.expect(('RPAREN', None))
+        return indices
+
+    def parse_index_bound(self):
+        if token := self.accept(('VAR', None)):
+            return token.value
+        sign = -1 if self.accept(('OP', '-')) else 1
+        token = self.expect(('NUMBER', None))
+        if not isinstance(token.value, int):
+            msg = f'Index bounds must be integers, got {token.value}'
+            raise SyntaxError(msg)
+        return sign*token.value
@@ -1,73 +1,62 @@
 import collections
+import fractions
+import re
 
 
 Token = collections.namedtuple('Token', ['type', 'value'])
 
-KEYWORDS = {'min', 'max', 'and', 'or', 'xor', 'not', 'if', 'iif'}
-MULTI_CHAR_OPS = {'==', '!=', '<=', '>='}
-SINGLE_CHAR_OPS = {'+', '-', '*', '/', '<', '>', '!', '='}
-IDENTIFIERS_CHARS = {'_', '$', '@'}
-
-def tokenize(s):
-    tokens = []
-    i = 0
-    while i < len(s):
-        c = s[i]
+# exact value of a number written with a decimal point, printed as the float
+# it reads as; arithmetic on it gives plain fractions
+class DecimalFraction(fractions.Fraction):
+    __slots__ = ()
 
-        if c.isspace():
-            i += 1
-            continue
+    def __str__(self):
+        return repr(float(self))
 
-        # numbers
-        if c.isdigit():
-            start = i
-            has_dot = False
-            while i < len(s) and (s[i].isdigit() or (s[i] == '.' and not has_dot)):
-                if s[i] == '.':
-                    has_dot = True
-                i += 1
-            num = s[start:i]
-            value = float(num) if has_dot else int(num)
-            tokens.append(Token('NUMBER', value))
+    def __repr__(self):
+        return f'{self.__class__.__name__}({self.numerator}, {self.denominator})'
 
-        # identifiers and keywords
-        elif c.isidentifier() or c in IDENTIFIERS_CHARS:
-            start = i
-            while i < len(s) and (s[i].isalnum() or s[i] in IDENTIFIERS_CHARS):
-                i += 1
-            word = s[start:i]
-            if word in KEYWORDS:
-                tokens.append(Token('OP', word))
-            elif word == 'True':
-                tokens.append(Token('BOOL', True))
-            elif word == 'False':
-                tokens.append(Token('BOOL', False))
-            elif word == 'inf':
-                tokens.append(Token('NUMBER', float(word)))
-            else:
-                tokens.append(Token('VAR', word))
+    def __reduce__(self):
+        return self.__class__, (self.numerator, self.denominator)
 
-        # lists
-        elif c in {'(', ')', ','}:
-            tmp = {'(': 'LPAREN', ')': 'RPAREN', ',': 'COMMA'}
-            tokens.append(Token(tmp[c], c))
-            i += 1
+# "sum", "forall" and "in" are words, only keywords where the parser expects
+# indices (see Parser.accept_indexed)
+KEYWORDS = {'min', 'max', 'and', 'or', 'xor', 'not', 'if', 'iif'}
 
-        # operators
-        elif c in SINGLE_CHAR_OPS:
-            next_two = s[i:i+2]
-            if next_two in MULTI_CHAR_OPS:
-                tokens.append(Token('OP', next_two))
-                i += 2
-            elif c == '!':
-                tokens.append(Token('OP', 'not'))
-                i += 1
-            else:
-                tokens.append(Token('OP', c))
-                i += 1
+# each match skips leading whitespace then captures exactly one token
+TOKEN_REGEX = re.compile(r'''\s*(?:
+    (?P<WORD>(?:[^\W\d]|[$@])[\w$@]*)
+  | (?P<SYMBOL>==|!=|<=|>=|\.\.|[-+*/<>!=(),])
+  | (?P<NUMBER>\d+(?:\.(?!\.)\d*)?)
+  | (?P<ERROR>\S)
+)''', re.VERBOSE)
+
+WORD_TOKENS = {
+    **{word: Token('OP', word) for word in KEYWORDS},
+    'True': Token('BOOL', True),
+    'False': Token('BOOL', False),
+    'inf': Token('NUMBER', float('inf')),
+}
+SYMBOL_TOKENS = {
+    **{op: Token('OP', op) for op in ('==', '!=', '<=', '>=', '+', '-', '*', '/', '<', '>', '=')},
+    '!': Token('OP', 'not'),
+    '(': Token('LPAREN', '('),
+    ')': Token('RPAREN', ')'),
+    ',': Token('COMMA', ','),
+    '..': Token('RANGE', '..'),
+}
 
+def tokenize(s):
+    words = WORD_TOKENS.get
+    for m in TOKEN_REGEX.finditer(s):
+        kind = m.lastgroup
+        text = m[kind]
+        if kind == 'WORD':
+            yield words(text) or Token('VAR', text)
+        elif kind == 'SYMBOL':
+            yield SYMBOL_TOKENS[text]
+        elif kind == 'NUMBER':
+            yield Token('NUMBER', DecimalFraction(text) if '.' in text else int(text))
         else:
-            msg = f'Unexpected character: {c}'
+            msg = f'Unexpected character: {text}'
             raise SyntaxError(msg)
-
-    return tokens
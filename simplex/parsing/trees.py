@@ -1,24 +1,182 @@
+import fractions
+
 from .nodes import (
     BinaryOp,
+    ExprList,
     Literal,
     Objective,
+    Points,
     UnaryOp,
     Variable,
 )
+from .indexed import Forall, instantiate
+from .linear import parse_linear
 from .parser import Parser
 from .tokenizer import tokenize
 
 
+# variable name -> [(order, path)] of its occurrences in reading order, paths
+# going up from the variable to the root as nested (position, parent path)
+# pairs, so that building them is linear; orders are tuples, so that the
+# occurrences of a substituted expression can be ordered within the place
+# they take. Lists are not indexed (False), as their items' own variables do
+# not count (see Expr.visit)
+def _index(root):
+    index = {}
+    count = 0
+    stack = [(root, None)]
+    while stack:
+        node, path = stack.pop()
+        if isinstance(node, Variable):
+            index.setdefault(node.name, []).append(((count, ), path))
+            count += 1
+        elif isinstance(node, ExprList):
+            return False
+        else:
+            children = node.children()
+            stack.extend((children[i], (i, path)) for i in reversed(range(len(children))))
+    return index
+
+def _positions(path):
+    positions = []
+    while path is not None:
+        i, path = path
+        positions.append(i)
+    positions.reverse()
+    return positions
+
+# root with the node at `path` replaced, rebuilding only the nodes above it
+def _replace_at(root, path, new):
+    positions = _positions(path)
+    nodes = [root]
+    for i in positions[:-1]:
+        nodes.append(nodes[-1].children()[i])
+    for node, i in zip(reversed(nodes), reversed(positions)):
+        children = list(node.children())
+        children[i] = new
+        new = node.rebuild(children)
+    return new
+
+def _rebase(path, base):
+    for i in _positions(path):
+        base = (i, base)
+    return base
+
+def _first(occurrence):
+    return occurrence[0]
+
+# variable names of a tree, as an insertion-ordered dict (name -> None) so
+# that membership is a lookup; it takes the list methods the solvers use on
+# it, and compares (and prints) as the list of its names, order included
+class Variables(dict):
+    def __init__(self, names=()):
+        super().__init__(dict.fromkeys(names))
+
+    def append(self, name):
+        self[name] = None
+
+    def extend(self, names):
+        self.update(dict.fromkeys(names))
+
+    def __iadd__(self, names):
+        self.extend(names)
+        return self
+
+    def remove(self, name):
+        del self[name]
+
+    def __eq__(self, other):
+        if isinstance(other, (dict, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        if isinstance(other, (dict, list, tuple)):
+            return list(self) != list(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return repr(list(self))
+
 class ExprTree:
+    # whether plain linear rows may skip the parser and validation passes
+    LINEAR_ROWS = True
+
     @classmethod
     def from_string(cls, s):
-        tokens = tokenize(s)
-        return cls(Parser(tokens).parse())
+        if cls.LINEAR_ROWS and (tmp := parse_linear(s)):
+            return cls.from_linear(*tmp)
+        parser = Parser(tokenize(s))
+        root = parser.parse()
+        if isinstance(root, Forall):
+            msg = 'Constraint families are only allowed as program rows'
+            raise SyntaxError(msg)
+        if parser.indexed:
+            root = instantiate(root)
+        return cls(root)
+
+    # trees of a constraint family ("forall(i in 1..n) x_i <= 1"), built one
+    # at a time, or the single tree of any other row
+    @classmethod
+    def iter_from_string(cls, s):
+        root = Parser(tokenize(s)).parse()
+        if not isinstance(root, Forall):
+            yield cls(instantiate(root))
+            return
+        for member in root.expand():
+            yield cls(member)
+
+    @classmethod
+    def from_linear(cls, root, linear):
+        tree = cls.from_root(root, list(linear.coefs))
+        tree.linear = linear
+        return tree
+
+    # tree whose root is known to be valid (e.g. it was checked when the
+    # program was first read, or the solver built it): no typing checks, and
+    # no variable search either when the variables are known
+    @classmethod
+    def from_root(cls, root, variables=None):
+        tree = cls.__new__(cls)
+        tree.root = root
+        tree.variables = tree._find_variables(root) if variables is None else variables
+        return tree
+
+    # checks of LinExprTree and MathTree, run within the same pass
+    CHECK_LINEAR = False
+    CHECK_NUMERIC = False
 
     def __init__(self, root):
         self.root = root
-        self.variables = self._find_variables(self.root)
-        self._check_for_obvious_typing_errors(self.root)
+        self.variables = self._validate(self.root)
+
+    @property
+    def root(self):
+        return self._root
+
+    @root.setter
+    def root(self, root):
+        self._root = root
+        self.linear = None
+        self._occurrences = None
+
+    # see Variables; lists set here are copied into one
+    @property
+    def variables(self):
+        return self._variables
+
+    @variables.setter
+    def variables(self, names):
+        self._variables = names if names.__class__ is Variables else Variables(names)
+
+    # see _index; built on first use, kept up to date by rename and replace,
+    # and dropped whenever the root is set
+    def occurrences(self):
+        if self._occurrences is None:
+            self._occurrences = _index(self._root)
+        return self._occurrences
 
     def __str__(self):
         return str(self.root)
@@ -26,35 +184,80 @@ class ExprTree:
     def evaluate(self, context):
         return self.root.evaluate(context)
 
+    # see Expr.compile and Expr.evaluate_batch; the result types are not
+    # checked
+    def compile(self):
+        return self._root.compile()
+
+    def evaluate_batch(self, points):
+        return self._root.evaluate_batch(points)
+
+    # new tree over the same nodes, which may then be shared by several
+    # trees as long as they are only ever replaced, never modified
+    def copy(self):
+        tree = self.from_root(self.root, Variables(self.variables))
+        if self.linear:
+            tree.linear = self.linear.copy()
+        return tree
+
+    # both only rebuild the nodes above the occurrences of the variable
     def rename(self, old, new):
         if old not in self.variables:
             return
-        def visitor(node):
-            if isinstance(node, Variable) and node.name == old:
-                node.name = new
-        self.root.visit(visitor)
-        self.variables = [new if var == old else var for var in self.variables]
+        linear = self.linear
+        if (index := self.occurrences()) is False:
+            def visitor(node):
+                if isinstance(node, Variable) and node.name == old:
+                    return Variable(new)
+                return node
+            self.root = self.root.rewrite(visitor)
+        elif places := index.pop(old, None):
+            leaf = Variable(new)
+            root = self._root
+            for _, path in places:
+                root = _replace_at(root, path, leaf)
+            self._root = root
+            index[new] = sorted(index.get(new, []) + places, key=_first)
+        self.variables = (new if var == old else var for var in self.variables)
+        if linear:
+            linear.rename(old, new)
+            self.linear = linear
 
+    # `old` is a variable (or its name), or any expression, which is then
+    # looked for everywhere by its string
     def replace(self, old, new):
-        def visitor(node):
-            if str(node) == str(old):
-                return new
-            return node
-        self.root = self.root.rewrite(visitor)
-        self.variables = self._find_variables(self.root)
+        name = old.name if isinstance(old, Variable) else old if isinstance(old, str) else None
+        if name is None or (index := self.occurrences()) is False or (added := _index(new)) is False:
+            def visitor(node):
+                if str(node) == str(old):
+                    return new
+                return node
+            self.root = self.root.rewrite(visitor)
+            self.variables = self._find_variables(self.root)
+            return
+        places = index.pop(name, [])
+        root = self._root
+        for _, path in places:
+            root = _replace_at(root, path, new)
+        self.root = root
+        for var, occurrences in added.items():
+            occurrences = [(order + suborder, _rebase(subpath, path)) for order, path in places for suborder, subpath in occurrences]
+            if occurrences:
+                index[var] = sorted(index.get(var, []) + occurrences, key=_first)
+        self._occurrences = index
+        self.variables = sorted(index, key=lambda var: index[var][0][0])
 
     def _find_variables(self, root):
-        variables = []
+        variables = Variables()
         def visitor(node):
-            nonlocal variables
-            if isinstance(node, Variable) and node.name not in variables:
-                variables.append(node.name)
+            if node.__class__ is Variable:
+                variables[node.name] = None
         root.visit(visitor)
         return variables
 
     def _is_obvious_math(self, node):
         if isinstance(node, Literal):
-            return isinstance(node.value, (int, float)) and not isinstance(node.value, bool)
+            return isinstance(node.value, (int, float, fractions.Fraction)) and not isinstance(node.value, bool)
         if isinstance(node, BinaryOp):
             return node.op in {'+', '-', '*', '/'}
         if isinstance(node, UnaryOp):
@@ -72,59 +275,81 @@ class ExprTree:
 
     BOOL_FOUND_BUT_NUM_EXPECTED = 'Expression appears to be Boolean, but a numeric expression was expected'
     NUM_FOUND_BUT_BOOL_EXPECTED = 'Expression appears to be numeric, but a Boolean expression was expected'
+    NONLINEAR = 'Invalid non-linear expression'
+    BOOL_IN_NUMERIC = 'Invalid Boolean operator in numerical expression'
 
-    def _check_for_obvious_typing_errors(self, node):
-        def visitor(node):
-            if isinstance(node, BinaryOp):
-                math_left = self._is_obvious_math(node.left)
-                math_right = self._is_obvious_math(node.right)
-                bool_left = self._is_obvious_bool(node.left)
-                bool_right = self._is_obvious_bool(node.right)
-                if node.op in {'+', '-', '*', '/', '<=', '>=', '<', '>'} and (bool_left or bool_right):
-                    raise TypeError(self.BOOL_FOUND_BUT_NUM_EXPECTED)
-                if node.op in {'and', 'or'} and (math_left or math_right):
-                    raise TypeError(self.NUM_FOUND_BUT_BOOL_EXPECTED)
-            elif isinstance(node, UnaryOp):
-                math_right = self._is_obvious_math(node.right)
-                bool_right = self._is_obvious_bool(node.right)
-                if node.op == '-' and bool_right:
-                    raise TypeError(self.BOOL_FOUND_BUT_NUM_EXPECTED)
-                if node.op == 'not' and math_right:
-                    raise TypeError(self.NUM_FOUND_BUT_BOOL_EXPECTED)
-        node.visit(visitor)
+    def _typing_error(self, node):
+        if isinstance(node, BinaryOp):
+            math_left = self._is_obvious_math(node.left)
+            math_right = self._is_obvious_math(node.right)
+            bool_left = self._is_obvious_bool(node.left)
+            bool_right = self._is_obvious_bool(node.right)
+            if node.op in {'+', '-', '*', '/', '<=', '>=', '<', '>'} and (bool_left or bool_right):
+                return self.BOOL_FOUND_BUT_NUM_EXPECTED
+            if node.op in {'and', 'or'} and (math_left or math_right):
+                return self.NUM_FOUND_BUT_BOOL_EXPECTED
+        elif isinstance(node, UnaryOp):
+            math_right = self._is_obvious_math(node.right)
+            bool_right = self._is_obvious_bool(node.right)
+            if node.op == '-' and bool_right:
+                return self.BOOL_FOUND_BUT_NUM_EXPECTED
+            if node.op == 'not' and math_right:
+                return self.NUM_FOUND_BUT_BOOL_EXPECTED
+        return None
 
-class LinExprTree(ExprTree):
-    def __init__(self, s):
-        super().__init__(s)
-        def visitor(node):
-            if (isinstance(node, BinaryOp) and
-                ((node.op == '*' and self._check_if_variable(node.left) and self._check_if_variable(node.right)) or
-                 (node.op == '/' and self._check_if_variable(node.right)))):
-                msg = 'Invalid non-linear expression'
-                raise TypeError(msg)
-        self.root.visit(visitor)
-
-    def _check_if_variable(self, node):
-        b = False
-        def visitor(node):
-            nonlocal b
+    # variables and checks in a single pass over the nodes Expr.visit shows
+    # (level 2 below, 1 for list items, whose subtrees are walked unseen so
+    # as to know whether they hold variables, like a visit of them would);
+    # the first error of each check is kept, and they are raised in the
+    # order of the checks
+    def _validate(self, root):
+        variables = Variables()
+        errors = [None, None, None]
+        has_var = []
+        stack = [(root, 2, False)]
+        while stack:
+            node, level, done = stack.pop()
+            children = node.children()
+            if children and not done:
+                stack.append((node, level, True))
+                sublevel = (1 if isinstance(node, ExprList) else 2) if level == 2 else 0
+                stack.extend((child, sublevel, False) for child in reversed(children))
+                continue
+            below = has_var[len(has_var)-len(children):]
+            del has_var[len(has_var)-len(children):]
             if isinstance(node, Variable):
-                b = True
-        node.visit(visitor)
-        return b
+                has_var.append(True)
+                if level:
+                    variables[node.name] = None
+                continue
+            if isinstance(node, ExprList):
+                has_var.append(any(isinstance(item, Variable) for item in children))
+                continue
+            has_var.append(any(below))
+            if not level:
+                continue
+            if errors[0] is None:
+                errors[0] = self._typing_error(node)
+            if (self.CHECK_LINEAR and errors[1] is None and isinstance(node, BinaryOp) and
+                ((node.op == '*' and below[0] and below[1]) or (node.op == '/' and below[1]))):
+                errors[1] = self.NONLINEAR
+            if self.CHECK_NUMERIC and errors[2] is None and self._is_obvious_bool(node):
+                errors[2] = self.BOOL_IN_NUMERIC
+        for error in errors:
+            if error is not None:
+                raise TypeError(error)
+        return variables
+
+class LinExprTree(ExprTree):
+    CHECK_LINEAR = True
 
 class MathTree(LinExprTree):
-    def __init__(self, s):
-        super().__init__(s)
-        def visitor(node):
-            if self._is_obvious_bool(node):
-                msg = 'Invalid Boolean operator in numerical expression'
-                raise TypeError(msg)
-        self.root.visit(visitor)
+    LINEAR_ROWS = False
+    CHECK_NUMERIC = True
 
     def evaluate(self, context):
         result = super().evaluate(context)
-        if not isinstance(result, (int, float)):
+        if not isinstance(result, (int, float, fractions.Fraction)):
             msg = f'Expression evaluated to "{result}", but a numeric value was expected'
             raise TypeError(msg)
         return result
@@ -142,7 +367,26 @@ class BoolTree(LinExprTree):
             raise TypeError(msg)
         return result
 
+    # at each point, how far a comparison is from being violated (negative
+    # once it is, and never positive for equalities); for lists, the least of
+    # their items' slacks. None when the root is not a comparison
+    def slack_batch(self, points):
+        root = self.root
+        if not isinstance(root, BinaryOp) or root.op not in {'<=', '<', '>=', '>', '=='}:
+            return None
+        if not isinstance(points, Points):
+            points = Points(points)
+        terms = []
+        for left in root.left.exprlist if isinstance(root.left, ExprList) else [root.left]:
+            if root.op in {'<=', '<', '=='}:
+                terms.append(BinaryOp('-', root.right, left))
+            if root.op in {'>=', '>', '=='}:
+                terms.append(BinaryOp('-', left, root.right))
+        return points.minimum([points.evaluate(term) for term in terms])
+
 class ObjectiveTree(LinExprTree):
+    LINEAR_ROWS = False
+
     def __init__(self, s):
         super().__init__(s)
         if not isinstance(self.root, Objective):
@@ -159,8 +403,7 @@ class ObjectiveTree(LinExprTree):
             raise SyntaxError(msg)
         def visitor(node):
             if self._is_obvious_bool(node):
-                msg = 'Invalid Boolean operator in numerical expression'
-                raise TypeError(msg)
+                raise TypeError(self.BOOL_IN_NUMERIC)
         self.root.right.visit(visitor)
         var = self.root.var()
         def visitor(node):
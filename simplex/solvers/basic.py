@@ -1,16 +1,24 @@
 import re
 
 from simplex.core import AbstractSolver, Model, Rewriter, Tableau
-from simplex.parsing import BinaryOp, ExprList, Literal, UnaryOp, Variable
+from simplex.parsing import BinaryOp, ExprList, Literal, UnaryOp, Variable, decimal_value
 from simplex.parsing import BoolTree, MathTree, ObjectiveTree
-from simplex.utils import prefix_sort, prefix_unique
+from simplex.utils import parallel_map, prefix_sort, prefix_unique
 
 
+def _normalized(tree):
+    Rewriter().normalize(tree)
+    return tree
+
 class BasicSimplexSolver(AbstractSolver):
     def __init__(self):
         self.convert_from_dual = False
         self.convert_to_dual = False
         self.formatter = None
+        self.jobs = 1
+        # when set, tableau cells are held in this arena (see Tableau)
+        self.arena = None
+        self.prepared = False
         self.rewriter = Rewriter()
         self.renames = {}
         self.summary = {
@@ -28,6 +36,36 @@ class BasicSimplexSolver(AbstractSolver):
         }
 
     def solve(self):
+        if not self.prepared:
+            self.prepare()
+
+    # state reached by prepare(), from which solving can resume
+    def prepared_state(self):
+        return {
+            'from_dual': self.convert_from_dual,
+            'to_dual': self.convert_to_dual,
+            'model': self.model,
+            'initial_variables': self.initial_variables,
+            'artificial_variables': self.artificial_variables,
+            'initial_basis': self.initial_basis,
+            'renames': self.renames,
+            'summary': self.summary,
+        }
+
+    def load_prepared_state(self, state):
+        self.model = state['model']
+        self.initial_variables = state['initial_variables']
+        self.artificial_variables = state['artificial_variables']
+        self.initial_basis = state['initial_basis']
+        self.renames = state['renames']
+        self.summary = state['summary']
+        self.prepared = True
+        print(self.formatter.format_section('Preparation'))
+        print(self.formatter.format_decision('skipped: program loaded in standard form'))
+        print(self.formatter.format_model(self.model))
+
+    def prepare(self):
+        self.prepared = True
         self.initial_variables = self.model.variables[:]
         self.artificial_variables = []
         self.initial_basis = []
@@ -86,35 +124,36 @@ class BasicSimplexSolver(AbstractSolver):
         if self.summary['status'] != '???':
             return
 
-    def _cut_and_add(self, expr, acc, accstr):
+    # adds the parts of a conjunction to acc, skipping those already printed
+    # the same (seen, the set of their printed forms)
+    def _cut_and_add(self, expr, acc, seen):
         if isinstance(expr.root, ExprList):
             for e in expr.root.exprlist:
-                self._cut_and_add(BoolTree(e), acc, accstr)
+                self._cut_and_add(BoolTree(e), acc, seen)
             return
         if isinstance(expr.root, BinaryOp):
             if expr.root.op == 'and':
-                self._cut_and_add(BoolTree(expr.root.left), acc, accstr)
-                self._cut_and_add(BoolTree(expr.root.right), acc, accstr)
+                self._cut_and_add(BoolTree(expr.root.left), acc, seen)
+                self._cut_and_add(BoolTree(expr.root.right), acc, seen)
                 return
             if expr.root.op == 'or':
                 msg = '"or" expressions may not be linearisable'
                 raise RuntimeError(msg)
         exprstr = str(expr)
-        if not any(exprstr == s for s in accstr):
+        if exprstr not in seen:
             acc.append(expr)
-            accstr.append(exprstr)
+            seen.add(exprstr)
 
     def do_normalize(self, rename=True):
         # pre-normalize
         self.rewriter.normalize(self.model.objective)
-        for c in self.model.constraints:
-            self.rewriter.normalize(c)
+        self.model.constraints = list(parallel_map(_normalized, self.model.constraints, self.jobs))
 
         # split "and" constraints and expression lists ("x1, x2 >= 0")
         tmp = []
-        tmpstr = []
+        seen = set()
         for c in self.model.constraints:
-            self._cut_and_add(c, tmp, tmpstr)
+            self._cut_and_add(c, tmp, seen)
         self.model.constraints = tmp
 
         if rename:
@@ -127,7 +166,7 @@ class BasicSimplexSolver(AbstractSolver):
                     raise RuntimeError(msg)
                 print(self.formatter.format_decision(f'renamed "{oldvar}" into "{newvar}"'))
                 self.model.objective.rename(oldvar, newvar)
-                self.renames[oldvar] = MathTree(Variable(newvar))
+                self.renames[oldvar] = MathTree.from_root(Variable(newvar))
                 self.model.variables = [newvar if var == oldvar else var for var in self.model.variables]
 
             # then rename variables
@@ -143,18 +182,17 @@ class BasicSimplexSolver(AbstractSolver):
                     self.model.objective.rename(oldvar, f'{newvar}{varid}')
                     for tree in self.model.constraints:
                         tree.rename(oldvar, f'{newvar}{varid}')
-                    self.renames[oldvar] = MathTree(Variable(f'{newvar}{varid}'))
+                    self.renames[oldvar] = MathTree.from_root(Variable(f'{newvar}{varid}'))
                     self.model.variables.remove(oldvar)
                     self.model.variables.append(f'{newvar}{varid}')
 
         # re-normalize (to reorder variables)
         self.rewriter.normalize(self.model.objective)
-        for c in self.model.constraints:
-            self.rewriter.normalize(c)
+        self.model.constraints = list(parallel_map(_normalized, self.model.constraints, self.jobs))
 
         # compute variable list
         self.model.objective.variables = prefix_sort(self.model.objective.variables)
-        tmp = self.model.objective.variables[:]
+        tmp = list(self.model.objective.variables)
         for c in self.model.constraints:
             c.variables = prefix_sort(c.variables)
             tmp.extend(c.variables)
@@ -211,7 +249,7 @@ class BasicSimplexSolver(AbstractSolver):
                 op = '<=' if self.model.objective.root.mode == 'max' else '>='
             tmp = Literal(0)
             for i,k2 in enumerate(variables):
-                tmp = BinaryOp('+', tmp, BinaryOp('*', primal_coefs[i+1][k], k2))
+                tmp = BinaryOp('+', tmp, BinaryOp('*', primal_coefs[i+1][k], Variable(k2)))
             rhs = primal_coefs[0][k]
             dual_model.constraints.append(BoolTree.from_string(f'{tmp} {op} {rhs}'))
 
@@ -220,7 +258,7 @@ class BasicSimplexSolver(AbstractSolver):
         newvar = self.names['objective' if self.convert_from_dual else 'dual_objective']
         tmp = primal_coefs[0]['']
         for i,k in enumerate(variables):
-            tmp = BinaryOp('+', tmp, BinaryOp('*', primal_coefs[i+1][''], k))
+            tmp = BinaryOp('+', tmp, BinaryOp('*', primal_coefs[i+1][''], Variable(k)))
         dual_model.objective = ObjectiveTree.from_string(f'{mode} {newvar} = {tmp}')
         dual_model.variables = [newvar, *primal_variables]
 
@@ -239,9 +277,9 @@ class BasicSimplexSolver(AbstractSolver):
 
         # split new "and" constraints
         tmp = []
-        tmpstr = []
+        seen = set()
         for c in self.model.constraints:
-            self._cut_and_add(c, tmp, tmpstr)
+            self._cut_and_add(c, tmp, seen)
         self.model.constraints = tmp
 
         # rename single-variable constraints
@@ -297,7 +335,7 @@ class BasicSimplexSolver(AbstractSolver):
                         varid += 1
                     newexpr = to_expr(f'{newvar}{_varid} - {newvar}{varid}')
                     if oldvar in self.initial_variables:
-                        self.renames[oldvar] = MathTree(newexpr)
+                        self.renames[oldvar] = MathTree.from_root(newexpr)
                     else:
                         for v in self.renames.values():
                             v.replace(Variable(oldvar), newexpr)
@@ -318,7 +356,7 @@ class BasicSimplexSolver(AbstractSolver):
                     newexpr = to_expr(f'-{newvar}{varid}')
                     newexpr2 = to_expr(f'-{oldvar}')
                     if oldvar in self.initial_variables:
-                        self.renames[oldvar] = MathTree(newexpr)
+                        self.renames[oldvar] = MathTree.from_root(newexpr)
                     else:
                         for v in self.renames.values():
                             v.replace(Variable(oldvar), newexpr)
@@ -336,7 +374,7 @@ class BasicSimplexSolver(AbstractSolver):
                     newexpr = to_expr(f'-{newvar}{varid} + {varmax}')
                     newexpr2 = to_expr(f'{varmax} - {oldvar}')
                     if oldvar in self.initial_variables:
-                        self.renames[oldvar] = MathTree(newexpr)
+                        self.renames[oldvar] = MathTree.from_root(newexpr)
                     else:
                         for v in self.renames.values():
                             v.replace(Variable(oldvar), newexpr)
@@ -355,7 +393,7 @@ class BasicSimplexSolver(AbstractSolver):
                     newexpr = to_expr(f'-{newvar}{varid} - {tmp}')
                     newexpr2 = to_expr(f'-{oldvar} - {tmp}')
                     if oldvar in self.initial_variables:
-                        self.renames[oldvar] = MathTree(newexpr)
+                        self.renames[oldvar] = MathTree.from_root(newexpr)
                     else:
                         for v in self.renames.values():
                             v.replace(Variable(oldvar), newexpr)
@@ -391,7 +429,7 @@ class BasicSimplexSolver(AbstractSolver):
                 newexpr = to_expr(f'{newvar}{varid} + {varmin}')
                 newexpr2 = to_expr(f'{oldvar} - {varmin}')
                 if oldvar in self.initial_variables:
-                    self.renames[oldvar] = MathTree(newexpr)
+                    self.renames[oldvar] = MathTree.from_root(newexpr)
                 else:
                     for v in self.renames.values():
                         v.replace(Variable(oldvar), newexpr)
@@ -413,7 +451,7 @@ class BasicSimplexSolver(AbstractSolver):
                 newexpr = to_expr(f'{newvar}{varid} - {tmp}')
                 newexpr2 = to_expr(f'{oldvar} + {tmp}')
                 if oldvar in self.initial_variables:
-                    self.renames[oldvar] = MathTree(newexpr)
+                    self.renames[oldvar] = MathTree.from_root(newexpr)
                 else:
                     for v in self.renames.values():
                         v.replace(Variable(oldvar), newexpr)
@@ -446,7 +484,7 @@ class BasicSimplexSolver(AbstractSolver):
                 c.variables.append(f'{newvar}{varid}')
                 self.rewriter.normalize(c)
                 self.model.variables.append(f'{newvar}{varid}')
-                self.model.constraints.append(BoolTree(BinaryOp('>=', Variable(f'{newvar}{varid}'), Literal(0))))
+                self.model.constraints.append(BoolTree.from_root(BinaryOp('>=', Variable(f'{newvar}{varid}'), Literal(0))))
                 # introduce artificial variables
                 if c.root.right.evaluate({}) < 0:
                     print(self.formatter.format_info('problem: negative right-hand side'))
@@ -456,7 +494,7 @@ class BasicSimplexSolver(AbstractSolver):
                         varid += 1
                     c.root = BinaryOp('==', BinaryOp('+', UnaryOp('-', c.root.left), Variable(f'{newvar}{varid}')), UnaryOp('-', c.root.right))
                     c.variables.append(f'{newvar}{varid}')
-                    self.model.constraints.append(BoolTree(BinaryOp('>=', Variable(f'{newvar}{varid}'), Literal(0))))
+                    self.model.constraints.append(BoolTree.from_root(BinaryOp('>=', Variable(f'{newvar}{varid}'), Literal(0))))
                     self.model.variables.append(f'{newvar}{varid}')
                     self.artificial_variables.append(f'{newvar}{varid}')
                     print(self.formatter.format_decision(f'introduced artificial variable {newvar}{varid} >= 0'))
@@ -494,7 +532,7 @@ class BasicSimplexSolver(AbstractSolver):
     def do_trivial_final(self):
         if self.summary['status'] == 'INFEASIBLE':
             return
-        tab = Tableau(self.model.objective, self.model.constraints, [])
+        tab = Tableau(self.model.objective, self.model.constraints, [], self.arena)
         coefs_exprs = tab.coefs_obj(self.model.objective.variables)
         coefs_values = {k: -v.evaluate({}) for k,v in coefs_exprs.items()}
         context = {}
@@ -504,22 +542,22 @@ class BasicSimplexSolver(AbstractSolver):
                 context[k] = inf if self.model.objective.root.mode == 'max' else 0
             elif v < 0:
                 context[k] = inf if self.model.objective.root.mode == 'min' else 0
-        if abs(self.model.objective.evaluate(context)) == inf:
+        if abs(self.model.objective.compile()(context)) == inf:
             self.summary['status'] = 'UNBOUNDED'
         else:
             self.summary['status'] = 'SOLVED'
 
         # final values
         exprs = {v: Literal(0) for v in self.model.variables}
-        tmp_e = MathTree(self.model.objective.root.left)
+        tmp_e = MathTree.from_root(self.model.objective.root.left)
         self.rewriter.normalize(tmp_e)
         if isinstance(tmp_e.root, Variable):
             obj_v = tmp_e.root.name
-            exprs[obj_v] = Literal(self.model.objective.evaluate(context))
+            exprs[obj_v] = Literal(self.model.objective.compile()(context))
         else:
             assert isinstance(tmp_e.root.right, Variable)
             obj_v = tmp_e.root.right.name
-            exprs[obj_v] = Literal(-self.model.objective.evaluate(context))
+            exprs[obj_v] = Literal(-self.model.objective.compile()(context))
 
         self.summary['values'] = {}
         self.summary['values'][obj_v] = exprs[obj_v].evaluate({})
@@ -529,7 +567,7 @@ class BasicSimplexSolver(AbstractSolver):
                 if v == obj_v:
                     continue
                 if v in self.renames:
-                    tree = MathTree(self.renames[v].root)
+                    tree = MathTree.from_root(self.renames[v].root)
                     for v2 in tree.variables:
                         tree.replace(v2, exprs[v2])
                     self.rewriter.normalize(tree)
@@ -542,7 +580,7 @@ class BasicSimplexSolver(AbstractSolver):
 
         # sanity check
         for line in self.tableau.data[1:]:
-            if line[''].evaluate({}) < 0:
+            if line[''].compile()({}) < 0:
                 msg = 'negative RHS for basic variable?!'
                 raise RuntimeError(msg)
 
@@ -552,14 +590,14 @@ class BasicSimplexSolver(AbstractSolver):
         coefs_exprs = self.tableau.coefs_obj(candidates)
         if self.formatter.opposite_obj:
             coefs_exprs = {k: Rewriter().normalize_tree(UnaryOp('-', v)) for k,v in coefs_exprs.items()}
-        coefs_values = {k: coefs_exprs[k].evaluate({}) for k in candidates}
+        coefs_values = {k: coefs_exprs[k].compile()({}) for k in candidates}
         tmp = 'coefficients in objective row:'
         for k in candidates:
             e = coefs_exprs[k]
-            v = coefs_values[k]
+            v = decimal_value(coefs_values[k])
             tmp += f' {k}: {e}'
             if str(e) != str(v):
-                tmp += f'={round(coefs_values[k], 8)}'
+                tmp += f'={round(v, 8)}'
             tmp += ' ;'
         print(self.formatter.format_info(tmp[:-2]))
         if self.formatter.opposite_obj:
@@ -592,14 +630,14 @@ class BasicSimplexSolver(AbstractSolver):
         col_lit = self.tableau.coefs_column('')
         col_var = self.tableau.coefs_column(var_in)
         coefs_exprs = {k: col_var[k] for k in candidates}
-        coefs_values = {k: coefs_exprs[k].evaluate({}) for k in candidates}
+        coefs_values = {k: coefs_exprs[k].compile()({}) for k in candidates}
         tmp = f'coefficients in {var_in} column:'
         for k in candidates:
             e = coefs_exprs[k]
-            v = coefs_values[k]
+            v = decimal_value(coefs_values[k])
             tmp += f' {k}: {e}'
             if str(e) != str(v):
-                tmp += f'={round(coefs_values[k], 8)}'
+                tmp += f'={round(v, 8)}'
             tmp += ' ;'
         print(self.formatter.format_info(tmp[:-2]))
         candidates = [k for k in candidates if coefs_values[k] > 0]
@@ -610,14 +648,14 @@ class BasicSimplexSolver(AbstractSolver):
         if len(candidates) < len(self.tableau.basis):
             print(self.formatter.format_decision('discarded any variable without a positive coefficient'))
         coefs_exprs = {k: Rewriter().normalize_tree(BinaryOp('/', col_lit[k], col_var[k])) for k in candidates}
-        coefs_values = {k: coefs_exprs[k].evaluate({}) for k in candidates}
+        coefs_values = {k: coefs_exprs[k].compile()({}) for k in candidates}
         tmp = 'ratios:'
         for k in candidates:
             e = coefs_exprs[k]
-            v = coefs_values[k]
+            v = decimal_value(coefs_values[k])
             tmp += f' {k}: {e}'
             if str(e) != str(v):
-                tmp += f'={round(coefs_values[k], 8)}'
+                tmp += f'={round(v, 8)}'
             tmp += ' ;'
         print(self.formatter.format_info(tmp[:-2]))
         candidates = [k for k in candidates if coefs_values[k] >= 0]
@@ -644,7 +682,7 @@ class BasicSimplexSolver(AbstractSolver):
         for k in self.tableau.basis:
             row = self.tableau.coefs_row(k)
             exprs[k] = row['']
-        tmp_e = MathTree(self.model.objective.root.left)
+        tmp_e = MathTree.from_root(self.model.objective.root.left)
         self.rewriter.normalize(tmp_e)
         if isinstance(tmp_e.root, Variable):
             obj_v = tmp_e.root.name
@@ -652,7 +690,7 @@ class BasicSimplexSolver(AbstractSolver):
         else:
             assert isinstance(tmp_e.root.right, Variable)
             obj_v = tmp_e.root.right.name
-            tmp_e = MathTree(UnaryOp('-', self.tableau.data[0]['']))
+            tmp_e = MathTree.from_root(UnaryOp('-', self.tableau.data[0]['']))
             self.rewriter.normalize(tmp_e)
             exprs[obj_v] = tmp_e.root
 
@@ -669,7 +707,7 @@ class BasicSimplexSolver(AbstractSolver):
                 if v == obj_v:
                     continue
                 if v in self.renames:
-                    tree = MathTree(self.renames[v].root)
+                    tree = MathTree.from_root(self.renames[v].root)
                     for v2 in tree.variables:
                         tree.replace(v2, exprs[v2])
                     self.rewriter.normalize(tree)
@@ -1,7 +1,7 @@
 from .basic import BasicSimplexSolver
 
 from simplex.core import Tableau
-from simplex.parsing import BinaryOp, Literal, Variable
+from simplex.parsing import BinaryOp, Literal, Objective, Variable
 
 
 class BigmSimplexSolver(BasicSimplexSolver):
@@ -20,11 +20,12 @@ class BigmSimplexSolver(BasicSimplexSolver):
             print('Using M =', self.m)
             print('Updating objective function:')
             for k in self.artificial_variables:
-                self.model.objective.root.right = BinaryOp('+', self.model.objective.root.right, BinaryOp('*', Literal(-self.m), Variable(k)))
+                root = self.model.objective.root
+                self.model.objective.root = Objective(root.mode, root.left, BinaryOp('+', root.right, BinaryOp('*', Literal(-self.m), Variable(k))))
                 self.model.objective.variables.append(k)
             print(self.formatter.format_objective(self.model))
             self.rewriter.normalize(self.model.objective)
-            self.tableau = Tableau(self.model.objective, self.model.constraints, self.initial_basis)
+            self.tableau = Tableau(self.model.objective, self.model.constraints, self.initial_basis, self.arena)
             for var in self.artificial_variables:
                 self.tableau.pivot(var, var)
             print('Initial basis')
@@ -43,7 +44,7 @@ class BigmSimplexSolver(BasicSimplexSolver):
                 print(self.formatter.format_decision('infeasible (stopped with non-null artificial variable in basis)'))
                 self.summary['status'] = 'INFEASIBLE'
         else:
-            self.tableau = Tableau(self.model.objective, self.model.constraints, self.initial_basis)
+            self.tableau = Tableau(self.model.objective, self.model.constraints, self.initial_basis, self.arena)
             print(self.formatter.format_section('Simplex Method'))
             print('Initial basis')
             print(self.formatter.format_tableau(self.tableau))
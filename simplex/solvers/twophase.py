@@ -1,7 +1,7 @@
 from .basic import BasicSimplexSolver
 
 from simplex.core import Model, Tableau
-from simplex.parsing import BinaryOp, UnaryOp, Variable
+from simplex.parsing import BinaryOp, Objective, UnaryOp, Variable
 
 
 class TwophaseSimplexSolver(BasicSimplexSolver):
@@ -17,7 +17,8 @@ class TwophaseSimplexSolver(BasicSimplexSolver):
             obj_v = sub_model.objective.root.var()
             sub_model.variables.remove(obj_v.name)
             sub_model.objective.variables.remove(obj_v.name)
-            sub_model.objective.root.left = Variable(self.names['artificial'])
+            root = sub_model.objective.root
+            sub_model.objective.root = Objective(root.mode, Variable(self.names['artificial']), root.right)
             sub_model.variables.append(self.names['artificial'])
             sub_model.objective.variables.append(self.names['artificial'])
             tmp = None
@@ -27,11 +28,12 @@ class TwophaseSimplexSolver(BasicSimplexSolver):
                 else:
                     tmp = BinaryOp('+', tmp, UnaryOp('-', Variable(var)))
                 sub_model.objective.variables.append(var)
-            sub_model.objective.root.right = tmp
+            root = sub_model.objective.root
+            sub_model.objective.root = Objective(root.mode, root.left, tmp)
             self.rewriter.normalize(sub_model.objective)
             print('New problem:')
             print(self.formatter.format_model(sub_model))
-            self.tableau = Tableau(sub_model.objective, sub_model.constraints, self.initial_basis)
+            self.tableau = Tableau(sub_model.objective, sub_model.constraints, self.initial_basis, self.arena)
             for var in self.artificial_variables:
                 self.tableau.pivot(var, var)
             print('Initial basis:')
@@ -49,7 +51,7 @@ class TwophaseSimplexSolver(BasicSimplexSolver):
                 self.summary['status'] = '???'
         if self.summary['status'] == 'SOLVED':
             tmp_tableau = self.tableau
-            self.tableau = Tableau(self.model.objective, self.model.constraints, self.tableau.basis)
+            self.tableau = Tableau(self.model.objective, self.model.constraints, self.tableau.basis, self.arena)
             self.tableau.data[1:] = tmp_tableau.data[1:]
             for k in self.tableau.basis:
                 self.tableau.pivot(k, k)
@@ -59,7 +61,7 @@ class TwophaseSimplexSolver(BasicSimplexSolver):
                 print(self.formatter.format_section('Phase II: Initial Problem'))
                 print(self.formatter.format_action('Dealing with artificial variables'))
                 tmp_tableau = self.tableau
-                self.tableau = Tableau(self.model.objective, self.model.constraints, self.tableau.basis)
+                self.tableau = Tableau(self.model.objective, self.model.constraints, self.tableau.basis, self.arena)
                 self.tableau.data[1:] = tmp_tableau.data[1:]
                 problematic = [k for k in self.artificial_variables if k in self.tableau.basis]
                 if problematic:
@@ -84,7 +86,7 @@ class TwophaseSimplexSolver(BasicSimplexSolver):
                 print(self.formatter.format_decision('removed all artificial variables'))
             else:
                 print(self.formatter.format_section('Simplex Method'))
-                self.tableau = Tableau(self.model.objective, self.model.constraints, self.initial_basis)
+                self.tableau = Tableau(self.model.objective, self.model.constraints, self.initial_basis, self.arena)
             print('Initial basis:')
             while self.summary['status'] == '???':
                 print(self.formatter.format_tableau(self.tableau))
@@ -1 +1,5 @@
+from .collect import gc_paused
+from .lines import iter_lines
+from .parallel import parallel_map
 from .sort import prefix_sort, prefix_unique
+from .watch import watch_file
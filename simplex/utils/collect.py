@@ -0,0 +1,15 @@
+import contextlib
+import gc
+
+
+# garbage collection held off while building many objects that hold no
+# cycles, the previous state being restored after
+@contextlib.contextmanager
+def gc_paused():
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
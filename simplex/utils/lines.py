@@ -0,0 +1,16 @@
+import mmap
+import pathlib
+
+
+def iter_lines(filename, use_mmap=False):
+    if not use_mmap:
+        with pathlib.Path.open(filename, 'r') as f:
+            for line in f:
+                yield line.rstrip('\n')
+        return
+    with pathlib.Path.open(filename, 'rb') as f:
+        if not pathlib.Path(filename).stat().st_size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            for line in iter(m.readline, b''):
+                yield line.decode().rstrip('\r\n')
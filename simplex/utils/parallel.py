@@ -0,0 +1,43 @@
+import concurrent.futures
+import functools
+import gc
+import pickle
+
+from .collect import gc_paused
+
+
+def _map_chunk(func, chunk):
+    # stop at the first failure and hand the exception back as a result, so
+    # that the caller can raise it at the right position
+    results = []
+    for item in chunk:
+        try:
+            results.append(func(item))
+        except Exception as e:
+            results.append(e)
+            break
+    return pickle.dumps(results, pickle.HIGHEST_PROTOCOL)
+
+def _loads(data):
+    # loading thousands of small nodes at once would otherwise trigger many
+    # garbage collections that find nothing to free
+    with gc_paused():
+        return pickle.loads(data)
+
+def parallel_map(func, items, jobs=1, chunks_per_job=4):
+    # same as map(func, items) (results in order, first error raised where
+    # the serial loop would raise it) but spread across worker processes
+    if jobs <= 1:
+        yield from map(func, items)
+        return
+    items = list(items)
+    if not items:
+        return
+    size = -(-len(items) // (jobs*chunks_per_job))
+    chunks = [items[i:i+size] for i in range(0, len(items), size)]
+    with concurrent.futures.ProcessPoolExecutor(jobs, initializer=gc.disable) as executor:
+        for data in executor.map(functools.partial(_map_chunk, func), chunks):
+            for result in _loads(data):
+                if isinstance(result, Exception):
+                    raise result
+                yield result
@@ -17,4 +17,5 @@ def prefix_sort(unsorted):
 
 def prefix_unique(unsorted):
     tmp = prefix_sort(unsorted)
-    return sorted(set(unsorted), key=lambda x: tmp.index(x))
+    rank = {x: k for k, x in reversed(list(enumerate(tmp)))}
+    return sorted(set(unsorted), key=rank.__getitem__)
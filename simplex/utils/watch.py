@@ -0,0 +1,17 @@
+import pathlib
+import time
+
+
+# yields once right away, then every time the file is modified
+def watch_file(filename, interval=0.5):
+    last = None
+    while True:
+        try:
+            stat = pathlib.Path(filename).stat()
+            stamp = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp is not None and stamp != last:
+            last = stamp
+            yield
+        time.sleep(interval)
@@ -0,0 +1,85 @@
+import contextlib
+import io
+import pathlib
+
+import pytest
+
+from simplex.__main__ import Options, main
+from simplex.core import PreparedCache
+
+
+RAW = """max z = 2x1 + 3x2
+x1 + x2 <= 4
+x1 + 3x2 <= 6
+x1, x2 >= 0
+"""
+
+def run(path, cache, solver='bigm', method='dictionary', from_dual=False, mps_fixed=False):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        summary = main(path, solver, from_dual, False, method, False, 3628800, Options(cache=cache, mps_fixed=mps_fixed))
+    return summary, out.getvalue()
+
+@pytest.fixture
+def program(tmp_path):
+    path = tmp_path / 'program'
+    path.write_text(RAW)
+    return path
+
+def test_cache_hit(program):
+    cache = PreparedCache()
+    expected, _ = run(program, cache)
+    assert (cache.hits, cache.misses) == (0, 1)
+    for solver, method in [('bigm', 'tableau'), ('twophase', 'dictionary'), ('bigm', 'dictionary')]:
+        summary, out = run(program, cache, solver, method)
+        assert 'skipped: program loaded in standard form' in out
+        assert 'Normalization' not in out
+        assert summary['status'] == expected['status'] == 'SOLVED'
+        assert summary['values'] == expected['values']
+    assert (cache.hits, cache.misses) == (3, 1)
+
+def test_cache_key(program):
+    cache = PreparedCache()
+    run(program, cache)
+    run(program, cache, from_dual=True)
+    assert (cache.hits, cache.misses) == (0, 2)
+    program.write_text(RAW.replace('<= 6', '<= 7'))
+    run(program, cache)
+    assert (cache.hits, cache.misses) == (0, 3)
+    assert PreparedCache.key(RAW, False, True) == PreparedCache.key(RAW.encode(), False, True)
+    assert PreparedCache.key(RAW, False, True) != PreparedCache.key(RAW, True, False)
+    assert len({PreparedCache.key(RAW, False, False, fmt) for fmt in ('program', 'mps', 'mps_fixed')}) == 3
+
+# the same MPS bytes read as free-form and as fixed-format are two programs
+def test_cache_key_mps_fixed(tmp_path):
+    path = tmp_path / 'program.mps'
+    path.write_text(pathlib.Path('examples/test_solved7.mps').read_text())
+    cache = PreparedCache()
+    free, _ = run(path, cache)
+    fixed, _ = run(path, cache, mps_fixed=True)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert free['objective'] != fixed['objective']
+    assert run(path, cache, mps_fixed=True)[0]['objective'] == fixed['objective']
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_cache_eviction(tmp_path):
+    cache = PreparedCache(maxsize=2)
+    paths = []
+    for i in range(3):
+        paths.append(tmp_path / f'program{i}')
+        paths[-1].write_text(RAW.replace('<= 4', f'<= {i + 4}'))
+        run(paths[-1], cache)
+    assert (len(cache), cache.evictions) == (2, 1)
+    run(paths[2], cache)
+    run(paths[0], cache)
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 4, 2)
+
+def test_cache_disk(tmp_path, program):
+    directory = tmp_path / 'cache'
+    expected, _ = run(program, PreparedCache(directory=directory))
+    assert len(list(directory.glob('*.smx'))) == 1
+    cache = PreparedCache(maxsize=1, directory=directory)
+    summary, out = run(program, cache, 'twophase', 'tableau')
+    assert 'skipped: program loaded in standard form' in out
+    assert summary['values'] == expected['values']
+    assert (cache.hits, cache.disk_hits, cache.misses) == (1, 1, 0)
@@ -0,0 +1,62 @@
+import fractions
+
+import pytest
+
+from simplex.core import Model, SmxWriter, load_smx
+from simplex.formatters import DictCliFormatter
+from simplex.parsing import BinaryOp, BoolTree, Literal, Variable
+from simplex.solvers import BigmSimplexSolver
+
+
+RAW = """max z = 2x1 + 3.5x2 - x3
+x1 + x2 <= 4
+x1 - x3 >= -2 and x2 <= 3
+x1, x2, x3 >= 0
+"""
+
+def test_compile_model(tmp_path):
+    model = Model.parse_str(RAW)
+    model.constraints.append(BoolTree(BinaryOp('<=', BinaryOp('*', Literal(fractions.Fraction(2, 3)), Variable('x1')), Literal(10**30))))
+    model.constraints.append(BoolTree(Literal(True)))
+    path = tmp_path / 'model.smx'
+    SmxWriter(model).write(path)
+    loaded, prepared = load_smx(path)
+    assert prepared is None
+    assert str(loaded) == str(model)
+    assert loaded.variables == model.variables
+    assert [c.variables for c in loaded.constraints] == [c.variables for c in model.constraints]
+    assert loaded.constraints[-2].root.right.value == 10**30
+
+def solved(model, prepared=None):
+    solver = BigmSimplexSolver()
+    solver.formatter = DictCliFormatter()
+    solver.model = model
+    if prepared:
+        solver.load_prepared_state(prepared)
+    solver.solve()
+    return solver.summary['status'], solver.summary['values']
+
+def test_compile_prepared(tmp_path, capsys):
+    model = Model.parse_str(RAW)
+    path = tmp_path / 'model.smx'
+    writer = SmxWriter(model)
+    solver = BigmSimplexSolver()
+    solver.formatter = DictCliFormatter()
+    solver.model = model
+    solver.prepare()
+    writer.add_prepared(solver.prepared_state())
+    writer.write(path)
+    loaded, prepared = load_smx(path)
+    assert (prepared['from_dual'], prepared['to_dual']) == (False, False)
+    assert str(prepared['model']) == str(solver.model)
+    assert prepared['initial_basis'] == solver.initial_basis
+    capsys.readouterr()
+    assert solved(loaded, prepared) == solved(Model.parse_str(RAW))
+    assert 'skipped: program loaded in standard form' in capsys.readouterr().out
+
+@pytest.mark.parametrize('data', [b'', b'max z = x\n', b'SMX\0\x09\0\0\0' + bytes(24)])
+def test_compile_invalid(tmp_path, data):
+    path = tmp_path / 'model.smx'
+    path.write_bytes(data)
+    with pytest.raises(RuntimeError):
+        load_smx(path)
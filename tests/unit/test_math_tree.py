@@ -1,3 +1,5 @@
+import fractions
+
 import pytest
 
 from simplex.parsing import BoolTree, ExprTree, MathTree, ObjectiveTree
@@ -57,6 +59,42 @@ def test_objective_tree_typing_error(expr, expected):
     with pytest.raises(expected):
         ObjectiveTree.from_string(expr)
 
+@pytest.mark.parametrize(('expr', 'expected'), [
+    ('x*y', MathTree.NONLINEAR),
+    ('x/(y + 1)', MathTree.NONLINEAR),
+    ('x*y + (x or True)', MathTree.BOOL_FOUND_BUT_NUM_EXPECTED),
+    ('x*y < 2', MathTree.NONLINEAR),
+    ('(x < 2) < 2*y', MathTree.BOOL_FOUND_BUT_NUM_EXPECTED),
+    ('x - (y < 2)', MathTree.BOOL_FOUND_BUT_NUM_EXPECTED),
+    ('x < y', MathTree.BOOL_IN_NUMERIC),
+])
+def test_math_tree_error_order(expr, expected):
+    with pytest.raises(TypeError, match=expected.replace('(', r'\(')):
+        MathTree(ExprTree.from_string(expr).root)
+
+def test_from_root():
+    root = ExprTree.from_string('y*x < z').root
+    tree = MathTree.from_root(root)
+    assert tree.variables == ['y', 'x', 'z']
+    assert MathTree.from_root(root, ['x']).variables == ['x']
+    with pytest.raises(TypeError):
+        MathTree(root)
+
+def test_variables():
+    tree = BoolTree.from_string('y + 2*x + y <= z')
+    assert isinstance(tree.variables, dict)
+    assert 'x' in tree.variables and 'w' not in tree.variables
+    assert tree.variables == ['y', 'x', 'z'] and tree.variables != ['x', 'y', 'z']
+    tree.variables.remove('x')
+    tree.variables += ['w', 'y']
+    tree.variables.append('v')
+    assert list(tree.variables) == ['y', 'z', 'w', 'v']
+    copy = tree.copy()
+    copy.variables.append('u')
+    assert 'u' not in tree.variables
+    tree.variables = ['b', 'a', 'b']
+    assert tree.variables == ['b', 'a']
+
 
 ## Runtime
 
@@ -69,7 +107,7 @@ def test_objective_tree_typing_error(expr, expected):
     ('2 x1', {'x1':3}, 6),
     ('2x * y', {'x':3, 'y':5}, 30),
     ('-(((-(-(1)))))', {}, -1),
-    ('1.2 + 2.5', {}, 3.7),
+    ('1.2 + 2.5', {}, fractions.Fraction('3.7')),
     ('(2 + x) * y', {'x': 2, 'y': 3}, 12),
     ('2 + x * y', {'x': 2, 'y': 3}, 8),
     ('foo < 0 or foo >= 10', {'foo': -1}, True),
@@ -92,7 +130,7 @@ def test_expr_tree_runtime(expr, context, expected):
     ('min x = -1 + 2', {}, 1),
     ('min x = -(-1)', {}, 1),
     ('min x = -(((-(-(1)))))', {}, -1),
-    ('max z = 1.2 + 2.5', {}, 3.7),
+    ('max z = 1.2 + 2.5', {}, fractions.Fraction('3.7')),
     ('max z = (2 + x) * 3', {'x': 2}, 12),
     ('max z = 2 + 2 * y', {'y': 3}, 8),
 ])
@@ -111,3 +149,38 @@ def test_objective_tree_runtime(expr, context, expected):
 def test_expr_tree_runtime_error(expr, context, expected):
     with pytest.raises(expected):
         ExprTree.from_string(expr).evaluate(context)
+
+
+## Substitutions
+
+def rewritten(tree, old, new):
+    root = tree.root.rewrite(lambda node: new if str(node) == str(old) else node)
+    return str(root), ExprTree(root).variables
+
+@pytest.mark.parametrize(('expr', 'old', 'new'), [
+    ('x + 2*y - x <= 3', 'x', 'a - b'),
+    ('x + 2*y - x <= 3', 'y', 'x + z'),
+    ('x + 2*y - x <= 3', 'x', '0'),
+    ('2*(x + 1) >= x', 'x', 'y'),
+    ('2*(x + 1) >= x', 'x', 'x + 1'),
+    ('1*x == z', 'x', 'a'),
+    ('x, y >= 0', 'y', 'x'),
+    ('x <= 1', 'z', 'a'),
+])
+def test_replace(expr, old, new):
+    tree = BoolTree.from_string(expr)
+    expected = rewritten(tree, old, MathTree.from_string(new).root)
+    tree.replace(old, MathTree.from_string(new).root)
+    assert (str(tree), tree.variables) == expected
+
+def test_replace_many():
+    tree = BoolTree.from_string('x1 + 2*x2 + 3*x3 + 4*x1 <= 10')
+    for old, new in [('x1', 'y1 - y2'), ('x3', 'x1 + y1'), ('x2', 'y3'), ('x1', 'y4')]:
+        expected = rewritten(tree, old, MathTree.from_string(new).root)
+        tree.replace(old, MathTree.from_string(new).root)
+        assert (str(tree), tree.variables) == expected
+    tree.rename('y1', 'w')
+    assert str(tree) == 'w - y2 + 2*y3 + 3*(y4 + w) + 4*(w - y2) <= 10'
+    assert tree.variables == ['w', 'y2', 'y3', 'y4']
+    tree.replace('w', MathTree.from_string('z').root)
+    assert tree.variables == ['z', 'y2', 'y3', 'y4']
@@ -0,0 +1,142 @@
+import pytest
+
+from simplex.core import Model, RowCache
+from simplex.formatters import DictCliFormatter
+from simplex.parsing import BoolTree, nodes
+from simplex.solvers import BigmSimplexSolver
+
+
+RAW = """# comment
+max z = x2 + 2*x1
+
+x1 + y <= 4  # trailing comment
+x2 <= 6
+x1, x2, y >= 0
+"""
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_parse_file(tmp_path, use_mmap):
+    path = tmp_path / 'model'
+    path.write_text(RAW)
+    model = Model.parse_file(path, use_mmap)
+    assert str(model) == str(Model.parse_str(RAW))
+    assert model.variables == ['z', 'x1', 'x2', 'y']
+    assert len(model.constraints) == 3
+
+def test_parse_file_empty(tmp_path):
+    path = tmp_path / 'model'
+    path.write_text('')
+    with pytest.raises(RuntimeError):
+        Model.parse_file(path, use_mmap=True)
+
+@pytest.mark.parametrize(('raw', 'expected'), [
+    ('x1 <= 1\nmax z = x1', 'Constraint found before objective function'),
+    ('max z = x1\nmax w = x1', 'Multiple objective function found'),
+    ('max z = x1\nz <= 1', 'Constraint uses objective as variable'),
+])
+def test_parse_str_error(raw, expected):
+    with pytest.raises(RuntimeError, match=expected):
+        Model.parse_str(raw)
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_parse_str_jobs(jobs):
+    raw = 'max z = x0\n' + '\n'.join(f'{k}x{k % 7} + y{k} <= {k}' for k in range(50))
+    model = Model.parse_str(raw, jobs)
+    assert str(model) == str(Model.parse_str(raw))
+    assert model.variables == Model.parse_str(raw).variables
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_parse_str_jobs_objective_only(jobs):
+    model = Model.parse_str('max z = x', jobs)
+    assert str(model) == str(Model.parse_str('max z = x'))
+    assert model.constraints == []
+
+@pytest.mark.parametrize(('raw', 'expected'), [
+    ('max z = x1\nx1 <= 1\nx1 + <= 2\nz <= 1', SyntaxError),
+    ('max z = x1\nx1 <= 1\nz <= 1\nx1 + <= 2', RuntimeError),
+    ('max z = x1\nx1 + <= 2\nmax w = x1', SyntaxError),
+])
+def test_parse_str_jobs_error(raw, expected):
+    with pytest.raises(expected):
+        Model.parse_str(raw, jobs=2)
+
+def test_parse_str_indexed():
+    raw = """max z = sum(i in 1..3) i*x_i
+    forall(i in 1..2, j in i..2) sum(k in i..j) (x_k + y_k) <= j
+    sum(i in 1..0) x_i <= 1
+    forall(i in 1..3) x_i >= 0
+    """
+    model = Model.parse_str(raw)
+    assert str(model) == """max z = x_1 + 2*x_2 + 3*x_3
+x_1 + y_1 <= 1
+x_1 + y_1 + x_2 + y_2 <= 2
+x_2 + y_2 <= 2
+0 <= 1
+x_1 >= 0
+x_2 >= 0
+x_3 >= 0"""
+    assert model.variables == ['z', 'x_1', 'x_2', 'x_3', 'y_1', 'y_2']
+
+def test_parse_str_indexed_lazy():
+    members = BoolTree.iter_from_string('forall(i in 1..1000000000) x_i <= i')
+    assert str(next(members)) == 'x_1 <= 1'
+    assert str(next(members)) == 'x_2 <= 2'
+
+# programs written before indexed sums, with their words as variable names
+def test_parse_str_indexed_words():
+    model = Model.parse_str('max z = sum + in\nsum + 2forall <= 4\nforall >= in')
+    assert str(model) == 'max z = sum + in\nsum + 2*forall <= 4\nforall >= in'
+    assert model.variables == ['z', 'sum', 'in', 'forall']
+
+@pytest.mark.parametrize('raw', ['max z = x\nforall(i in 1..n) x_i <= 1', 'max z = x\nx <= 1 and forall(i in 1..2) x_i'])
+def test_parse_str_indexed_error(raw):
+    with pytest.raises(SyntaxError):
+        Model.parse_str(raw)
+
+@pytest.mark.parametrize('jobs', [1, 2])
+def test_parse_str_row_cache(jobs):
+    cache = RowCache()
+    model = Model.parse_str(RAW, jobs, cache)
+    assert str(model) == str(Model.parse_str(RAW))
+    assert model.variables == ['z', 'x1', 'x2', 'y']
+    assert (cache.hits, cache.misses) == (0, 3)
+    edited = Model.parse_str(RAW.replace('x2 <= 6', 'x2 + y <= 7'), jobs, cache)
+    assert str(edited) == str(Model.parse_str(RAW.replace('x2 <= 6', 'x2 + y <= 7')))
+    assert (cache.hits, cache.misses) == (2, 4)
+    assert len(cache.rows) == 3
+
+def test_parse_str_row_cache_solved(capsys):
+    cache = RowCache()
+    solver = BigmSimplexSolver()
+    solver.formatter = DictCliFormatter()
+    solver.model = Model.parse_str(RAW, cache=cache)
+    solver.solve()
+    capsys.readouterr()
+    # solving renames and rewrites its trees, not the cached ones
+    model = Model.parse_str(RAW, cache=cache)
+    assert cache.hits == 3
+    assert str(model) == str(Model.parse_str(RAW))
+    assert [c.variables for c in model.constraints] == [c.variables for c in Model.parse_str(RAW).constraints]
+
+@pytest.mark.parametrize('vector', [True, False])
+def test_evaluate_batch(monkeypatch, vector):
+    if not vector:
+        monkeypatch.setattr('simplex.parsing.nodes.numpy', None)
+    elif nodes.numpy is None:
+        pytest.skip('NumPy is not installed')
+    model = Model.parse_str('max z = x + y\nx + 2y <= 4\nx - y >= -1\nx == y or x >= 3\nx, y >= 0\n')
+    columns = {'x': [0, 1, 3, -1, 2.5], 'y': [0, 1, 0, 2, 1]}
+    feasible, slacks = model.evaluate_batch(columns)
+    # same as evaluating each point
+    for c, values in zip(model.constraints, feasible):
+        assert [bool(v) for v in values] == [c.evaluate(dict(zip(columns, point))) for point in zip(*columns.values())]
+    assert [None if s is None else [float(v) for v in s] for s in slacks] == [
+        [4, 1, 1, 1, -0.5],
+        [1, 1, 4, -2, 2.5],
+        None,
+        [0, 1, 0, -1, 1],
+    ]
+    assert [float(v) for v in BoolTree.from_string('x == 2*y').slack_batch(columns)] == [0, -1, -3, -5, -0.5]
+    assert [bool(v) for v in BoolTree.from_string('1 < 2').evaluate_batch(columns)] == [True]*5
+    with pytest.raises(ValueError):
+        model.evaluate_batch({'x': [1, 2], 'y': [1]})
@@ -0,0 +1,109 @@
+import pytest
+
+from simplex.core import Model, Rewriter
+
+
+FIXED = """NAME          TEST
+ROWS
+ N  COST
+ L  LIM1
+ G  LIM2
+ E  MYEQN
+COLUMNS
+    X1        COST               1.0   LIM1               1.0
+    X1        LIM2               1.0
+    X2        COST               2.0   LIM1               1.0
+    X2        MYEQN             -1.0
+    X3        COST              -1.0   MYEQN              1.0
+RHS
+    RHS       COST              -3.0
+    RHS       LIM1               4.0   LIM2               1.0
+    RHS       MYEQN              7.0
+RANGES
+    RNG       LIM1               2.5
+BOUNDS
+ UP BND       X1                 4.0
+ MI BND       X2
+ UP BND       X2                 1.0
+ FX BND       X3                 0.5
+ENDATA
+"""
+
+FREE = """NAME TEST
+OBJSENSE MIN
+ROWS
+ N COST
+ L LIM1
+ G LIM2
+ E MYEQN
+COLUMNS
+ X1 COST 1 LIM1 1
+ X1 LIM2 1
+ X2 COST 2 LIM1 1
+ X2 MYEQN -1
+ X3 COST -1 MYEQN 1
+RHS
+ COST -3
+ LIM1 4 LIM2 1
+ MYEQN 7
+RANGES
+ LIM1 2.5
+BOUNDS
+ UP X1 4
+ MI X2
+ UP X2 1
+ FX X3 .5
+ENDATA
+"""
+
+TEXT = """min COST = X1 + 2*X2 - X3 + 3
+X1 + X2 >= 1.5
+X1 + X2 <= 4
+X1 >= 1
+-X2 + X3 == 7
+X1 <= 4
+X2 <= 1
+X3 == 0.5
+X1 >= 0
+"""
+
+def normalized(model):
+    rewriter = Rewriter()
+    trees = [model.objective, *model.constraints]
+    for tree in trees:
+        rewriter.normalize(tree)
+    return [str(tree) for tree in trees]
+
+@pytest.mark.parametrize(('raw', 'fixed'), [(FIXED, True), (FREE, False), (FIXED, False)])
+def test_parse_mps(raw, fixed):
+    model = Model.parse_mps_lines(raw.splitlines(), fixed)
+    assert model.variables == ['COST', 'X1', 'X2', 'X3']
+    assert normalized(model) == normalized(Model.parse_str(TEXT))
+
+@pytest.mark.parametrize('use_mmap', [False, True])
+def test_parse_mps_file(tmp_path, use_mmap):
+    path = tmp_path / 'model.mps'
+    path.write_text(FIXED)
+    assert str(Model.parse_mps_file(path, use_mmap, fixed=True)) == str(Model.parse_mps_lines(FIXED.splitlines(), True))
+
+def test_parse_mps_column_major():
+    n = 2000
+    lines = ['ROWS', ' N obj', *(f' L r{i}' for i in range(n)), 'COLUMNS']
+    lines.extend(f' x{j} obj 1 r{i} {i + j + 1}' for j in range(3) for i in range(n))
+    lines.extend(['RHS', *(f' rhs r{i} {i}' for i in range(n)), 'ENDATA'])
+    model = Model.parse_mps_lines(lines)
+    assert len(model.constraints) == n + 1
+    assert str(model.constraints[5]) == '6*x0 + 7*x1 + 8*x2 <= 5'
+    assert str(model.constraints[-1]) == 'x0, x1, x2 >= 0'
+
+@pytest.mark.parametrize(('raw', 'expected'), [
+    ('ROWS\n L R1\nENDATA', 'No objective function found'),
+    ('ROWS\n N OBJ\n X R1\nENDATA', 'Unknown row type: X'),
+    ('ROWS\n N OBJ\nCOLUMNS\n X1 R1 1\nENDATA', 'Unknown row: R1'),
+    ('ROWS\n N OBJ\nCOLUMNS\n X1 OBJ 1\nBOUNDS\n BV BND X1\nENDATA', 'Unsupported bound type: BV'),
+    ('ROWS\n N OBJ\nCOLUMNS\n M1 \'MARKER\' \'INTORG\'\nENDATA', 'Integer columns are not supported'),
+    ('ROWS\n N OBJ\nSOS\nENDATA', 'Unknown MPS section: SOS'),
+])
+def test_parse_mps_error(raw, expected):
+    with pytest.raises(RuntimeError, match=expected):
+        Model.parse_mps_lines(raw.splitlines())
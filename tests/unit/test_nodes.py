@@ -0,0 +1,261 @@
+import fractions
+import pickle
+
+import pytest
+
+from simplex.parsing import Arena, ArenaDict, BinaryOp, ExprList, Literal, MathTree, Objective, Parser, UnaryOp, Variable, nodes, tokenize
+
+
+def test_visit_order():
+    root = Objective('max', Variable('z'), BinaryOp('+', UnaryOp('-', Variable('x')), BinaryOp('*', Literal(2), Variable('y'))))
+    seen = []
+    root.visit(lambda node: seen.append(str(node)))
+    assert seen == ['z', 'x', '-x', '2', 'y', '2*y', '-x + 2*y', 'max z = -x + 2*y']
+
+def test_visit_list_is_shallow():
+    root = BinaryOp('>=', ExprList([BinaryOp('+', Variable('x'), Literal(1)), Variable('y')]), Literal(0))
+    seen = []
+    root.visit(lambda node: seen.append(str(node)))
+    assert seen == ['x + 1', 'y', '0', 'x + 1, y >= 0']
+
+def test_rewrite_order():
+    root = BinaryOp('>=', ExprList([BinaryOp('+', Variable('x'), Literal(1)), Variable('y')]), Literal(0))
+    seen = []
+    def visitor(node):
+        seen.append(str(node))
+        if isinstance(node, Variable):
+            return Variable(node.name.upper())
+        return node
+    assert str(root.rewrite(visitor)) == 'X + 1, Y >= 0'
+    assert seen == ['x', '1', 'X + 1', 'y', 'X + 1, Y', '0', 'X + 1, Y >= 0']
+
+def test_rewrite_copy_on_write(monkeypatch):
+    root = Parser(tokenize('x + 2*y <= z + 4')).parse()
+    rebuilt = []
+    rebuild = BinaryOp.rebuild
+    monkeypatch.setattr(BinaryOp, 'rebuild', lambda self, children: rebuilt.append(str(self)) or rebuild(self, children))
+    assert root.rewrite(lambda node: node) is root
+    assert rebuilt == []
+    new = root.rewrite(lambda node: Variable('w') if node is Variable('y') else node)
+    assert str(new) == 'x + 2*w <= z + 4'
+    assert new.right is root.right
+    assert rebuilt == ['2*y', 'x + 2*y', 'x + 2*y <= z + 4']
+
+def test_deep_sum():
+    n = 100000
+    root = Variable('x0')
+    for k in range(1, n):
+        root = BinaryOp('+', root, BinaryOp('*', Literal(k), Variable(f'x{k}')))
+    root = BinaryOp('<=', root, Literal(1))
+    names = []
+    root.visit(lambda node: names.append(node.name) if isinstance(node, Variable) else None)
+    assert names == [f'x{k}' for k in range(n)]
+    def visitor(node):
+        if isinstance(node, Literal):
+            return Literal(-node.value)
+        return node
+    node = root.rewrite(visitor).left
+    for k in range(n-1, 0, -1):
+        assert node.right.left.value == -k
+        node = node.left
+    assert node.name == 'x0'
+
+def test_pickle_deep_sum():
+    n = 10000
+    root = Variable('x0')
+    for k in range(1, n):
+        root = BinaryOp('+', root, BinaryOp('*', Literal(k), Variable(f'x{k}')))
+    root = pickle.loads(pickle.dumps(BinaryOp('>=', ExprList([root, UnaryOp('-', Variable('y'))]), Literal(0))))
+    assert str(root.left.exprlist[1]) == '-y'
+    node = root.left.exprlist[0]
+    for k in range(n-1, 0, -1):
+        assert (node.right.left.value, node.right.right.name) == (k, f'x{k}')
+        node = node.left
+    assert node.name == 'x0'
+
+def test_interned():
+    def build():
+        return BinaryOp('<=', BinaryOp('+', Variable('x'), BinaryOp('*', Literal(2), Variable('y'))), Literal(4))
+    root = build()
+    assert build() is root
+    assert pickle.loads(pickle.dumps(root)) is root
+    assert root.rewrite(lambda node: node) is root
+    assert ExprList([Variable('x'), Variable('y')]) is ExprList((Variable('x'), Variable('y')))
+
+@pytest.mark.parametrize(('a', 'b'), [(1, 1.0), (1, True), (0.0, -0.0), (0, False), (1, fractions.Fraction(1))])
+def test_interned_literals(a, b):
+    assert Literal(a) is not Literal(b)
+    assert type(Literal(a).value) is type(a)
+    assert type(Literal(b).value) is type(b)
+
+def test_equal_nodes():
+    def build():
+        return BinaryOp('<=', BinaryOp('+', Variable('x'), BinaryOp('*', Literal(2), Variable('y'))), Literal(4))
+    root = build()
+    nodes.clear_interned()
+    other = build()
+    assert other is not root
+    assert nodes.equal_nodes(root, other)
+    assert not nodes.equal_nodes(root, other.rewrite(lambda node: Literal(5) if node is Literal(4) else node))
+    assert not nodes.equal_nodes(root.left, root.right)
+
+@pytest.mark.parametrize(('a', 'b'), [(1, 1.0), (1, True), (0.0, -0.0), (0, False), (1, fractions.Fraction(1))])
+def test_equal_literals(a, b):
+    left = Literal(a)
+    nodes.clear_interned()
+    assert nodes.equal_nodes(left, Literal(a))
+    assert not nodes.equal_nodes(left, Literal(b))
+
+def test_immutable():
+    root = BinaryOp('+', Variable('x'), Literal(1))
+    with pytest.raises(AttributeError):
+        root.left = Variable('y')
+    with pytest.raises(AttributeError):
+        root.left.name = 'y'
+    assert str(root) == 'x + 1'
+    assert str(root) is str(root)
+
+@pytest.mark.parametrize(('expr', 'context'), [
+    ('2*x + 3*y/4 - -z', {'x': 1, 'y': 2, 'z': 3}),
+    ('x + 1.5 + 1/3', {'x': fractions.Fraction(1, 2)}),
+    ('x - inf', {'x': 0}),
+    ('x1, x2 >= 0', {'x1': 1, 'x2': 0}),
+    ('x1, x2 >= 0', {'x1': 1, 'x2': -1}),
+    ('x xor y iif not z', {'x': True, 'y': False, 'z': True}),
+    ('x if y and True', {'x': False, 'y': True}),
+    ('max z = 2*x + 1', {'x': 2}),
+    ('sum(i in 1..3) i*x_i', {'x_1': 1, 'x_2': 2, 'x_3': 3}),
+])
+def test_compile(monkeypatch, expr, context):
+    monkeypatch.setattr('simplex.parsing.nodes.COMPILE_MIN_NODES', 0)
+    root = Parser(tokenize(expr)).parse()
+    assert root.compile()(context) == root.evaluate(context)
+    assert root.compile() is root.compile()
+
+def test_compile_deep_sum():
+    n = 10000
+    root = Variable('x0')
+    for k in range(1, n):
+        root = BinaryOp('+', root, BinaryOp('*', Literal(k), Variable(f'x{k}')))
+    assert root.compile()({f'x{k}': 1 for k in range(n)}) == n*(n-1)//2 + 1
+    # small trees are evaluated directly
+    root = BinaryOp('+', Variable('x'), Literal(1))
+    assert root.compile() == root.evaluate
+
+def test_compile_tree():
+    tree = MathTree.from_string(' + '.join(f'{k}*x{k}' for k in range(1, 20)))
+    f = tree.compile()
+    assert f({f'x{k}': 1 for k in range(1, 20)}) == 190
+    tree.rename('x1', 'y')
+    assert tree.compile() is not f
+    assert tree.compile()({f'x{k}': 1 for k in range(2, 20)} | {'y': 2}) == 191
+
+@pytest.mark.parametrize('vector', [True, False])
+@pytest.mark.parametrize(('expr', 'columns'), [
+    ('2*x + 3*y/4 - -z', {'x': [1, 0], 'y': [2, 4], 'z': [3, -1]}),
+    ('x1, x2 >= 0', {'x1': [1, 1, -1], 'x2': [0, -1, 0]}),
+    ('x xor y iif not z', {'x': [True, False], 'y': [False, False], 'z': [True, True]}),
+    ('x if y and True', {'x': [False, True, False], 'y': [True, True, False]}),
+    ('(x or y) and x < 2', {'x': [0, 1, 3], 'y': [1, 0, 0]}),
+    ('max z = 2*x + 1', {'x': [2, 3]}),
+    ('1 + 2', {'x': [2, 3]}),
+])
+def test_evaluate_batch(monkeypatch, vector, expr, columns):
+    if not vector:
+        monkeypatch.setattr('simplex.parsing.nodes.numpy', None)
+    elif nodes.numpy is None:
+        pytest.skip('NumPy is not installed')
+    root = Parser(tokenize(expr)).parse()
+    expected = [root.evaluate(dict(zip(columns, point))) for point in zip(*columns.values())]
+    assert [bool(v) if isinstance(e, bool) else v for v, e in zip(root.evaluate_batch(columns), expected)] == expected
+
+@pytest.mark.parametrize(('expr', 'expected'), [
+    ('3', (True, False, False, 0)),
+    ('-(1/2 + 3)', (True, False, False, 0)),
+    ('x', (False, True, True, 1)),
+    ('-2*x', (False, True, True, 1)),
+    ('2*x + 1', (False, True, False, 1)),
+    ('x*y', (False, True, False, 2)),
+    ('x/2', (False, True, False, 1)),
+    ('1/x', (False, True, False, None)),
+    ('2*x + y <= 4', (False, True, False, 1)),
+    ('x, y >= 0', (False, True, False, 1)),
+    ('max z = 2*x', (False, True, False, 1)),
+])
+def test_derived(expr, expected):
+    root = Parser(tokenize(expr)).parse()
+    assert (root.constant, root.has_var, root.monomial, root.degree) == expected
+
+@pytest.mark.parametrize(('expr', 'nominators', 'denominators'), [
+    ('2*x + 3*y - 4', {2, 3, 4}, set()),
+    ('x + y/6 + 1/4', {1}, {6, 4}),
+    ('-(2*x)/3', set(), {3}),
+])
+def test_nominators(expr, nominators, denominators):
+    root = Parser(tokenize(expr)).parse()
+    assert root.nominators() == nominators
+    assert root.denominators() == denominators
+
+# fraction literals print as the divisions they stand for
+@pytest.mark.parametrize(('root', 'expr'), [
+    (Literal(fractions.Fraction(3, 2)), '3/2'),
+    (UnaryOp('-', Literal(fractions.Fraction(3, 2))), '-(3/2)'),
+    (BinaryOp('*', Literal(fractions.Fraction(3, 2)), Variable('x')), '3/2*x'),
+    (BinaryOp('/', Variable('x'), Literal(fractions.Fraction(3, 2))), 'x/(3/2)'),
+    (BinaryOp('and', Literal(fractions.Fraction(1, 2)), Variable('x')), '(1/2) and x'),
+    (BinaryOp('+', Literal(fractions.Fraction(4)), Variable('x')), '4 + x'),
+])
+def test_fraction_literals(root, expr):
+    assert str(root) == expr == str(Parser(tokenize(expr)).parse())
+    assert root.nominators() == Parser(tokenize(expr)).parse().nominators()
+    assert root.denominators() == Parser(tokenize(expr)).parse().denominators()
+
+def test_variable_names_deep_sum():
+    n = 10000
+    root = Variable('x0')
+    for k in range(1, n):
+        root = BinaryOp('+', root, BinaryOp('*', Literal(k), Variable(f'x{k}')))
+    assert root.variable_names() == {f'x{k}' for k in range(n)}
+    assert root.left.variable_names() == {f'x{k}' for k in range(n-1)}
+
+@pytest.mark.parametrize('expr', [
+    'x + 2*y <= 4',
+    '-x / (y - 1.5)',
+    'x, y >= 0',
+    'max z = x - y',
+    'not (x < 1 and y > 2)',
+])
+def test_arena(expr):
+    root = Parser(tokenize(expr)).parse()
+    arena = Arena()
+    i = arena.add(root)
+    n = len(arena)
+    assert arena.add(root) == i
+    assert len(arena) == n
+    assert arena.node(i) is root
+    nodes.clear_interned()
+    assert str(arena.node(i)) == str(root)
+
+def test_arena_dict():
+    arena = Arena()
+    line = ArenaDict(arena, {'x': BinaryOp('+', Variable('x'), Literal(1)), 'y': Literal(1)})
+    line['z'] = BinaryOp('+', Variable('x'), Literal(1))
+    assert len(arena) == 3
+    assert line['z'] is line['x']
+    del line['x']
+    assert list(line) == ['y', 'z']
+
+# ids no view holds are dropped, the others renumbered under the views
+def test_arena_collect():
+    arena = Arena()
+    line = ArenaDict(arena, {'x': BinaryOp('+', Variable('x'), Literal(1)), 'y': UnaryOp('-', Variable('y'))})
+    other = ArenaDict(arena, {'z': ExprList([Variable('z'), Literal(2)])})
+    assert len(arena) == 8
+    line['x'] = Literal(3)
+    del other
+    arena.collect()
+    assert len(arena) == 3
+    assert {k: str(v) for k, v in line.items()} == {'x': '3', 'y': '-y'}
+    line['z'] = UnaryOp('-', Variable('y'))
+    assert line.ids['z'] == line.ids['y']
+    assert len(arena) == 3
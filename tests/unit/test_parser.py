@@ -0,0 +1,75 @@
+import pytest
+
+from simplex.parsing import BinaryOp, Parser, parse_linear, tokenize
+
+
+def parse(s):
+    return Parser(tokenize(s)).parse()
+
+@pytest.mark.parametrize(('expr', 'expected'), [
+    ('1 + 2 * 3', '1 + 2*3'),
+    ('(1 + 2) * 3', '(1 + 2)*3'),
+    ('3x1 + 2 x2', '3*x1 + 2*x2'),
+    ('-2x <= 1 - y', '-2*x <= 1 - y'),
+    ('x < 1 or y > 2 and z == 3', '((x < 1) or (y > 2)) and (z == 3)'),
+    ('x, y >= 0', 'x, y >= 0'),
+    ('(x + 1, y) >= 0', 'x + 1, y >= 0'),
+    ('max z = 2x + y', 'max z = 2*x + y'),
+])
+def test_parse(expr, expected):
+    assert str(parse(expr)) == expected
+
+@pytest.mark.parametrize('expr', ['x y', '2*3x', '(1 + 2) x', 'x <', 'max z 2'])
+def test_parse_error(expr):
+    with pytest.raises(SyntaxError):
+        parse(expr)
+
+def test_parse_wide_sum():
+    n = 10000
+    root = parse(' + '.join(f'{k}*x{k}' for k in range(1, n+1)) + ' <= 1')
+    assert root.op == '<='
+    node = root.left
+    for k in range(n, 1, -1):
+        assert isinstance(node, BinaryOp)
+        assert node.op == '+'
+        assert node.right.right.name == f'x{k}'
+        node = node.left
+    assert node.right.name == 'x1'
+
+@pytest.mark.parametrize('expr', [
+    '2x + y <= 4',
+    '-x1 - 2.5 x2 + 3 >= -y',
+    '1 < x',
+    'x + 0*y - x == 0',
+    '$a + @b != 1.',
+])
+def test_parse_linear(expr):
+    root, form = parse_linear(expr)
+    assert str(root) == str(parse(expr))
+
+@pytest.mark.parametrize('expr', ['x*y <= 1', '2/3x <= 1', 'x <= 1 and y >= 2', 'inf x <= 1', '(x + y) <= 1', 'x + 1', '1e5 x <= 1'])
+def test_parse_linear_fallback(expr):
+    assert parse_linear(expr) is None
+
+@pytest.mark.parametrize(('expr', 'expected'), [
+    ('sum(i in 1..3) x_i <= 1', 'sum(i in 1..3) x_i <= 1'),
+    ('sum(i in 1..3) 2 x_i + y', 'sum(i in 1..3) 2*x_i + y'),
+    ('sum(i in 1..3, j in i..3) (x_i_j - 1)', 'sum(i in 1..3, j in i..3) (x_i_j - 1)'),
+    ('forall(i in -1..1) x_i >= i', 'forall(i in -1..1) x_i >= i'),
+])
+def test_parse_indexed(expr, expected):
+    assert str(parse(expr)) == expected
+
+@pytest.mark.parametrize('expr', ['sum(i in 1.5..3) x_i', 'sum(i 1..3) x_i', 'sum(i in 1..3 x_i', 'x <= 1 and forall(i in 1..2) x_i'])
+def test_parse_indexed_error(expr):
+    with pytest.raises(SyntaxError):
+        parse(expr)
+
+# away from their indices, the words of indexed sums are variable names
+@pytest.mark.parametrize(('expr', 'expected'), [
+    ('max z = sum + in', 'max z = sum + in'),
+    ('forall + 2 sum <= in', 'forall + 2*sum <= in'),
+    ('sum(i in 1..2) in_i + sum', 'sum(i in 1..2) in_i + sum'),
+])
+def test_parse_indexed_words(expr, expected):
+    assert str(parse(expr)) == expected
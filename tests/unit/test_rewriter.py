@@ -1,7 +1,12 @@
+import fractions
+import itertools
+import json
+import sys
+
 import pytest
 
-from simplex.core import Rewriter
-from simplex.parsing import ExprTree
+from simplex.core import ExpansionBudgetExceeded, NormalizeCache, Rewriter, RuleProfiler
+from simplex.parsing import BinaryOp, ExprTree, Literal, MathTree, UnaryOp, Variable, clear_interned
 
 
 @pytest.mark.parametrize(('expr', 'expected'), [
@@ -31,6 +36,9 @@ from simplex.parsing import ExprTree
     ('-(1*x + 3*y)', '-x + -3*y'),
     ('1*(1 + ((2 + (x*3)) + (2 * (y + 1) * 1))*2)', '6*x + 4*y + 9'),
     ('((2*x1) + ((x2*3) + x1)) - (2 + ((3 - 4) - 5))', '3*x1 + 3*x2 + 4'),
+    ('y - x - x', 'y + -2*x'),
+    ('(12 + 1.25)*(x + 2)', '53/4*x + 53/2'),
+    ('x/2 + x/3 - 5/6*x', '0'),
     ## LOGIC
     # negation
     ('not(not x)', 'x'),
@@ -72,6 +80,7 @@ from simplex.parsing import ExprTree
     ('-x < 0', 'x >= 0'),
     ('2*x1 + 2*x2 - 11 <= 0', '2*x1 + 2*x2 <= 11'),
     ('2*x1 - 11 <= - 2*x2', '2*x1 + 2*x2 <= 11'),
+    ('(y - x - x <= 1) or (x <= 3)', '(y + -2*x <= 1) or (x <= 3)'),
     ('1 == 1', 'True'),
     ('1 == 2', 'False'),
     ('1 < 1', 'False'), # dubious
@@ -92,3 +101,298 @@ def test_expr_normalize(expr, expected):
     Rewriter().normalize(tree)
     print(str(tree))
     assert str(tree) == expected
+
+# the rules give the normal form of the linear fast path, in either variable
+# order, leading variables and repeated products of a variable included
+@pytest.mark.parametrize(('expr', 'expected'), [
+    ('2x + y <= 4', '2*x + y <= 4'),
+    ('x + 1 + 2*x - 3 >= y', '3*x + -y >= 2'),
+    ('1.5 x1 - 0.25 x2 < 3 + x1', '2*x1 + -x2 <= 12'),
+    ('-x > 0', 'x <= 0'),
+    ('4x + 6y == 2', '2*x + 3*y == 1'),
+    ('x - x + y != 0', 'y != 0'),
+    ('y - x - x <= 1', 'y + -2*x <= 1'),
+    ('y + 2*x + 3*x >= 1', 'y + 5*x >= 1'),
+    ('z + y + x == 1', 'z + y + x == 1'),
+])
+def test_linear_normalize(expr, expected):
+    fast = ExprTree.from_string(expr)
+    assert fast.linear is not None
+    Rewriter().normalize(fast)
+    assert str(fast) == expected
+    tree = ExprTree.from_string(expr)
+    for variables in (list(tree.variables), list(reversed(tree.variables))):
+        rewriter = Rewriter()
+        rewriter.variables = variables
+        assert str(tree.root.rewrite(rewriter._normalized)) == str(rewriter._linear_root(tree.linear))
+
+@pytest.mark.parametrize('expr', [
+    '0 - 5/19*0/(2/19)',
+    '0 - -37/175*1/(19/175)',
+    '(-4/189)/(25/189)',
+    '--3628800',
+    '1.25 - 0.5',
+    'x/2 + y/3 - 1',
+    '-(1*x + 3*y)',
+    '3*x/6 + 2*(z/4)',
+])
+def test_linear_form_normalize(expr):
+    fast = MathTree.from_string(expr)
+    rewriter = Rewriter()
+    rewriter.normalize(fast)
+    assert rewriter._linear_form(fast.root) is not None
+    assert fast.root is MathTree.from_string(expr).root.rewrite(rewriter._normalize_visitor)
+
+# comparisons of linear expressions the parser did not read as rows take the
+# fast path too, as left minus right, without any rewriting step
+@pytest.mark.parametrize(('expr', 'expected'), [
+    ('3*(x + 1) <= 1 + y', '3*x + -y <= -2'),
+    ('2*(x/4 - y) > 1/3', '3*x + -12*y >= 2'),
+    ('-(x - 2*y) == (x + y)/2', '-x + y == 0'),
+    ('x/3 + y/6 != 2*(y - 1)', '2*x + -11*y != -12'),
+    (' + '.join(f'{k}*(x{k} + 1)' for k in range(1, 6)) + ' <= 1', 'x1 + 2*x2 + 3*x3 + 4*x4 + 5*x5 <= -14'),
+])
+def test_linear_comparison(monkeypatch, expr, expected):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    tree = ExprTree.from_string(expr)
+    assert tree.linear is None
+    rewriter = Rewriter()
+    rewriter.normalize(tree)
+    assert str(tree) == expected
+    assert rewriter.steps == 0
+    rules = ExprTree.from_string(expr)
+    rewriter.normalized = {}
+    assert str(rules.root.rewrite(rewriter._normalized)) == expected
+
+def test_normalize_cache(monkeypatch):
+    monkeypatch.setattr(Rewriter, 'cache', NormalizeCache(2))
+    root = MathTree.from_string('y + x + 1 + x').root
+    results = []
+    for variables in (['x', 'y'], ['y', 'x'], ['x', 'y']):
+        tree = MathTree.from_root(root, variables)
+        Rewriter().normalize(tree)
+        results.append(tree.root)
+    assert [str(r) for r in results] == ['2*x + y + 1', 'y + 2*x + 1', '2*x + y + 1']
+    assert results[2] is results[0]
+    assert (Rewriter.cache.hits, Rewriter.cache.misses) == (1, 2)
+    for expr in ('1 + 1', '2 + 2'):
+        Rewriter().normalize(MathTree.from_string(expr))
+    assert (len(Rewriter.cache), Rewriter.cache.evictions) == (2, 2)
+    assert str(Rewriter.cache) == '1 hits, 4 misses (20.0% hit rate), 2 evictions, 2/2 entries'
+
+def test_normalize_no_cache(monkeypatch):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    tree = MathTree.from_string('x + 1 + x')
+    Rewriter().normalize(tree)
+    assert str(tree) == '2*x + 1'
+
+@pytest.mark.parametrize('expr', [
+    '3*x3 + x2 + 2*x1 <= 4 + x1',
+    'max z = x4 + 2*x3 + 1 + x2 + x1*x3 - x4',
+    'x3 + 2 + x2 + x1 >= x2*x3',
+    ' + '.join(f'{k % 4 + 1}*x{k}' for k in range(30, 0, -1)) + ' == x7 + 5',
+])
+def test_insert_term(monkeypatch, expr):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    monkeypatch.setattr(Rewriter, '_linear_form', staticmethod(lambda root: None))
+    def normalize():
+        tree = ExprTree.from_string(expr)
+        tree.linear = None
+        tree.variables = sorted(tree.variables, key=lambda v: (v != 'z', len(v), v))
+        Rewriter().normalize(tree)
+        return tree.root
+    root = normalize()
+    # one swap, and normalization of the chain, per rewrite
+    monkeypatch.setattr(Rewriter, '_insert_term', lambda self, chain, term: self._normalize_visitor(
+        BinaryOp('+', self._normalize_visitor(BinaryOp('+', chain.left, term)), chain.right)))
+    assert root is normalize()
+
+# the terms a term moves before are sorted with it, a leading variable
+# included
+@pytest.mark.parametrize(('expr', 'expected'), [
+    ('x3 + x2 + x1 <= 1', 'x1 + x2 + x3 <= 1'),
+    ('x3 + x2 + 2*x1 <= 1', '2*x1 + x2 + x3 <= 1'),
+    ('x2*x4 + x2 + x1 + 2*x3 <= 1', 'x1 + x2 + 2*x3 + x2*x4 <= 1'),
+])
+def test_insert_term_sorted(monkeypatch, expr, expected):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    monkeypatch.setattr(Rewriter, '_linear_form', staticmethod(lambda root: None))
+    tree = ExprTree.from_string(expr)
+    tree.linear = None
+    tree.variables = ['x1', 'x2', 'x3', 'x4']
+    Rewriter().normalize(tree)
+    assert str(tree) == expected
+
+# a "+" chain out of order is sorted once, in steps linear in its length,
+# rather than by placing each term in turn in the chain of the ones before it
+def test_sum_steps_linear(monkeypatch):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    steps = []
+    for n in (200, 400, 800):
+        expr = 'y*x0' + ''.join(f' {"-+"[k % 2]} y*x{k} + {k % 3}' for k in range(n, 0, -1)) + ' <= 1'
+        tree = ExprTree.from_string(expr)
+        tree.variables = ['y', *(f'x{k}' for k in range(n + 1))]
+        rewriter = Rewriter()
+        rewriter.normalize(tree)
+        assert str(tree).startswith('y*x0 + y*x1 + -y*x2 + y*x3')
+        steps.append(rewriter.steps)
+    assert steps[1] <= 2.1*steps[0] and steps[2] <= 2.1*steps[1]
+
+# constant results are single exact literals, integers when whole
+@pytest.mark.parametrize(('expr', 'value'), [
+    ('1/3 + 1/6', fractions.Fraction(1, 2)),
+    ('0.1 + 0.2', fractions.Fraction(3, 10)),
+    ('2.5*4', 10),
+    ('(-4/189)/(25/189)', fractions.Fraction(-4, 25)),
+    ('inf/inf', 1),
+    ('inf/(-inf)', -1),
+    ('2/inf', 0),
+    ('inf/(-2)', float('-inf')),
+])
+def test_exact_literals(expr, value):
+    tree = MathTree.from_string(expr)
+    Rewriter().normalize(tree)
+    assert isinstance(tree.root, Literal)
+    assert type(tree.root.value) is type(value)
+    assert tree.evaluate({}) == value
+
+# operands built on both sides of a reset of the intern table are equal
+# without being the same node, and simplify all the same
+@pytest.mark.parametrize(('op', 'left', 'right', 'expected'), [
+    ('and', 'x <= 1', 'x <= 1', 'x <= 1'),
+    ('or', 'x <= 1', 'x <= 1', 'x <= 1'),
+    ('and', 'True', 'x <= 1', 'x <= 1'),
+    ('or', 'x <= 1', 'False', 'x <= 1'),
+    ('and', 'x', 'not x', 'False'),
+    ('or', 'x', 'not x', 'True'),
+])
+def test_normalize_across_reset(monkeypatch, op, left, right, expected):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    a = ExprTree.from_string(left).root
+    clear_interned()
+    b = ExprTree.from_string(right).root
+    tree = ExprTree.from_root(BinaryOp(op, a, b))
+    Rewriter().normalize(tree)
+    assert str(tree) == expected
+
+def test_not_across_reset(monkeypatch):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    true = Literal(True)
+    clear_interned()
+    tree = ExprTree.from_root(UnaryOp('not', true))
+    Rewriter().normalize(tree)
+    assert str(tree) == 'False'
+
+# normal forms are kept from one normalization to the next while the
+# variables stay the same, and give the same results
+def test_normalized_reused(monkeypatch):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    exprs = ['x*y + 2*x*y - y*x', '(x*y + 1)*3 <= x*y', 'x*y/2 + x*y/2']
+    shared = Rewriter()
+    for expr in exprs:
+        tree, expected = ExprTree.from_string(expr), ExprTree.from_string(expr)
+        assert tree.variables == ['x', 'y']
+        Rewriter().normalize(expected)
+        shared.normalize(tree)
+        assert tree.root is expected.root
+    assert Literal(3) in shared.normalized
+    tree = ExprTree.from_string('x*y')
+    tree.variables = ['y', 'x']
+    shared.normalize(tree)
+    assert Literal(3) not in shared.normalized
+
+@pytest.mark.parametrize(('expr', 'rule'), [
+    ('x xor y', 'xor'),
+    ('2*(x*y + 1)', 'distribute product over sum'),
+    ('-(x*y)', 'negate product'),
+])
+def test_rule_profiler(monkeypatch, expr, rule):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    tree = ExprTree.from_string(expr)
+    tree.linear = None
+    with RuleProfiler() as profiler:
+        Rewriter().normalize(tree)
+    assert sys.getprofile() is None
+    stats = {row[0]: row[1:] for row in profiler.rows()}
+    assert stats[rule][0] >= 1
+    assert all(count >= 1 and elapsed >= 0 and depth >= 1 for count, elapsed, depth in stats.values())
+    assert profiler.visits >= sum(count for count, _, _ in stats.values())
+    assert json.loads(profiler.to_json())['rules'][0]['rule'] == profiler.rows()[0][0]
+    assert rule in profiler.report()
+
+def _chain(op, n, nested='right'):
+    root = BinaryOp('<=', Variable('x0'), Literal(0))
+    for k in range(1, n):
+        atom = BinaryOp('<=', Variable(f'x{k}'), Literal(k))
+        root = BinaryOp(op, atom, root) if nested == 'right' else BinaryOp(op, root, atom)
+    return ExprTree.from_root(root)
+
+# nested "xor"/"iif" and wide "or" of "and" expand exponentially, and are
+# refused before any rewriting
+@pytest.mark.parametrize('expr', [
+    '((((x1 <= 1) xor (x2 <= 2)) xor (x3 <= 3)) xor (x4 <= 4)) xor (x5 <= 5)',
+    '((((x1 <= 1) iif (x2 <= 2)) iif (x3 <= 3)) iif (x4 <= 4)) iif (x5 <= 5)',
+    ' or '.join(f'(x{k} <= 1 and x{k} >= 0 and x{k} != 3)' for k in range(1, 12)),
+    'not (' + ' and '.join(f'(x{k} <= 1 or x{k} >= 3)' for k in range(1, 20)) + ')',
+])
+def test_expansion_budget(monkeypatch, expr):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    tree = ExprTree.from_string(expr)
+    visits = []
+    monkeypatch.setattr(Rewriter, '_normalize_visitor', lambda self, node: visits.append(node))
+    with pytest.raises(ExpansionBudgetExceeded, match='expansion budget of 32768'):
+        Rewriter().normalize(tree)
+    assert visits == []
+
+# a few nested "xor"/"iif", or a wide "or" of "and", expand within the budget:
+# "or" is distributed down the clauses in a loop, so that the number of
+# clauses does not take the rules past the recursion limit
+@pytest.mark.parametrize('expr', [
+    '(((x1 <= 1) xor (x2 <= 2)) xor (x3 <= 3)) xor (x4 <= 4)',
+    '(x1 <= 1) xor ((x2 <= 2) xor ((x3 <= 3) xor (x4 <= 4)))',
+    '(((x1 <= 1) iif (x2 <= 2)) iif (x3 <= 3)) iif (x4 <= 4)',
+    ' or '.join(f'(x{k} <= 1 and x{k} >= 0)' for k in range(1, 11)),
+])
+def test_expansion_within_budget(monkeypatch, expr):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    tree = ExprTree.from_string(expr)
+    expected = tree.compile()
+    names = list(tree.variables)
+    Rewriter().normalize(tree)
+    result = tree.compile()
+    for values in itertools.product([0, 5], repeat=len(names)):
+        context = dict(zip(names, values))
+        assert result(context) == expected(context)
+
+@pytest.mark.parametrize(('budget', 'fails'), [(4, True), (8, False), (None, False)])
+def test_expansion_budget_bound(monkeypatch, budget, fails):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    monkeypatch.setattr(Rewriter, 'expansion_budget', budget)
+    tree = ExprTree.from_string('(x <= 1 and y <= 1) or (z <= 1 and w <= 1)')
+    if fails:
+        with pytest.raises(ExpansionBudgetExceeded, match='expansion budget of 4'):
+            Rewriter().normalize(tree)
+    else:
+        Rewriter().normalize(tree)
+        assert str(tree) == '((((x <= 1) or (z <= 1)) and ((y <= 1) or (z <= 1))) and ((x <= 1) or (w <= 1))) and ((y <= 1) or (w <= 1))'
+
+# deep chains: left-nested ones are appended to one term at a time, right-nested
+# ones are rebalanced in steps quadratic in their length, also bounded, and
+# neither recurses along the chain, nor does "not" pushed down one
+@pytest.mark.parametrize('op', ['and', 'or'])
+def test_deep_chains(monkeypatch, op):
+    monkeypatch.setattr(Rewriter, 'cache', None)
+    limit = sys.getrecursionlimit()
+    tree = _chain(op, 3000, 'left')
+    Rewriter().normalize(tree)
+    assert str(tree).count(op) == 2999
+    tree = _chain(op, 500)
+    Rewriter().normalize(tree)
+    assert str(tree).count(op) == 499
+    tree = ExprTree.from_root(UnaryOp('not', _chain(op, 3000, 'left').root))
+    Rewriter().normalize(tree)
+    assert str(tree).count({'and': 'or', 'or': 'and'}[op]) == 2999
+    assert sys.getrecursionlimit() == limit
+    monkeypatch.setattr(Rewriter, 'expansion_budget', 1000)
+    with pytest.raises(ExpansionBudgetExceeded, match='more than 8000 rewriting steps'):
+        Rewriter().normalize(_chain(op, 1000))
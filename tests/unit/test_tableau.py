@@ -1,7 +1,7 @@
 import pytest
 
 from simplex.core import Rewriter, Tableau
-from simplex.parsing import ExprTree, MathTree, ObjectiveTree
+from simplex.parsing import Arena, ExprTree, MathTree, ObjectiveTree
 
 
 @pytest.fixture
@@ -65,3 +65,13 @@ def test_coefs_row(mock_tableau, col, expected):
 def test_coefs_column(mock_tableau, col, expected):
     tmp = mock_tableau.coefs_column(col)
     assert {k: v.evaluate({}) for k,v in tmp.items()} == expected
+
+def test_pivot_arena(mock_tableau):
+    objective = ObjectiveTree.from_string('max z = x1 + 2*x2')
+    constraints = [ExprTree.from_string(str(c)) for c in mock_tableau.constraints]
+    arena_tableau = Tableau(objective, constraints, ['s1', 's2'], Arena())
+    for tableau in (mock_tableau, arena_tableau):
+        tableau.pivot('x2', 's2')
+        tableau.pivot('x1', 's1')
+    assert arena_tableau.basis == mock_tableau.basis
+    assert [{k: str(v) for k, v in line.items()} for line in arena_tableau.data] == [{k: str(v) for k, v in line.items()} for line in mock_tableau.data]
@@ -1,6 +1,8 @@
+import fractions
+
 import pytest
 
-from simplex.parsing import tokenize
+from simplex.parsing import DecimalFraction, tokenize
 
 
 def tokens_of(s):
@@ -111,3 +113,63 @@ def test_tokenize(expr, expected):
 def test_tokenize_hypens(expr, expected):
     assert tokens_of(expr) == expected
 
+@pytest.mark.parametrize(('expr', 'expected'), [
+    ('1.5 inf', [
+        ('NUMBER', 1.5),
+        ('NUMBER', float('inf')),
+    ]),
+    ('x_1 $y @z', [
+        ('VAR', 'x_1'),
+        ('VAR', '$y'),
+        ('VAR', '@z'),
+    ]),
+    ('True or not False', [
+        ('BOOL', True),
+        ('OP', 'or'),
+        ('OP', 'not'),
+        ('BOOL', False),
+    ]),
+    ('  x\t!=\ny  ', [
+        ('VAR', 'x'),
+        ('OP', '!='),
+        ('VAR', 'y'),
+    ]),
+    ('sum(i in 1..n) x_i', [
+        ('VAR', 'sum'),
+        ('LPAREN', '('),
+        ('VAR', 'i'),
+        ('VAR', 'in'),
+        ('NUMBER', 1),
+        ('RANGE', '..'),
+        ('VAR', 'n'),
+        ('RPAREN', ')'),
+        ('VAR', 'x_i'),
+    ]),
+    ('1. + 2.5', [
+        ('NUMBER', 1.0),
+        ('OP', '+'),
+        ('NUMBER', 2.5),
+    ]),
+])
+def test_tokenize_misc(expr, expected):
+    assert tokens_of(expr) == expected
+
+@pytest.mark.parametrize('expr', ['x # y', '2 ; 3', 'x ^ 2'])
+def test_tokenize_error(expr):
+    with pytest.raises(SyntaxError):
+        tokens_of(expr)
+
+def test_tokenize_is_lazy():
+    tokens = tokenize('x + y ; z')
+    assert next(tokens) == ('VAR', 'x')
+    assert next(tokens) == ('OP', '+')
+    assert next(tokens) == ('VAR', 'y')
+    with pytest.raises(SyntaxError):
+        next(tokens)
+
+@pytest.mark.parametrize(('expr', 'value', 'text'), [('2.5', fractions.Fraction(5, 2), '2.5'), ('0.1', fractions.Fraction(1, 10), '0.1'), ('1.', 1, '1.0')])
+def test_tokenize_decimal(expr, value, text):
+    (kind, number), = tokens_of(expr)
+    assert isinstance(number, DecimalFraction)
+    assert number == value
+    assert str(number) == text
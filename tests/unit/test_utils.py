@@ -1,3 +1,5 @@
+import gc
+
 import pytest
 
 import simplex.utils
@@ -19,3 +21,39 @@ def test_prefix_sort(unsorted, expected):
 ])
 def test_prefix_unique(unsorted, expected):
     assert simplex.utils.prefix_unique(unsorted) == expected
+
+@pytest.mark.parametrize('jobs', [1, 3])
+def test_parallel_map(jobs):
+    assert list(simplex.utils.parallel_map(abs, range(-20, 20), jobs)) == [abs(k) for k in range(-20, 20)]
+
+@pytest.mark.parametrize('jobs', [1, 3])
+def test_parallel_map_empty(jobs):
+    assert list(simplex.utils.parallel_map(abs, [], jobs)) == []
+
+@pytest.mark.parametrize('jobs', [1, 3])
+def test_parallel_map_error(jobs):
+    results = simplex.utils.parallel_map(int, ['1', '2', 'x', '4', 'y'], jobs)
+    assert next(results) == 1
+    assert next(results) == 2
+    with pytest.raises(ValueError, match="'x'"):
+        next(results)
+
+def test_watch_file(tmp_path):
+    path = tmp_path / 'model'
+    path.write_text('max z = x')
+    changes = simplex.utils.watch_file(path, interval=0.01)
+    next(changes)
+    path.write_text('max z = x + y')
+    next(changes)
+
+@pytest.mark.parametrize('enabled', [True, False])
+def test_gc_paused(enabled):
+    was = gc.isenabled()
+    (gc.enable if enabled else gc.disable)()
+    try:
+        with pytest.raises(ValueError), simplex.utils.gc_paused():
+            assert not gc.isenabled()
+            raise ValueError
+        assert gc.isenabled() == enabled
+    finally:
+        (gc.enable if was else gc.disable)()